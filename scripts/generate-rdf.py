@@ -1,24 +1,6 @@
 from pathlib import Path
 
-from kgx.cli.cli_utils import transform as kgx_transform
-from loguru import logger
+from alliance_ingest.rdf import export_rdf
 
-logger.info(f"Creating rdf output: output/alliance_disease.nt.gz ...")
-
-src_files = []
-src_nodes = f"output/alliance_disease_nodes.tsv"
-src_edges = f"output/alliance_disease_edges.tsv"
-
-if Path(src_nodes).is_file():
-    src_files.append(src_nodes)
-if Path(src_edges).is_file():
-    src_files.append(src_edges)
-
-kgx_transform(
-    inputs=src_files,
-    input_format="tsv",
-    stream=True,
-    output=f"output/alliance_disease.nt.gz",
-    output_format="nt",
-    output_compression="gz",
-)
+# Same as `ingest rdf`: output/{name}.nt.gz for every transform, converted in parallel chunks
+export_rdf(Path("output"))
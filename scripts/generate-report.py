@@ -1,28 +1,6 @@
 from pathlib import Path
 
-import duckdb
+from alliance_ingest.report import write_reports
 
-nodes_file = "output/alliance_disease_nodes.tsv"
-edges_file = "output/alliance_disease_edges.tsv"
-
-
-# Nodes
-if Path(nodes_file).exists():
-    query = f"""
-    SELECT category, split_part(id, ':', 1) as prefix, count(*)
-    FROM '{nodes_file}'
-    GROUP BY all
-    ORDER BY all
-    """
-    duckdb.sql(f"copy ({query}) to 'output/alliance_disease_nodes_report.tsv' (header, delimiter '\t')")
-
-# Edges
-if Path(edges_file).exists():
-    query = f"""
-    SELECT category, split_part(subject, ':', 1) as subject_prefix, predicate,
-    split_part(object, ':', 1) as object_prefix, count(*)
-    FROM '{edges_file}'
-    GROUP BY all
-    ORDER BY all
-    """
-    duckdb.sql(f"copy ({query}) to 'output/alliance_disease_edges_report.tsv' (header, delimiter '\t')")
+# Same as `ingest report`: one report pair per transform, counted in a single DuckDB query
+write_reports(Path("output"))
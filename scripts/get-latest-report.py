@@ -28,7 +28,8 @@ def main():
     # Download the reports
     for fn, url in reports.items():
         response = requests.get(url)
-        output_fn = "_".join(fn.split("_")[-2:])
+        # The docs render the disease reports; the other transforms' reports keep their names
+        output_fn = "_".join(fn.split("_")[-2:]) if fn.startswith("alliance_disease_") else fn
         with open(f"docs/{output_fn}", "wb") as f:
             f.write(response.content)
 
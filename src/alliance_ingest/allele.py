@@ -1,6 +1,5 @@
 import csv
 import sys
-import uuid
 from typing import List
 
 from biolink_model.datamodel.pydanticmodel_v2 import (
@@ -11,6 +10,9 @@ from biolink_model.datamodel.pydanticmodel_v2 import (
 )
 import koza
 
+from alliance_ingest.construct import build
+from alliance_ingest.ids import association_id
+
 # There's some very large chunks of sequence in the ingest file, this lets koza load them
 csv.field_size_limit(sys.maxsize)
 
@@ -63,7 +65,8 @@ def transform_record(koza_transform, row: dict) -> List:
     if row["AlleleSynonyms"] and row["AlleleSynonyms"] != "-":
         synonyms = [syn.strip() for syn in row["AlleleSynonyms"].split(",")]
 
-    allele = SequenceVariant(
+    allele = build(
+        SequenceVariant,
         id=allele_id,
         name=row["AlleleSymbol"],  # Use symbol as name
         in_taxon=[row["Taxon"]],
@@ -76,13 +79,22 @@ def transform_record(koza_transform, row: dict) -> List:
 
     # Add allele to gene associations if gene IDs are available
     if row.get("AlleleAssociatedGeneId") and row["AlleleAssociatedGeneId"] != "-":
-        allele_to_gene = VariantToGeneAssociation(
-            id=str(uuid.uuid4()),
+        predicate = get_predicate(row["VariantsTypeId"])
+        primary_knowledge_source = source_map.get(source, "infores:agrkb")
+        allele_to_gene = build(
+            VariantToGeneAssociation,
+            id=association_id(
+                subject=allele_id,
+                predicate=predicate,
+                object=row["AlleleAssociatedGeneId"],
+                qualifiers=[row["VariantsTypeId"]],
+                source=primary_knowledge_source,
+            ),
             subject=allele_id,
-            predicate=get_predicate(row["VariantsTypeId"]),
+            predicate=predicate,
             original_predicate=row["VariantsTypeId"],
             object=row["AlleleAssociatedGeneId"],
-            primary_knowledge_source=source_map.get(source, "infores:agrkb"),
+            primary_knowledge_source=primary_knowledge_source,
             aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
             knowledge_level=KnowledgeLevelEnum.knowledge_assertion,
             agent_type=AgentTypeEnum.manual_agent,
@@ -0,0 +1,393 @@
+"""
+Throughput microbenchmarks of every transform's transform_record.
+
+Each transform is driven with a synthetic corpus shaped like its Alliance
+input file: rows from several providers, with optional fields present or
+absent, and rows the transform skips, in fixed proportions. The corpus is
+generated from a fixed seed, so every run sees the same rows. Rows are fed
+to transform_record through a KozaTransform with a PassthroughWriter and the
+mappings named in the transform's config. This measures the transform code
+and the biolink objects it builds, not file reading or writing.
+
+Results are written as JSON. A run can be compared against a stored baseline,
+and a transform is a regression when its rows/sec drop, or its allocated
+bytes per row grow, by more than the threshold.
+"""
+
+import gc
+import importlib
+import json
+import platform
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCHMARK_ROWS = 10_000
+
+BENCHMARK_REPEAT = 3
+
+# Rows traced for the allocation measurement, which is too slow to run over the whole corpus
+ALLOCATION_ROWS = 1_000
+
+REGRESSION_THRESHOLD = 0.1
+
+SEED = 20240601
+
+Mappings = Dict[str, Dict[str, Dict[str, str]]]
+
+PROVIDERS = {
+    "MGI": "NCBITaxon:10090",
+    "RGD": "NCBITaxon:10116",
+    "ZFIN": "NCBITaxon:7955",
+    "WB": "NCBITaxon:6239",
+    "FB": "NCBITaxon:7227",
+    "HGNC": "NCBITaxon:9606",
+    "SGD": "NCBITaxon:559292",
+}
+
+SPECIES = {
+    "NCBITaxon:10090": "Mus musculus",
+    "NCBITaxon:10116": "Rattus norvegicus",
+    "NCBITaxon:7955": "Danio rerio",
+}
+
+
+def _curie(rng: random.Random, prefix: str, high: int = 999_999) -> str:
+    return f"{prefix}:{rng.randint(1, high)}"
+
+
+def allele_corpus(rng: random.Random, rows: int) -> Tuple[List[Dict[str, Any]], Mappings]:
+    """VARIANT-ALLELE rows, as read from the TSV with every column a string."""
+    corpus = []
+    for _ in range(rows):
+        provider = rng.choice(["MGI", "MGI", "RGD", "ZFIN"])
+        taxon = PROVIDERS[provider]
+        has_gene = rng.random() < 0.85
+        corpus.append(
+            {
+                "Taxon": taxon,
+                "SpeciesName": SPECIES[taxon],
+                "AlleleId": "-" if rng.random() < 0.02 else _curie(rng, provider),
+                "AlleleSymbol": f"Allele<tm{rng.randint(1, 9)}>",
+                "AlleleSynonyms": rng.choice(["-", "-", "syn1", "syn1, syn2, syn3"]),
+                "VariantId": rng.choice(["-", f"NC_000067.7:g.{rng.randint(1, 10**8)}A>G"]),
+                "VariantSymbol": "-",
+                "VariantSynonyms": "-",
+                "VariantCrossReferences": "-",
+                "AlleleAssociatedGeneId": _curie(rng, provider) if has_gene else "-",
+                "AlleleAssociatedGeneSymbol": "Gene1" if has_gene else "-",
+                "VariantAffectedGeneId": "-",
+                "VariantAffectedGeneSymbol": "-",
+                "Category": "allele",
+                "VariantsTypeId": rng.choice(["SO:1000008", "SO:0000159", "SO:0000667", "SO:1000032", "-"]),
+                "VariantsTypeName": "point_mutation",
+                "VariantsHgvsNames": "-",
+                "Assembly": "GRCm39",
+                "Chromosome": str(rng.randint(1, 19)),
+                "StartPosition": str(rng.randint(1, 10**8)),
+                "EndPosition": str(rng.randint(1, 10**8)),
+                "SequenceOfReference": "A" * rng.randint(1, 40),
+                "SequenceOfVariant": "G",
+                "MostSevereConsequenceName": "missense_variant",
+                "VariantInformationReference": _curie(rng, "PMID", 40_000_000),
+                "HasDiseaseAnnotations": rng.choice(["true", "false"]),
+                "HasPhenotypeAnnotations": rng.choice(["true", "false"]),
+            }
+        )
+    return corpus, {}
+
+
+def disease_corpus(rng: random.Random, rows: int) -> Tuple[List[Dict[str, Any]], Mappings]:
+    """DISEASE-ALLIANCE rows, most of which are models; the other association types are skipped."""
+    corpus = []
+    for _ in range(rows):
+        provider = rng.choice(["MGI", "MGI", "RGD", "ZFIN", "ZFIN", "HGNC", "WB", "FB"])
+        object_type = rng.choice(["affected_genomic_model", "affected_genomic_model", "gene", "allele"])
+        corpus.append(
+            {
+                "Taxon": PROVIDERS[provider],
+                "SpeciesName": SPECIES.get(PROVIDERS[provider], ""),
+                "DBobjectType": object_type,
+                "DBObjectID": _curie(rng, provider),
+                "DBObjectSymbol": "Symbol",
+                "AssociationType": rng.choice(["is_model_of", "is_model_of", "is_implicated_in", "is_marker_for"]),
+                "DOID": _curie(rng, "DOID", 9_999),
+                "DOtermName": "disease",
+                "WithOrtholog": "",
+                "InferredFromID": "",
+                "InferredFromSymbol": "",
+                "ExperimentalCondition": rng.choice(
+                    ["", "", "", "Has Condition: standard conditions", "Induced By: chemical"]
+                ),
+                "Modifier": "" if rng.random() < 0.95 else "Ameliorated By: drug",
+                "EvidenceCode": rng.choice(["ECO:0000033", "ECO:0000304", "ECO:0007013"]),
+                "EvidenceCodeName": "evidence",
+                "Reference": _curie(rng, "PMID", 40_000_000),
+                "Date": "20200101",
+                "Source": provider,
+            }
+        )
+    return corpus, {}
+
+
+def expression_corpus(rng: random.Random, rows: int) -> Tuple[List[Dict[str, Any]], Mappings]:
+    """EXPRESSION records: anatomical structures, some only a cellular component, and a few neither."""
+    corpus = []
+    for _ in range(rows):
+        provider = rng.choice(["MGI", "ZFIN", "RGD", "WB", "FB", "SGD", "DRSC:XB"])
+        where: Dict[str, Any] = {"whereExpressedStatement": "somewhere"}
+        site = rng.random()
+        if site < 0.7:
+            where["anatomicalStructureTermId"] = _curie(rng, "UBERON", 9_999_999)
+        elif site < 0.97:
+            where["cellularComponentTermId"] = _curie(rng, "GO", 9_999_999)
+        row = {
+            "geneId": _curie(rng, provider),
+            "whereExpressed": where,
+            "whenExpressed": {"stageTermId": _curie(rng, "MmusDv", 9_999)} if rng.random() < 0.6 else {},
+            "evidence": {"publicationId": _curie(rng, "PMID", 40_000_000)},
+            "assay": rng.choice(["MMO:0000655", "MMO:0000658", "MMO:0000640"]),
+            "dateAssigned": "2020-01-01T00:00:00-05:00",
+        }
+        if rng.random() < 0.5:
+            row["crossReference"] = {"id": _curie(rng, provider), "pages": ["gene/expression/annotation/detail"]}
+        corpus.append(row)
+    return corpus, {}
+
+
+def gene_corpus(rng: random.Random, rows: int) -> Tuple[List[Dict[str, Any]], Mappings]:
+    """BGI gene records, with cross references, and synonyms and full names on some."""
+    corpus = []
+    for _ in range(rows):
+        provider = rng.choice(["MGI", "ZFIN", "RGD", "WB", "FB", "SGD", "HGNC", "DRSC:XB"])
+        taxon = PROVIDERS.get(provider, "NCBITaxon:8364")
+        entity: Dict[str, Any] = {
+            "primaryId": _curie(rng, provider),
+            "taxonId": taxon,
+            "crossReferences": [
+                {"id": _curie(rng, "ENSEMBL"), "pages": ["gene"]} for _ in range(rng.randint(0, 4))
+            ],
+        }
+        if rng.random() < 0.6:
+            entity["synonyms"] = [f"syn{i}\r" if i == 0 else f"syn{i}" for i in range(rng.randint(1, 5))]
+        row = {
+            "basicGeneticEntity": entity,
+            "symbol": f"gene{rng.randint(1, 99_999)}",
+            "soTermId": rng.choice(["SO:0001217", "SO:0000336", "SO:0001263"]),
+        }
+        if rng.random() < 0.8:
+            row["name"] = "a gene full name"
+        corpus.append(row)
+    return corpus, {}
+
+
+def genotype_corpus(rng: random.Random, rows: int) -> Tuple[List[Dict[str, Any]], Mappings]:
+    """AGM records with zero to three alleles, looked up in the entity lookup table as genotype.yaml configures."""
+    corpus = []
+    for _ in range(rows):
+        provider = rng.choice(["MGI", "MGI", "ZFIN", "RGD"])
+        row: Dict[str, Any] = {
+            "primaryID": _curie(rng, provider),
+            "name": "Allele1<tm1>/Allele1<+> [background:] involves: C57BL/6",
+            "taxonId": PROVIDERS[provider],
+        }
+        if rng.random() < 0.9:
+            row["subtype"] = "genotype"
+        components = []
+        for _ in range(rng.choice([0, 1, 1, 2, 3])):
+            component = {"alleleID": _curie(rng, provider)}
+            if rng.random() < 0.8:
+                component["zygosity"] = rng.choice(["GENO:0000136", "GENO:0000135", "GENO:0000137"])
+            components.append(component)
+        if components or rng.random() < 0.5:
+            row["affectedGenomicModelComponents"] = components
+        corpus.append(row)
+    return corpus, {"alliance-entity-lookup": {}}
+
+
+def phenotype_corpus(rng: random.Random, rows: int) -> Tuple[List[Dict[str, Any]], Mappings]:
+    """PHENOTYPE records of genes, genotypes and alleles, with conditions on some and a few IDs not in the lookup."""
+    corpus = []
+    lookup: Dict[str, Dict[str, str]] = {}
+    for _ in range(rows):
+        provider = rng.choice(["MGI", "RGD", "WB"])
+        object_id = _curie(rng, provider)
+        if rng.random() < 0.97:
+            category = rng.choice(["biolink:Gene", "biolink:Genotype", "biolink:Genotype", "biolink:SequenceVariant"])
+            lookup[object_id] = {"id": object_id, "category": category}
+        terms = rng.choice([1] * 40 + [0, 2])
+        term_prefix = "WB:WBPhenotype" if provider == "WB" else "MP"
+        row: Dict[str, Any] = {
+            "objectId": object_id,
+            "phenotypeTermIdentifiers": [
+                {"termId": _curie(rng, term_prefix, 9_999_999), "termOrder": i + 1} for i in range(terms)
+            ],
+            "phenotypeStatement": "abnormal phenotype",
+            "evidence": {
+                "publicationId": _curie(rng, "PMID", 40_000_000),
+                "crossReference": {"id": _curie(rng, provider), "pages": ["reference"]},
+            },
+            "dateAssigned": "2006-10-25T18:06:17.000-05:00",
+        }
+        if rng.random() < 0.2:
+            row["conditionRelations"] = [
+                {
+                    "conditionRelationType": "has_condition",
+                    "conditions": [
+                        {"conditionClassId": _curie(rng, "ZECO", 9_999), "conditionStatement": "chemical"}
+                        for _ in range(rng.randint(1, 2))
+                    ],
+                }
+            ]
+        corpus.append(row)
+    return corpus, {"alliance-entity-lookup": lookup}
+
+
+CORPORA: Dict[str, Callable[[random.Random, int], Tuple[List[Dict[str, Any]], Mappings]]] = {
+    "allele": allele_corpus,
+    "disease": disease_corpus,
+    "expression": expression_corpus,
+    "gene": gene_corpus,
+    "genotype": genotype_corpus,
+    "phenotype": phenotype_corpus,
+}
+
+
+@dataclass
+class BenchmarkResult:
+    """Throughput and allocations of one transform over its corpus."""
+
+    rows: int
+    entities: int
+    seconds: float
+    rows_per_second: float
+    alloc_bytes_per_row: float
+
+
+def _koza_transform(mappings: Mappings):
+    from koza import KozaTransform
+    from koza.io.writer.passthrough_writer import PassthroughWriter
+
+    return KozaTransform(mappings=mappings, writer=PassthroughWriter(), extra_fields={})
+
+
+def _run(transform_record: Callable, corpus: List[Dict[str, Any]], mappings: Mappings) -> Tuple[float, int]:
+    """Seconds taken and entities built for one pass over the corpus."""
+    koza_transform = _koza_transform(mappings)
+    write = koza_transform.writer.write
+    start = time.perf_counter()
+    for row in corpus:
+        write(transform_record(koza_transform, row))
+    return time.perf_counter() - start, len(koza_transform.writer.result())
+
+
+def _alloc_bytes_per_row(transform_record: Callable, corpus: List[Dict[str, Any]], mappings: Mappings) -> float:
+    """Mean peak of the memory allocated while transforming a row, over the first ALLOCATION_ROWS rows."""
+    koza_transform = _koza_transform(mappings)
+    rows = corpus[:ALLOCATION_ROWS]
+    total = 0
+    tracemalloc.start()
+    try:
+        for row in rows:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            entities = transform_record(koza_transform, row)
+            total += tracemalloc.get_traced_memory()[1] - before
+            del entities
+    finally:
+        tracemalloc.stop()
+    return total / len(rows) if rows else 0.0
+
+
+def run_benchmark(
+    name: str, rows: int = BENCHMARK_ROWS, repeat: int = BENCHMARK_REPEAT, seed: int = SEED
+) -> BenchmarkResult:
+    """Benchmark one transform, keeping the fastest of repeat passes over its corpus."""
+    from loguru import logger
+
+    module = importlib.import_module(f"alliance_ingest.{name}")
+    # The row corpus is built with the mappings, since some rows must be missing from them
+    corpus, mappings = CORPORA[name](random.Random(seed), rows)
+
+    # Skipped rows are logged; keep the cost of building the message but not of writing it out
+    logger.disable("alliance_ingest")
+    try:
+        _run(module.transform_record, corpus[: min(rows, 100)], mappings)
+        timings = []
+        for _ in range(repeat):
+            gc.collect()
+            timings.append(_run(module.transform_record, corpus, mappings))
+        seconds, entities = min(timings)
+        alloc = _alloc_bytes_per_row(module.transform_record, corpus, mappings)
+    finally:
+        logger.enable("alliance_ingest")
+    return BenchmarkResult(
+        rows=rows,
+        entities=entities,
+        seconds=round(seconds, 4),
+        rows_per_second=round(rows / seconds, 1),
+        alloc_bytes_per_row=round(alloc, 1),
+    )
+
+
+def run_benchmarks(
+    names: Optional[List[str]] = None,
+    rows: int = BENCHMARK_ROWS,
+    repeat: int = BENCHMARK_REPEAT,
+    validate_sample: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Benchmark the named transforms (all of them by default). Returns the results document."""
+    construct = importlib.import_module("alliance_ingest.construct")
+    construct.configure(validate_sample)
+    try:
+        results = {name: asdict(run_benchmark(name, rows, repeat)) for name in names or CORPORA}
+    finally:
+        construct.configure()
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "rows": rows,
+        "repeat": repeat,
+        "validate_sample": validate_sample,
+        "transforms": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Describe every transform that is slower, or allocates more per row, than the baseline by over threshold."""
+    regressions = []
+    for name, result in results["transforms"].items():
+        base = baseline.get("transforms", {}).get(name)
+        if base is None:
+            continue
+        if result["rows_per_second"] < base["rows_per_second"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result['rows_per_second']:,.0f} rows/s, "
+                f"{1 - result['rows_per_second'] / base['rows_per_second']:.0%} below {base['rows_per_second']:,.0f}"
+            )
+        if result["alloc_bytes_per_row"] > base["alloc_bytes_per_row"] * (1 + threshold):
+            # A baseline that allocated nothing has no ratio to grow by
+            growth = (
+                f"{result['alloc_bytes_per_row'] / base['alloc_bytes_per_row'] - 1:.0%} "
+                if base["alloc_bytes_per_row"]
+                else ""
+            )
+            regressions.append(
+                f"{name}: {result['alloc_bytes_per_row']:,.0f} bytes allocated per row, "
+                f"{growth}above {base['alloc_bytes_per_row']:,.0f}"
+            )
+    return regressions
+
+
+def write_results(results: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n")
+
+
+def read_results(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text())
@@ -0,0 +1,205 @@
+"""
+Cache of the decoded rows of input files, for repeated transforms of unchanged downloads.
+
+Every transform run decompresses its gzip inputs and parses their JSON or
+TSV text again, though the files rarely change between runs during
+development. With --cache, each reader file is read through a cache entry
+instead: the first read parses the file as usual and writes its rows to the
+entry as they are yielded, and later reads load the rows from the entry.
+
+An entry holds the rows in frames of BATCH_SIZE rows, each a 4-byte
+little-endian length and the marshal dump of the list of rows, in a zstd
+stream written through pyarrow. marshal round-trips the dicts, lists,
+strings and numbers that rows are made of exactly, and loads them several
+times faster than the json and csv modules parse text. The writer makes rows
+share one copy of each dict key, which marshal then stores once per frame,
+and the cyclic garbage collector is paused while a frame is loaded, as the
+thousands of containers it allocates would otherwise trigger collections
+that can't find anything to collect.
+
+Entries are kept in CACHE_DIR next to the files, named after the file, its
+BLAKE2b digest and a hash of the reader settings that decide how it is
+parsed. The hash also covers the marshal format and Python versions, as
+marshal data may not load in other versions. The file digest is reused while
+its size and mtime are unchanged, as in the manifest. Filters, required
+properties, projections and row limits are applied to the rows read, so one
+entry serves every config and option that reads the file the same way. An
+entry is only written once a file has been read to the end, atomically, and
+replaces the file's other entries.
+"""
+
+import gc
+import json
+import marshal
+import os
+import struct
+import sys
+import threading
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from loguru import logger
+
+from .manifest import file_digest
+
+CACHE_DIR = ".ingest-cache"
+
+ENTRY_SUFFIX = ".rows.zst"
+
+DIGEST_SUFFIX = ".digest"
+
+CODEC = "zstd"
+
+FRAME_LENGTH = struct.Struct("<I")
+
+# Rows per marshal frame
+BATCH_SIZE = 1024
+
+# Reader settings that don't change how a file is parsed into rows
+_ROW_SETTINGS_EXCLUDED = {"files", "filters", "required_properties"}
+
+
+def cache_dir(path: Path) -> Path:
+    return path.parent / CACHE_DIR
+
+
+def source_digest(path: Path) -> str:
+    """The BLAKE2b digest of a file, reused from its cache directory while the file's size and mtime match."""
+    stat = path.stat()
+    recorded = cache_dir(path) / (path.name + DIGEST_SUFFIX)
+    try:
+        record = json.loads(recorded.read_text())
+        if record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+            return record["blake2b"]
+    except (OSError, ValueError, KeyError):
+        pass
+    digest = file_digest(path)
+    recorded.parent.mkdir(parents=True, exist_ok=True)
+    tmp = recorded.with_name(f"{recorded.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "blake2b": digest}))
+    os.replace(tmp, recorded)
+    return digest
+
+
+def settings_key(config: Any) -> str:
+    """A short hash of the settings of a koza reader config that decide the rows parsed from a file."""
+    settings = {key: value for key, value in vars(config).items() if key not in _ROW_SETTINGS_EXCLUDED}
+    # Entries written by another Python or marshal version are not read
+    versions = [marshal.version, list(sys.version_info[:2])]
+    encoded = json.dumps([settings, versions], sort_keys=True, default=str).encode()
+    return blake2b(encoded, digest_size=6).hexdigest()
+
+
+def entry_path(path: Path, config: Any) -> Path:
+    """The cache entry of a file's rows as parsed with config."""
+    return cache_dir(path) / f"{path.name}.{source_digest(path)[:24]}.{settings_key(config)}{ENTRY_SUFFIX}"
+
+
+def _entries_of(path: Path) -> List[Path]:
+    """The cache entries of every version of a file."""
+    directory = cache_dir(path)
+    if not directory.exists():
+        return []
+    return [
+        entry
+        for entry in directory.glob(f"{path.name}.*{ENTRY_SUFFIX}")
+        if entry.name[: -len(ENTRY_SUFFIX)].rsplit(".", 2)[0] == path.name
+    ]
+
+
+def read_entry(entry: Path) -> Iterator[Any]:
+    """Yield the rows of a cache entry."""
+    import pyarrow as pa
+
+    with pa.CompressedInputStream(str(entry), CODEC) as fh:
+        while header := fh.read(FRAME_LENGTH.size):
+            (length,) = FRAME_LENGTH.unpack(header)
+            frame = fh.read(length)
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                rows = marshal.loads(frame)  # noqa: S302 - entries are only written by EntryWriter
+            finally:
+                if enabled:
+                    gc.enable()
+            yield from rows
+
+
+class EntryWriter:
+    """Write rows to a new cache entry, which only replaces the file's entries once committed."""
+
+    def __init__(self, entry: Path, batch_size: int = BATCH_SIZE):
+        import pyarrow as pa
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        self.entry = entry
+        self.tmp = entry.with_name(f"{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.out = pa.CompressedOutputStream(str(self.tmp), CODEC)
+        self.batch_size = batch_size
+        self.batch: List[Any] = []
+        self.keys: Dict[str, str] = {}
+
+    def _share_keys(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {self.keys.setdefault(key, key): self._share_keys(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._share_keys(item) for item in value]
+        return value
+
+    def _flush(self) -> None:
+        frame = marshal.dumps(self.batch)
+        self.out.write(FRAME_LENGTH.pack(len(frame)) + frame)
+        self.batch = []
+
+    def write(self, row: Any) -> None:
+        self.batch.append(self._share_keys(row))
+        if len(self.batch) == self.batch_size:
+            self._flush()
+
+    def commit(self, path: Path) -> None:
+        """Finish the entry, replacing the other entries of path."""
+        if self.batch:
+            self._flush()
+        self.out.close()
+        os.replace(self.tmp, self.entry)
+        for stale in _entries_of(path):
+            if stale != self.entry:
+                stale.unlink(missing_ok=True)
+
+    def discard(self) -> None:
+        if not self.out.closed:
+            self.out.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+def cached_rows(path: Path, config: Any, parse: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+    """
+    Yield the rows of a file from its cache entry, or from parse while writing them to a new entry.
+
+    The entry is only kept if the rows are read to the end. Rows marshal
+    can't dump (any but the core Python types) are read without a cache.
+    """
+    entry = entry_path(path, config)
+    if entry.exists():
+        logger.info(f"Reading {path.name} from the cache ({entry.name})")
+        yield from read_entry(entry)
+        return
+
+    writer: Optional[EntryWriter] = EntryWriter(entry)
+    try:
+        for row in parse():
+            if writer is not None:
+                try:
+                    writer.write(row)
+                except ValueError as e:
+                    logger.warning(f"Not caching {path.name}: {e}")
+                    writer.discard()
+                    writer = None
+            yield row
+        if writer is not None:
+            writer.commit(path)
+            logger.info(f"Cached the rows of {path.name} in {entry.name}")
+    finally:
+        if writer is not None:
+            writer.discard()
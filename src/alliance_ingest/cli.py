@@ -3,14 +3,49 @@ Generic CLI for alliance-ingest project.
 Discovers and runs all ingests, downloads, and tests dynamically.
 """
 
-import subprocess
 import sys
+import time
+from contextlib import contextmanager
+from enum import Enum
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import typer
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
+
+from .benchmark import (
+    BENCHMARK_REPEAT,
+    BENCHMARK_ROWS,
+    CORPORA,
+    REGRESSION_THRESHOLD,
+    compare,
+    read_results,
+    run_benchmarks,
+    write_results,
+)
+from .coalesce import MAX_GROUPS, MERGE_COLUMNS, CoalesceResult, coalesce_outputs
+from .configs import config_input_files, config_input_size, load_config
+from .download import DownloadResult, download_all, download_tasks
+from .entity_lookup import build_lookup_tables
+from .gzindex import build_gzip_indexes
+from .jsonsplit import build_record_indexes
+from .manifest import Manifest, transform_outputs
+from .mapping_index import build_mapping_index, mapping_index_path
+from .metrics import JobMetrics, append_metrics, job_metrics, write_prometheus
+from .options import PARQUET_FORMAT, PIPELINE_QUEUE_SIZE, TransformOptions
+from .profiling import ProfileMode, profile_transform
+from .rdf import CHUNK_SIZE, export_rdf
+from .report import write_reports
+from .scale import SCALES, run_scale_test, superlinear
+from .scale import write_results as write_scale_results
+from .scheduler import Job, JobResult, run_jobs, staging_path
+from .shards import run_sharded
+from .synthetic import SEED, generate
+from .trace import Tracer, traced
+from .usage import measure_self, run_measured
+from .worker import WarmPool, run_download, run_transform
 
 app = typer.Typer(
     name="ingest",
@@ -19,6 +54,20 @@ app = typer.Typer(
 console = Console()
 
 
+class Executor(str, Enum):
+    """How transforms and downloads are launched."""
+
+    subprocess = "subprocess"
+    worker = "worker"
+
+
+class OutputCompression(str, Enum):
+    """How TSV and JSON Lines outputs are compressed as they are written."""
+
+    gz = "gz"
+    zstd = "zstd"
+
+
 def discover_transform_configs(base_path: Path = Path(".")) -> List[Path]:
     """Discover all transform YAML files in src/alliance_ingest directory."""
     transform_configs = []
@@ -35,6 +84,37 @@ def discover_transform_configs(base_path: Path = Path(".")) -> List[Path]:
     return sorted(transform_configs)
 
 
+def discover_indexed_mappings(base_path: Path = Path(".")) -> List[Path]:
+    """Discover mapping configs in src/alliance_ingest that declare a `transform.index`."""
+    return [
+        yaml_file
+        for yaml_file in sorted(base_path.glob("src/alliance_ingest/*.yaml"))
+        if ("lookup" in yaml_file.name or "_map" in yaml_file.name) and mapping_index_path(yaml_file)
+    ]
+
+
+def discover_splittable_inputs(base_path: Path = Path(".")) -> List[Path]:
+    """The input files of delimited and JSON transform configs, which shards can split by their gzip index."""
+    paths = [
+        path
+        for config in discover_transform_configs(base_path)
+        if (load_config(config).get("reader") or {}).get("format", "csv") in ("csv", "json")
+        for path in config_input_files(config)
+    ]
+    return list(dict.fromkeys(paths))
+
+
+def discover_json_inputs(base_path: Path = Path(".")) -> Dict[Path, Optional[List]]:
+    """The input files of JSON transform configs, with the json_path of their records, for record indexes."""
+    inputs = {}
+    for config in discover_transform_configs(base_path):
+        reader = load_config(config).get("reader") or {}
+        if reader.get("format") == "json":
+            for path in config_input_files(config):
+                inputs.setdefault(path, reader.get("json_path"))
+    return inputs
+
+
 def discover_download_configs(base_path: Path = Path(".")) -> List[Path]:
     """Discover download.yaml files."""
     download_configs = []
@@ -46,29 +126,48 @@ def discover_download_configs(base_path: Path = Path(".")) -> List[Path]:
     return sorted(download_configs)
 
 
-def run_command(cmd: List[str], description: str) -> bool:
-    """Run a command and return success status."""
+def run_command(cmd: List[str], description: str, name: Optional[str] = None) -> JobResult:
+    """Run a command. Returns its exit status, wall time, CPU time and peak RSS as a JobResult named name."""
     console.print(f"[bold blue]Running:[/bold blue] {description}")
     console.print(f"[dim]Command: {' '.join(cmd)}[/dim]")
     
+    start = time.perf_counter()
     try:
-        result = subprocess.run(cmd, check=True, capture_output=False)
-        console.print(f"[green]✓ {description} completed successfully[/green]\n")
-        return True
-    except subprocess.CalledProcessError as e:
-        console.print(f"[red]✗ {description} failed with exit code {e.returncode}[/red]\n")
-        return False
+        returncode, usage = run_measured(cmd)
     except FileNotFoundError:
         console.print(f"[red]✗ Command not found: {cmd[0]}[/red]\n")
-        return False
+        return JobResult(name=name or description, returncode=127, elapsed=time.perf_counter() - start)
+    result = JobResult(
+        name=name or description,
+        returncode=returncode,
+        elapsed=time.perf_counter() - start,
+        cpu_seconds=usage.cpu_seconds,
+        peak_rss=usage.peak_rss,
+    )
+    if result.ok:
+        console.print(f"[green]✓ {description} completed successfully[/green]\n")
+    else:
+        console.print(f"[red]✗ {description} failed with exit code {returncode}[/red]\n")
+    return result
 
 
 def run_downloads(
     output_dir: str = ".",
     ignore_cache: bool = False,
-    verbose: bool = False
+    verbose: bool = False,
+    executor: Executor = Executor.subprocess,
+    pool: Optional[WarmPool] = None,
+    connections: Optional[int] = None,
+    metrics: Optional[List[JobMetrics]] = None,
+    tracer: Optional[Tracer] = None,
 ) -> int:
-    """Download all data sources. Returns number of successful downloads."""
+    """
+    Download all data sources. Returns number of successful downloads.
+
+    With connections, files are fetched by the built-in resumable HTTP client
+    instead of kghub-downloader, that many at a time. The metrics of every
+    download are appended to metrics, and a span of each to tracer, if given.
+    """
     download_configs = discover_download_configs()
     
     if not download_configs:
@@ -77,31 +176,174 @@ def run_downloads(
     
     console.print(Panel(f"[bold]Downloading data from {len(download_configs)} sources[/bold]"))
     
-    success_count = 0
-    for config in download_configs:
-        cmd = ["uv", "run", "downloader", str(config)]
-        if output_dir != ".":
-            cmd.extend(["--output-dir", output_dir])
-        if ignore_cache:
-            cmd.append("--ignore-cache")
-        if verbose:
-            cmd.append("--verbose")
-            
-        if run_command(cmd, f"Download from {config.parent.name}"):
-            success_count += 1
-    
+    if connections:
+        results = []
+        for config in download_configs:
+            name = f"download_{config.parent.name}"
+            start = time.perf_counter()
+            with measure_self() as usage, traced(tracer, name, cat="download", lane=name):
+                ok = run_http_downloads(config, Path(output_dir), connections, ignore_cache)
+            results.append(
+                JobResult(
+                    name=name,
+                    returncode=0 if ok else 1,
+                    elapsed=time.perf_counter() - start,
+                    cpu_seconds=usage.cpu_seconds,
+                    peak_rss=usage.peak_rss,
+                )
+            )
+    elif executor == Executor.worker:
+        download_jobs = [
+            Job(name=f"download_{config.parent.name}", cmd=[], config=config) for config in download_configs
+        ]
+
+        def on_start(job: Job):
+            console.print(f"[bold blue]Running:[/bold blue] Download from {job.config.parent.name}")
+            if tracer:
+                tracer.begin(job.name, job.name, "download", job.name)
+
+        def on_done(result: JobResult):
+            if tracer:
+                tracer.end(result.name, ok=result.ok)
+
+        with warm_pool(pool, 1) as workers:
+
+            def submit(job: Job, log_file: Optional[str]):
+                return workers.executor.submit(run_download, str(job.config), output_dir, ignore_cache, verbose)
+
+            results = workers.run(download_jobs, Path(output_dir), submit, on_start=on_start, on_done=on_done)
+    else:
+        results = []
+        for config in download_configs:
+            cmd = ["uv", "run", "downloader", str(config)]
+            if output_dir != ".":
+                cmd.extend(["--output-dir", output_dir])
+            if ignore_cache:
+                cmd.append("--ignore-cache")
+            if verbose:
+                cmd.append("--verbose")
+
+            name = f"download_{config.parent.name}"
+            with traced(tracer, name, cat="download", lane=name):
+                results.append(run_command(cmd, f"Download from {config.parent.name}", name))
+
+    if metrics is not None:
+        metrics.extend(job_metrics(result, "download") for result in results)
+    success_count = sum(1 for result in results if result.ok)
     console.print(f"[bold]Downloads completed: {success_count}/{len(download_configs)} successful[/bold]")
     return success_count
 
 
+def run_http_downloads(config: Path, output_dir: Path, connections: int, ignore_cache: bool = False) -> bool:
+    """Download every file of a download.yaml concurrently. Returns whether all of them succeeded."""
+    console.print(f"[bold blue]Running:[/bold blue] Download from {config.parent.name} ({connections} connections)")
+
+    def on_done(result: DownloadResult):
+        if result.ok:
+            size = f", {result.transferred / 1e6:.1f} MB in {result.elapsed:.1f}s" if result.transferred else ""
+            console.print(f"  [green]✓[/green] {result.path} {result.status}{size}")
+        else:
+            console.print(f"  [red]✗ {result.path} failed: {result.error}[/red]")
+
+    results = download_all(download_tasks(config, output_dir), connections, ignore_cache, on_done=on_done)
+    statuses = [result.status for result in results]
+    summary = ", ".join(f"{statuses.count(status)} {status}" for status in dict.fromkeys(statuses))
+    transferred = sum(result.transferred for result in results) / 1e6
+    console.print(f"[bold]{config.parent.name}:[/bold] {summary} ({transferred:.1f} MB transferred)\n")
+    return all(result.ok for result in results)
+
+
+@contextmanager
+def warm_pool(pool: Optional[WarmPool], max_workers: int):
+    """Use the given WarmPool, or start (and afterwards stop) a new one."""
+    if pool is not None:
+        yield pool
+        return
+    with WarmPool(max_workers=max_workers) as pool:
+        yield pool
+    print_startup_savings(pool)
+
+
+def print_startup_savings(pool: WarmPool):
+    """Report how much interpreter and import startup the warm workers avoided."""
+    paid, avoided = pool.startup_savings()
+    if not pool.tasks_run:
+        return
+    console.print(
+        f"[bold]Warm workers:[/bold] {len(pool.startup_by_pid)} worker(s) imported koza/biolink in {paid:.1f}s; "
+        f"one cold start per config would have cost ~{avoided:.1f}s for {pool.tasks_run} configs "
+        f"(saved ~{max(avoided - paid, 0):.1f}s, not counting `uv run` environment resolution)"
+    )
+
+
 @app.command()
 def download(
     output_dir: str = typer.Option(".", help="Output directory for downloaded data"),
     ignore_cache: bool = typer.Option(False, help="Force download of data, even if it exists"),
-    verbose: bool = typer.Option(False, help="Verbose output")
+    verbose: bool = typer.Option(False, help="Verbose output"),
+    executor: Executor = typer.Option(Executor.subprocess, help="Run downloads as subprocesses or on a warm worker"),
+    connections: Optional[int] = typer.Option(
+        None, help="Download with the built-in resumable HTTP client, using this many connections at a time"
+    ),
+    metrics_textfile: Optional[Path] = typer.Option(
+        None, help="Also write the job metrics to this Prometheus textfile (e.g. for node_exporter)"
+    ),
 ):
-    """Download all data sources."""
-    run_downloads(output_dir, ignore_cache, verbose)
+    """Download all data sources, appending each download's metrics to metrics.jsonl in the output directory."""
+    metrics: List[JobMetrics] = []
+    run_downloads(output_dir, ignore_cache, verbose, executor, connections=connections, metrics=metrics)
+    save_metrics(metrics, output_dir, metrics_textfile)
+
+
+def run_post_download(data_dir: str = "data", jobs: Optional[int] = None) -> bool:
+    """
+    Build the entity lookup tables and their mapping indexes from the downloaded files. Returns success status.
+
+    Large delimited and JSON inputs also get a gzip seek-point index, and
+    JSON inputs a record index, so that --shard can split them; without them
+    they are only sharded whole.
+    """
+    console.print(Panel("[bold]Building entity lookup tables[/bold]"))
+    start = time.perf_counter()
+    try:
+        counts = build_lookup_tables(Path(data_dir), max_workers=jobs)
+        for mapping_config in discover_indexed_mappings():
+            counts[mapping_index_path(mapping_config)] = build_mapping_index(mapping_config)
+    except Exception as e:
+        console.print(f"[red]✗ Building lookup tables failed: {e}[/red]\n")
+        return False
+    for path, count in counts.items():
+        console.print(f"  • {path}: {count} IDs")
+    try:
+        points = build_gzip_indexes(discover_splittable_inputs(), max_workers=jobs)
+    except (OSError, ValueError) as e:
+        console.print(f"[yellow]Gzip indexes not built, large inputs will be sharded whole: {e}[/yellow]")
+        points = {}
+    for path, count in points.items():
+        console.print(f"  • {path}: gzip index of {count} seek points")
+    try:
+        records = build_record_indexes(discover_json_inputs(), max_workers=jobs)
+    except (OSError, ValueError) as e:
+        console.print(f"[yellow]Record indexes not built, large JSON inputs will be sharded whole: {e}[/yellow]")
+        records = {}
+    for path, count in records.items():
+        console.print(f"  • {path}: record index of {count} record starts")
+    console.print(f"[green]✓ Lookup tables built in {time.perf_counter() - start:.1f}s[/green]\n")
+    return True
+
+
+@app.command(name="post-download")
+def post_download(
+    data_dir: str = typer.Option("data", help="Directory holding the downloaded files"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", help="Number of files to read at the same time"),
+):
+    """
+    Build the entity lookup tables from the downloaded BGI, VARIANT-ALLELE and AGM files.
+
+    Large delimited and JSON inputs are also given gzip seek-point and record indexes, which let --shard split them.
+    """
+    if not run_post_download(data_dir, jobs):
+        sys.exit(1)
 
 
 def run_transforms(
@@ -109,43 +351,420 @@ def run_transforms(
     output_format: str = "tsv", 
     limit: Optional[int] = None,
     progress: bool = False,
+    jobs: int = 1,
+    executor: Executor = Executor.subprocess,
+    pool: Optional[WarmPool] = None,
+    stream: bool = False,
+    shard: bool = False,
+    force: bool = False,
+    validate_sample: Optional[int] = None,
+    metrics: Optional[List[JobMetrics]] = None,
+    tracer: Optional[Tracer] = None,
+    coalesce: bool = False,
+    pipeline: bool = False,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    cache: bool = False,
+    output_compression: Optional[OutputCompression] = None,
 ) -> int:
-    """Run all discovered transforms. Returns number of successful transforms."""
+    """
+    Run all discovered transforms. Returns number of successful transforms.
+
+    Transforms whose inputs are unchanged since the outputs in output_dir were
+    written are skipped, and count as successful, unless force is set. The
+    metrics of every transform are appended to metrics, if given. With a
+    tracer, each transform is traced in a lane of its own, and in-process
+    transforms also record spans of their reading, transform loop and writing.
+    With coalesce, the duplicate edges of each transform are coalesced as soon
+    as it finishes, before its outputs are recorded in the manifest. With
+    pipeline, each transform reads and writes on threads of its own, with
+    queues of queue_size batches between them and the transform loop. With
+    cache, input files are read through the decoded-row cache (see cache).
+    With output_compression, TSV and JSON Lines outputs are compressed on
+    threads of their own as they are written (see compression).
+    """
     transform_configs = discover_transform_configs()
     
     if not transform_configs:
         console.print("[yellow]No transform configs found[/yellow]")
         return 0
+    total = len(transform_configs)
+
+    configs_by_name = {config.stem: config for config in transform_configs}
+    manifest = Manifest.load(Path(output_dir))
+    # Streaming, sharding, pipelining, caching and sampled validation produce the same output,
+    # so only these options are part of the fingerprint, along with the compression of the output files
+    fingerprint_options = {"output_format": output_format, "limit": limit}
+    if coalesce:
+        fingerprint_options["coalesce"] = True
+    if output_compression and output_format == PARQUET_FORMAT:
+        console.print("[yellow]Parquet output is compressed already; ignoring --output-compression[/yellow]")
+        output_compression = None
+    if output_compression:
+        fingerprint_options["output_compression"] = output_compression.value
+    fingerprints = {config.stem: manifest.fingerprint(config, fingerprint_options) for config in transform_configs}
+    skipped = []
+    if not force:
+        skipped = [
+            JobResult(name=config.stem, returncode=0, elapsed=0.0, skipped=True)
+            for config in transform_configs
+            if manifest.is_current(config.stem, fingerprints[config.stem], Path(output_dir))
+        ]
+        for result in skipped:
+            console.print(f"[dim]Skipping {result.name}: inputs unchanged since its outputs were written[/dim]")
+        skipped_names = {result.name for result in skipped}
+        transform_configs = [config for config in transform_configs if config.stem not in skipped_names]
+    if not transform_configs:
+        print_job_summary("Transforms", skipped)
+        if metrics is not None:
+            metrics.extend(job_metrics(r, "transform", configs_by_name[r.name], Path(output_dir)) for r in skipped)
+        console.print(f"[bold]Transforms completed: {total}/{total} successful (all up to date)[/bold]")
+        return total
+
+    options = TransformOptions(
+        output_format=output_format,
+        limit=limit,
+        progress=progress,
+        stream=stream,
+        validate_sample=validate_sample,
+        trace_dir=str(tracer.parts_dir) if tracer else None,
+        pipeline=pipeline,
+        queue_size=queue_size,
+        cache=cache,
+        output_compression=output_compression.value if output_compression else None,
+    )
+    in_process = (
+        stream or shard or validate_sample or pipeline or cache or output_compression or output_format == PARQUET_FORMAT
+    )
+    if executor == Executor.subprocess and in_process:
+        console.print(
+            "[yellow]Streaming readers, shards, sampled validation, pipelines, the input cache, compressed output "
+            "and Parquet output run in-process, using --executor worker[/yellow]"
+        )
+        executor = Executor.worker
     
-    console.print(Panel(f"[bold]Running {len(transform_configs)} transforms[/bold]"))
-    
-    success_count = 0
+    # Shards of one transform can run side by side, so only unsharded runs are capped at one job per config
+    jobs = max(1, jobs if shard else min(jobs, len(transform_configs)))
+    parallel = f" ({jobs} at a time)" if jobs > 1 else ""
+    console.print(Panel(f"[bold]Running {len(transform_configs)} transforms{parallel}[/bold]"))
+
+    # Start the largest inputs first so they overlap with the cheap transforms
+    if jobs > 1:
+        transform_configs = sorted(transform_configs, key=config_input_size, reverse=True)
+
+    transform_jobs = []
     for config in transform_configs:
+        staging_dir = staging_path(output_dir, config.stem)
         cmd = ["uv", "run", "koza", "transform", str(config)]
-        cmd.extend(["--output-dir", output_dir])
+        cmd.extend(["--output-dir", str(staging_dir)])
         cmd.extend(["--output-format", output_format])
         if limit:
             cmd.extend(["--limit", str(limit)])
         if progress:
             cmd.append("--progress")
-            
-        transform_name = config.parent.name
-        if run_command(cmd, f"Transform {transform_name}"):
-            success_count += 1
-    
-    console.print(f"[bold]Transforms completed: {success_count}/{len(transform_configs)} successful[/bold]")
+        transform_jobs.append(Job(name=config.stem, cmd=cmd, staging_dir=staging_dir, config=config))
+
+    def on_start(job: Job):
+        console.print(f"[bold blue]Running:[/bold blue] Transform {job.name}")
+        if executor == Executor.subprocess:
+            console.print(f"[dim]Command: {' '.join(job.cmd)}[/dim]")
+        if tracer:
+            tracer.begin(job.name, f"transform {job.name}", "transform", f"transform {job.name}")
+
+    def on_done(result: JobResult):
+        if tracer:
+            tracer.end(result.name, ok=result.ok, rows_read=result.rows_read)
+        if result.ok and coalesce:
+            config = configs_by_name[result.name]
+            with traced(tracer, f"coalesce {result.name}", cat="coalesce", lane=f"transform {result.name}"):
+                coalesced = coalesce_outputs(Path(output_dir), [load_config(config)["name"]], update_manifest=False)
+            print_coalesced(coalesced)
+        if result.ok:
+            outputs = transform_outputs(configs_by_name[result.name], Path(output_dir))
+            manifest.record(result.name, fingerprints[result.name], outputs)
+            manifest.save()
+            console.print(f"[green]✓ Transform {result.name} completed successfully in {result.elapsed:.1f}s[/green]\n")
+        else:
+            log = f" (see {result.log_file})" if result.log_file else ""
+            console.print(f"[red]✗ Transform {result.name} failed with exit code {result.returncode}{log}[/red]\n")
+
+    if executor == Executor.worker:
+        log_dir = Path(output_dir) / "logs" if jobs > 1 else None
+
+        with warm_pool(pool, jobs) as workers:
+
+            def submit(job: Job, log_file: Optional[str]):
+                return workers.executor.submit(run_transform, str(job.config), str(job.staging_dir), options, log_file)
+
+            if shard:
+                results = run_sharded(workers, transform_jobs, Path(output_dir), options, log_dir, on_start, on_done)
+            else:
+                results = workers.run(transform_jobs, Path(output_dir), submit, log_dir, on_start, on_done)
+    else:
+        results = run_jobs(transform_jobs, Path(output_dir), max_workers=jobs, on_start=on_start, on_done=on_done)
+    results = skipped + results
+    print_job_summary("Transforms", results)
+    if metrics is not None:
+        metrics.extend(job_metrics(r, "transform", configs_by_name[r.name], Path(output_dir)) for r in results)
+
+    success_count = sum(1 for result in results if result.ok)
+    console.print(f"[bold]Transforms completed: {success_count}/{total} successful[/bold]")
     return success_count
 
 
+def print_coalesced(results: List[CoalesceResult]):
+    for result in results:
+        if result.coalesced:
+            spilled = f", {result.runs} runs spilled" if result.runs else ""
+            console.print(
+                f"  [green]✓[/green] {result.path.name}: {result.rows:,} edges coalesced into {result.edges:,}{spilled}"
+            )
+        else:
+            console.print(f"  [dim]{result.path.name}: no duplicate edges[/dim]")
+
+
+def print_job_summary(title: str, results: List[JobResult]):
+    """Print a table of per-job exit status and wall time."""
+    table = Table(title=title)
+    table.add_column("Name")
+    table.add_column("Status")
+    table.add_column("Exit code", justify="right")
+    table.add_column("Time (s)", justify="right")
+    for result in results:
+        if result.skipped:
+            status = "[dim]skipped[/dim]"
+        else:
+            status = "[green]ok[/green]" if result.ok else "[red]failed[/red]"
+        table.add_row(result.name, status, str(result.returncode), f"{result.elapsed:.1f}")
+    console.print(table)
+
+
+def save_metrics(records: List[JobMetrics], output_dir: str, textfile: Optional[Path] = None):
+    """Append job metrics to the output directory's metrics.jsonl, and write them as a Prometheus textfile."""
+    if not records:
+        return
+    path = append_metrics(records, Path(output_dir))
+    console.print(f"[dim]Metrics appended to {path}[/dim]")
+    if textfile:
+        write_prometheus(records, textfile)
+        console.print(f"[dim]Prometheus metrics written to {textfile}[/dim]")
+
+
+def print_metrics_summary(records: List[JobMetrics]):
+    """Print a table of every job's wall time, CPU time, peak RSS, rows and entities."""
+
+    def number(value: Optional[float], scale: float = 1, digits: int = 0) -> str:
+        return "" if value is None else f"{value / scale:,.{digits}f}"
+
+    table = Table(title="Job metrics")
+    table.add_column("Name")
+    table.add_column("Kind")
+    table.add_column("Status")
+    for column in ["Wall (s)", "CPU (s)", "Peak RSS (MB)", "Rows read", "Skipped", "Nodes", "Edges", "Rows/s"]:
+        table.add_column(column, justify="right")
+    for record in records:
+        table.add_row(
+            record.name,
+            record.kind,
+            record.status,
+            number(record.wall_seconds, digits=1),
+            number(record.cpu_seconds, digits=1),
+            number(record.peak_rss_bytes, 1 << 20),
+            number(record.rows_read),
+            number(record.rows_skipped),
+            number(record.nodes_written),
+            number(record.edges_written),
+            number(record.rows_per_second),
+        )
+    console.print(table)
+
+
 @app.command()
 def transform(
     output_dir: str = typer.Option("output", help="Output directory for transformed data"),
-    output_format: str = typer.Option("tsv", help="Output format (tsv, jsonl, kgx)"),
+    output_format: str = typer.Option("tsv", help="Output format (tsv, jsonl, kgx, parquet)"),
     limit: Optional[int] = typer.Option(None, help="Number of rows to process per transform"),
     progress: bool = typer.Option(False, help="Show progress bars"),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Number of transforms to run at the same time"),
+    executor: Executor = typer.Option(Executor.subprocess, help="Run transforms as subprocesses or on warm workers"),
+    stream: bool = typer.Option(
+        False, help="Stream JSON inputs record by record and read only the projected columns of TSV inputs"
+    ),
+    shard: bool = typer.Option(False, help="Run each input file of a transform as its own job and merge the outputs"),
+    force: bool = typer.Option(False, help="Rerun transforms even if their inputs are unchanged"),
+    validate_sample: Optional[int] = typer.Option(
+        None, help="Build biolink objects without validation, fully validating one in this many"
+    ),
+    metrics_textfile: Optional[Path] = typer.Option(
+        None, help="Also write the job metrics to this Prometheus textfile (e.g. for node_exporter)"
+    ),
+    profile: Optional[ProfileMode] = typer.Option(
+        None, help="Profile the transforms one by one in this process instead, writing to <output-dir>/profiles"
+    ),
+    configs: Optional[List[str]] = typer.Option(
+        None, "--config", help="With --profile, profile only this transform (repeatable)"
+    ),
+    coalesce: bool = typer.Option(
+        False, help="Coalesce edges that differ only in publications and evidence into one edge"
+    ),
+    pipeline: bool = typer.Option(
+        False, help="Read and write each transform's data on threads of their own, overlapping with the transform"
+    ),
+    queue_size: int = typer.Option(
+        PIPELINE_QUEUE_SIZE, help="With --pipeline, batches each reader and writer queue holds"
+    ),
+    cache: bool = typer.Option(
+        False, help="Read inputs from a cache of their decoded rows, caching each file's rows on its first read"
+    ),
+    output_compression: Optional[OutputCompression] = typer.Option(
+        None, help="Compress TSV and JSON Lines outputs as they are written, on threads of their own"
+    ),
+):
+    """
+    Run all discovered transforms, skipping those whose inputs are unchanged since their last run.
+
+    The metrics of every transform are appended to metrics.jsonl in the output directory.
+    With --profile, each transform (or each given with --config) is profiled
+    instead, and its outputs are discarded; combine with --limit to profile a slice.
+    """
+    if profile:
+        options = TransformOptions(
+            output_format=output_format,
+            limit=limit,
+            stream=stream,
+            validate_sample=validate_sample,
+            pipeline=pipeline,
+            queue_size=queue_size,
+            cache=cache,
+            output_compression=output_compression.value if output_compression else None,
+        )
+        if not run_profiles(profile, Path(output_dir), options, configs):
+            sys.exit(1)
+        return
+    metrics: List[JobMetrics] = []
+    run_transforms(
+        output_dir,
+        output_format,
+        limit,
+        progress,
+        jobs,
+        executor,
+        stream=stream,
+        shard=shard,
+        force=force,
+        validate_sample=validate_sample,
+        metrics=metrics,
+        coalesce=coalesce,
+        pipeline=pipeline,
+        queue_size=queue_size,
+        cache=cache,
+        output_compression=output_compression,
+    )
+    save_metrics(metrics, output_dir, metrics_textfile)
+
+
+def run_profiles(
+    mode: ProfileMode, output_dir: Path, options: TransformOptions, names: Optional[List[str]] = None
+) -> bool:
+    """Profile the transform configs with the given names, or all of them. Returns whether all of them succeeded."""
+    transform_configs = discover_transform_configs()
+    if names:
+        unknown = set(names) - {config.stem for config in transform_configs}
+        if unknown:
+            console.print(f"[red]Unknown transform configs: {', '.join(sorted(unknown))}[/red]")
+            return False
+        transform_configs = [config for config in transform_configs if config.stem in names]
+    limit = f", {options.limit} rows each" if options.limit else ""
+    console.print(Panel(f"[bold]Profiling {len(transform_configs)} transforms ({mode.value}{limit})[/bold]"))
+
+    success = True
+    for config in transform_configs:
+        console.print(f"[bold blue]Profiling:[/bold blue] Transform {config.stem}")
+        try:
+            written, elapsed = profile_transform(config, output_dir, mode, options)
+        except Exception as e:
+            console.print(f"[red]✗ Profiling {config.stem} failed: {e}[/red]\n")
+            success = False
+            continue
+        for path in written:
+            console.print(f"  • {path}")
+        console.print(f"[green]✓ Profiled {config.stem} in {elapsed:.1f}s[/green]\n")
+    return success
+
+
+def run_report(output_dir: str = "output", threads: Optional[int] = None) -> bool:
+    """Write the node and edge reports of every transform output. Returns success status."""
+    console.print(Panel("[bold]Generating reports[/bold]"))
+    start = time.perf_counter()
+    try:
+        reports = write_reports(Path(output_dir), threads=threads)
+    except Exception as e:
+        console.print(f"[red]✗ Generating reports failed: {e}[/red]\n")
+        return False
+    for path in reports:
+        console.print(f"  • {path}")
+    console.print(f"[green]✓ {len(reports)} reports written in {time.perf_counter() - start:.1f}s[/green]\n")
+    return True
+
+
+@app.command()
+def report(
+    output_dir: str = typer.Option("output", help="Directory holding the transform outputs"),
+    threads: Optional[int] = typer.Option(None, help="DuckDB threads (default: one per core)"),
 ):
-    """Run all discovered transforms."""
-    run_transforms(output_dir, output_format, limit, progress)
+    """Count the categories, prefixes and predicates of every transform's nodes and edges."""
+    if not run_report(output_dir, threads):
+        sys.exit(1)
+
+
+@app.command()
+def coalesce(
+    output_dir: str = typer.Option("output", help="Directory holding the transform outputs"),
+    names: Optional[List[str]] = typer.Option(
+        None, "--name", help="Only coalesce the edges of this output name, e.g. alliance_disease (repeatable)"
+    ),
+    merge_columns: List[str] = typer.Option(
+        MERGE_COLUMNS, "--merge-column", help="List columns whose values are merged rather than grouped on"
+    ),
+    max_groups: int = typer.Option(MAX_GROUPS, help="Edges held in memory before spilling sorted runs to disk"),
+):
+    """Coalesce edges that differ only in their merged columns into one edge, in every edge file."""
+    console.print(Panel("[bold]Coalescing duplicate edges[/bold]"))
+    start = time.perf_counter()
+    try:
+        results = coalesce_outputs(Path(output_dir), names or None, merge_columns, max_groups)
+    except Exception as e:
+        console.print(f"[red]✗ Coalescing failed: {e}[/red]\n")
+        sys.exit(1)
+    print_coalesced(results)
+    rows = sum(result.rows for result in results)
+    edges = sum(result.edges for result in results)
+    console.print(f"[green]✓ {rows:,} edges coalesced into {edges:,} in {time.perf_counter() - start:.1f}s[/green]\n")
+
+
+def run_rdf(output_dir: str = "output", jobs: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> bool:
+    """Export every transform's nodes and edges as gzipped N-Triples. Returns success status."""
+    console.print(Panel("[bold]Exporting RDF[/bold]"))
+    start = time.perf_counter()
+    try:
+        counts = export_rdf(Path(output_dir), max_workers=jobs, chunk_size=chunk_size)
+    except Exception as e:
+        console.print(f"[red]✗ Exporting RDF failed: {e}[/red]\n")
+        return False
+    for path, chunks in counts.items():
+        console.print(f"  • {path}: {chunks} chunks")
+    console.print(f"[green]✓ RDF exported in {time.perf_counter() - start:.1f}s[/green]\n")
+    return True
+
+
+@app.command()
+def rdf(
+    output_dir: str = typer.Option("output", help="Directory holding the transform outputs"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", help="Number of chunks to convert at the same time"),
+    chunk_size: int = typer.Option(CHUNK_SIZE, help="Bytes of TSV or JSON Lines converted per chunk"),
+):
+    """Write {name}.nt.gz N-Triples for every transform's nodes and edges, converting chunks in parallel."""
+    if not run_rdf(output_dir, jobs, chunk_size):
+        sys.exit(1)
 
 
 @app.command()
@@ -160,52 +779,253 @@ def test(
     
     console.print(Panel("[bold]Running all tests[/bold]"))
     
-    if run_command(cmd, "Test suite"):
+    if run_command(cmd, "Test suite").ok:
         console.print("[green]All tests completed[/green]")
     else:
         console.print("[red]Some tests failed[/red]")
         sys.exit(1)
 
 
+@app.command()
+def benchmark(
+    transforms: Optional[List[str]] = typer.Option(
+        None, "--transform", "-t", help="Transform to benchmark; repeat for several (default: all)"
+    ),
+    rows: int = typer.Option(BENCHMARK_ROWS, help="Rows in each transform's corpus"),
+    repeat: int = typer.Option(BENCHMARK_REPEAT, help="Passes over each corpus; the fastest is reported"),
+    validate_sample: Optional[int] = typer.Option(
+        None, help="Build biolink objects without validation, fully validating one in this many"
+    ),
+    output: Optional[Path] = typer.Option(None, help="Write the results as JSON to this file"),
+    baseline: Optional[Path] = typer.Option(None, help="Compare against the results stored in this JSON file"),
+    threshold: float = typer.Option(
+        REGRESSION_THRESHOLD, help="Fraction a transform may fall behind the baseline before it is a regression"
+    ),
+):
+    """Measure the rows/sec and allocations per row of every transform_record function."""
+    unknown = [name for name in transforms or [] if name not in CORPORA]
+    if unknown:
+        console.print(f"[red]Unknown transforms: {', '.join(unknown)} (choose from {', '.join(CORPORA)})[/red]")
+        sys.exit(1)
+
+    console.print(Panel("[bold]Benchmarking transforms[/bold]"))
+    results = run_benchmarks(transforms, rows, repeat, validate_sample)
+
+    table = Table(title=f"transform_record over {rows:,} rows")
+    table.add_column("Transform")
+    table.add_column("Rows/s", justify="right")
+    table.add_column("Entities", justify="right")
+    table.add_column("Bytes/row", justify="right")
+    for name, result in results["transforms"].items():
+        table.add_row(
+            name,
+            f"{result['rows_per_second']:,.0f}",
+            f"{result['entities']:,}",
+            f"{result['alloc_bytes_per_row']:,.0f}",
+        )
+    console.print(table)
+
+    if output:
+        write_results(results, output)
+        console.print(f"Results written to {output}")
+    if baseline:
+        if not baseline.exists():
+            console.print(f"[yellow]No baseline at {baseline}; nothing to compare[/yellow]")
+            return
+        regressions = compare(results, read_results(baseline), threshold)
+        if regressions:
+            console.print(f"[red]✗ Regressions against {baseline} (threshold {threshold:.0%}):[/red]")
+            for regression in regressions:
+                console.print(f"  • {regression}")
+            sys.exit(1)
+        console.print(f"[green]✓ Within {threshold:.0%} of {baseline}[/green]")
+
+
+@app.command()
+def synthesize(
+    scale: float = typer.Option(1.0, help="Size of the release to generate, as a multiple of the current one"),
+    data_dir: str = typer.Option("data", help="Directory to write the synthetic files to"),
+    seed: int = typer.Option(SEED, help="Seed of the random streams; the same seed and scale give the same files"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", help="Number of files to write at the same time"),
+):
+    """Write synthetic BGI, AGM, VARIANT-ALLELE, DISEASE, PHENOTYPE and EXPRESSION files with consistent IDs."""
+    console.print(Panel(f"[bold]Generating a synthetic release at {scale:g}x[/bold]"))
+    start = time.perf_counter()
+    counts = generate(Path(data_dir), scale, seed, max_workers=jobs)
+    for path, count in counts.items():
+        console.print(f"  • {path}: {count:,} records")
+    console.print(f"[green]✓ {len(counts)} files written in {time.perf_counter() - start:.1f}s[/green]\n")
+
+
+@app.command(name="scale-test")
+def scale_test(
+    scales: Optional[List[float]] = typer.Option(
+        None, "--scale", "-s", help="Release size to run at; repeat for several (default: 1, 5 and 10)"
+    ),
+    workdir: Path = typer.Option(Path("scale-test"), help="Directory for the workspace of each scale"),
+    output: Optional[Path] = typer.Option(None, help="Write the measurements as JSON to this file"),
+    output_format: str = typer.Option("tsv", help="Output format of the transforms"),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Number of transforms to run at the same time"),
+    shard: bool = typer.Option(False, help="Run each input file of a transform as its own job"),
+    seed: int = typer.Option(SEED, help="Seed of the synthetic releases"),
+    keep: bool = typer.Option(False, help="Keep each scale's data and outputs"),
+):
+    """Run the whole pipeline on synthetic releases and record the wall time and peak RSS of every stage."""
+    transform_args = ["--output-format", output_format, "--jobs", str(jobs)] + (["--shard"] if shard else [])
+    console.print(Panel(f"[bold]Scale test at {', '.join(f'{s:g}x' for s in scales or SCALES)}[/bold]"))
+    results = run_scale_test(scales or SCALES, workdir, transform_args, seed, keep)
+
+    table = Table(title="Pipeline stages by scale")
+    table.add_column("Scale", justify="right")
+    table.add_column("Stage")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Peak RSS (MB)", justify="right")
+    table.add_column("Growth (time / RSS)", justify="right")
+    failed = []
+    largest = max(run["scale"] for run in results["scales"])
+    for run in results["scales"]:
+        for stage in run["stages"]:
+            exponents = results["exponents"].get(stage["stage"], {}) if run["scale"] == largest else {}
+            growth = " / ".join(f"{exponents[m]:.2f}" for m in ("seconds", "peak_rss_mb") if m in exponents)
+            table.add_row(
+                f"{run['scale']:g}x", stage["stage"], f"{stage['seconds']:,.1f}", f"{stage['peak_rss_mb']:,.0f}", growth
+            )
+            if stage["returncode"] != 0:
+                failed.append(f"{stage['stage']} at {run['scale']:g}x (see {run['workspace']}/logs)")
+    console.print(table)
+
+    if output:
+        write_scale_results(results, output)
+        console.print(f"Results written to {output}")
+    for message in superlinear(results["exponents"]):
+        console.print(f"[yellow]⚠ Superlinear: {message}[/yellow]")
+    if failed:
+        console.print(f"[red]✗ Failed: {', '.join(failed)}[/red]")
+        sys.exit(1)
+
+
 @app.command() 
 def run(
     output_dir: str = typer.Option("output", help="Output directory"),
     download_first: bool = typer.Option(True, help="Download data before transforming"),
     run_tests: bool = typer.Option(False, help="Run tests after transforms"),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Number of transforms to run at the same time"),
+    executor: Executor = typer.Option(Executor.subprocess, help="Run transforms as subprocesses or on warm workers"),
+    stream: bool = typer.Option(
+        False, help="Stream JSON inputs record by record and read only the projected columns of TSV inputs"
+    ),
+    shard: bool = typer.Option(False, help="Run each input file of a transform as its own job and merge the outputs"),
+    force: bool = typer.Option(False, help="Rerun transforms even if their inputs are unchanged"),
+    validate_sample: Optional[int] = typer.Option(
+        None, help="Build biolink objects without validation, fully validating one in this many"
+    ),
+    connections: Optional[int] = typer.Option(
+        None, help="Download with the built-in resumable HTTP client, using this many connections at a time"
+    ),
+    metrics_textfile: Optional[Path] = typer.Option(
+        None, help="Also write the job metrics to this Prometheus textfile (e.g. for node_exporter)"
+    ),
+    trace: Optional[Path] = typer.Option(
+        None, "--trace", help="Write a timeline of every phase and config to this Chrome trace / Perfetto JSON file"
+    ),
+    coalesce: bool = typer.Option(
+        False, help="Coalesce edges that differ only in publications and evidence into one edge"
+    ),
+    pipeline: bool = typer.Option(
+        False, help="Read and write each transform's data on threads of their own, overlapping with the transform"
+    ),
+    queue_size: int = typer.Option(
+        PIPELINE_QUEUE_SIZE, help="With --pipeline, batches each reader and writer queue holds"
+    ),
+    cache: bool = typer.Option(
+        False, help="Read inputs from a cache of their decoded rows, caching each file's rows on its first read"
+    ),
+    output_compression: Optional[OutputCompression] = typer.Option(
+        None, help="Compress TSV and JSON Lines outputs as they are written, on threads of their own"
+    ),
 ):
-    """Run the complete ingest pipeline: download → transform → (optionally test)."""
+    """Run the complete ingest pipeline: download → lookup tables → transform → report → (optionally test)."""
     console.print(Panel("[bold green]Starting complete ingest pipeline[/bold green]"))
     
     success = True
+    metrics: List[JobMetrics] = []
+    tracer = Tracer(trace) if trace else None
+    # One pool of warm workers serves both the download and transform phases
+    pool = WarmPool(max_workers=jobs) if executor == Executor.worker else None
     
     # Download phase
     if download_first:
         try:
-            success_count = run_downloads(output_dir=output_dir)
+            with traced(tracer, "download"):
+                success_count = run_downloads(
+                    output_dir=output_dir,
+                    executor=executor,
+                    pool=pool,
+                    connections=connections,
+                    metrics=metrics,
+                    tracer=tracer,
+                )
             if success_count == 0:
                 success = False
         except Exception as e:
             console.print(f"[red]Download phase failed: {e}[/red]")
             success = False
     
+    # Lookup tables needed by the genotype and phenotype transforms
+    if success and download_first:
+        with traced(tracer, "post-download"):
+            success = run_post_download()
+
     # Transform phase
     if success:
         try:
-            success_count = run_transforms(output_dir=output_dir)
+            with traced(tracer, "transform"):
+                success_count = run_transforms(
+                    output_dir=output_dir,
+                    jobs=jobs,
+                    executor=executor,
+                    pool=pool,
+                    stream=stream,
+                    shard=shard,
+                    force=force,
+                    validate_sample=validate_sample,
+                    metrics=metrics,
+                    tracer=tracer,
+                    coalesce=coalesce,
+                    pipeline=pipeline,
+                    queue_size=queue_size,
+                    cache=cache,
+                    output_compression=output_compression,
+                )
             if success_count == 0:
                 success = False
         except Exception as e:
             console.print(f"[red]Transform phase failed: {e}[/red]")
             success = False
     
+    if pool is not None:
+        pool.executor.shutdown()
+        print_startup_savings(pool)
+    if metrics:
+        print_metrics_summary(metrics)
+        save_metrics(metrics, output_dir, metrics_textfile)
+
+    # Report phase
+    if success:
+        with traced(tracer, "report"):
+            success = run_report(output_dir)
+
     # Test phase (optional)
     if success and run_tests:
         try:
-            test()
+            with traced(tracer, "test"):
+                test()
         except Exception as e:
             console.print(f"[red]Test phase failed: {e}[/red]")
             success = False
-    
+
+    if tracer:
+        console.print(f"[bold]Trace:[/bold] {tracer.save()} (open in ui.perfetto.dev or chrome://tracing)")
     if success:
         console.print(Panel("[bold green]Pipeline completed successfully![/bold green]"))
     else:
@@ -0,0 +1,336 @@
+"""
+Coalesce duplicate edges, which differ only in their supporting lists.
+
+Transforms emit one association per source record, so the same statement
+recurs once for every reference that makes it: a gene expressed in the same
+anatomy at the same stage by the same assay, or a model of the same disease
+with the same evidence. Coalescing groups the rows of an edge file on every
+column except `id` and the merged columns, and writes one row per group:
+- its merged columns hold the values of the whole group, in the order they
+  first occur;
+- its id is that of its only row, or, for a group of several rows, is
+  recomputed by ids.association_id from its columns and merged values, so it
+  doesn't depend on the order of the rows. The prefix of the first row's id
+  is kept.
+The merged columns are publications and has_evidence by default. qualifiers
+stays part of the key, since expression keeps the assay there and edges with
+different assays are different statements.
+
+Groups are collected in a dict while at most max_groups of them are held.
+Beyond that, the partial groups are written to disk as a run sorted by key
+and the dict starts over. The runs are then merged on their keys, combining
+the partial groups of each key. Either way the groups are written in key
+order, so the output doesn't depend on max_groups. A file without duplicates
+is left as it is.
+"""
+
+import heapq
+import json
+import os
+import pickle
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .compression import open_output
+from .ids import association_id
+from .manifest import Manifest
+from .report import OUTPUT_SUFFIXES
+from .scheduler import staging_path
+
+MERGE_COLUMNS = ["publications", "has_evidence"]
+
+# Groups held in memory before the partial groups are spilled to a sorted run on disk
+MAX_GROUPS = 1_000_000
+
+PARQUET_BATCH_SIZE = 100_000
+
+# Columns passed to association_id on their own; every other column is a qualifier
+ID_COLUMNS = ["id", "subject", "predicate", "object", "publications", "primary_knowledge_source"]
+
+# A group: its first row, the values seen in each of the merged columns, in order, and its number of rows
+Group = Tuple[Any, List[Dict[str, None]], int]
+
+
+@dataclass
+class CoalesceResult:
+    """Rows read from an edge file and the edges written for them."""
+
+    path: Path
+    rows: int
+    edges: int
+    runs: int = 0
+
+    @property
+    def coalesced(self) -> bool:
+        return self.edges < self.rows
+
+
+def _coalesced_id(first_id: str, values: Dict[str, List[str]]) -> str:
+    """The ID of an edge coalesced from several rows, from the values of each of its columns."""
+    prefix, _, _ = first_id.rpartition(":")
+
+    def single(column: str) -> str:
+        return (values.get(column) or [""])[0]
+
+    qualifiers = [
+        value for column, column_values in values.items() if column not in ID_COLUMNS for value in column_values
+    ]
+    id = association_id(
+        subject=single("subject"),
+        predicate=single("predicate"),
+        object=single("object"),
+        qualifiers=qualifiers,
+        publications=values.get("publications"),
+        source=single("primary_knowledge_source"),
+    )
+    return f"{prefix}:{id}" if prefix else id
+
+
+class _TSV:
+    """Rows of a TSV edge file as lists of strings, with lists joined by "|"."""
+
+    def __init__(self, path: Path, merge_columns: Sequence[str]):
+        self.path = path
+        with open_output(path) as fh:
+            self.header = fh.readline().rstrip("\r\n").split("\t")
+        excluded = {"id", *merge_columns}
+        self.key_columns = [i for i, column in enumerate(self.header) if column not in excluded]
+        self.merge_columns = [self.header.index(column) for column in merge_columns if column in self.header]
+
+    def rows(self) -> Iterator[List[str]]:
+        with open_output(self.path) as fh:
+            fh.readline()
+            for line in fh:
+                yield line.rstrip("\r\n").split("\t")
+
+    def key(self, row: List[str]) -> str:
+        return "\t".join([row[i] for i in self.key_columns])
+
+    def merged(self, row: List[str]) -> List[List[str]]:
+        return [row[i].split("|") if row[i] else [] for i in self.merge_columns]
+
+    def with_merged(self, row: List[str], values: List[List[str]], new_id: bool = False) -> List[str]:
+        row = list(row)
+        for i, merged in zip(self.merge_columns, values, strict=True):
+            row[i] = "|".join(merged)
+        if new_id and "id" in self.header:
+            i = self.header.index("id")
+            row[i] = _coalesced_id(
+                row[i], {column: value.split("|") for column, value in zip(self.header, row, strict=True)}
+            )
+        return row
+
+    def write(self, path: Path, rows: Iterable[List[str]]) -> None:
+        with open_output(path, "wt") as fh:
+            fh.write("\t".join(self.header) + "\n")
+            for row in rows:
+                fh.write("\t".join(row) + "\n")
+
+
+class _Records:
+    """Rows of a JSON Lines or Parquet edge file as dicts, with lists as lists."""
+
+    def __init__(self, path: Path, merge_columns: Sequence[str]):
+        self.path = path
+        self.parquet = path.suffix == ".parquet"
+        self.merge_columns = list(merge_columns)
+        self.excluded = {"id", *merge_columns}
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        if self.parquet:
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(self.path).iter_batches(PARQUET_BATCH_SIZE):
+                yield from batch.to_pylist()
+            return
+        with open_output(self.path) as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+    def key(self, row: Dict[str, Any]) -> str:
+        return json.dumps({k: v for k, v in row.items() if k not in self.excluded}, sort_keys=True)
+
+    def merged(self, row: Dict[str, Any]) -> List[List[Any]]:
+        values = [row.get(column) for column in self.merge_columns]
+        return [[] if value is None else value if isinstance(value, list) else [value] for value in values]
+
+    def with_merged(self, row: Dict[str, Any], values: List[List[Any]], new_id: bool = False) -> Dict[str, Any]:
+        row = dict(row)
+        for column, merged in zip(self.merge_columns, values, strict=True):
+            if merged or row.get(column) is not None:
+                row[column] = merged
+        if new_id and row.get("id"):
+            lists = {column: value if isinstance(value, list) else [value] for column, value in row.items()}
+            row["id"] = _coalesced_id(
+                row["id"], {column: [str(v) for v in value if v is not None] for column, value in lists.items()}
+            )
+        return row
+
+    def write(self, path: Path, rows: Iterable[Dict[str, Any]]) -> None:
+        if self.parquet:
+            self._write_parquet(path, rows)
+            return
+        with open_output(path, "wt") as fh:
+            for row in rows:
+                fh.write(json.dumps(row) + "\n")
+
+    def _write_parquet(self, path: Path, rows: Iterable[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from .writers import PARQUET_COMPRESSION
+
+        schema = pq.ParquetFile(self.path).schema_arrow
+        with pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == PARQUET_BATCH_SIZE:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+def _add(seen: List[Dict[str, None]], values: List[List[Any]]) -> None:
+    for merged, new in zip(seen, values, strict=True):
+        for value in new:
+            merged.setdefault(value)
+
+
+def _spill(groups: Dict[str, Group], path: Path) -> Path:
+    """Write groups to a run file sorted by key."""
+    with open(path, "wb") as fh:
+        for key in sorted(groups):
+            row, seen, size = groups[key]
+            pickle.dump((key, row, [list(merged) for merged in seen], size), fh, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path: Path) -> Iterator[tuple]:
+    with open(path, "rb") as fh:
+        while True:
+            try:
+                yield pickle.load(fh)  # noqa: S301 - runs are written by this process
+            except EOFError:
+                return
+
+
+def _merge_runs(runs: List[Path]) -> Iterator[Group]:
+    """The groups of sorted runs in key order, combining the partial groups of each key in run order."""
+    current: Optional[str] = None
+    group: Optional[Group] = None
+    # Equal keys come out in the order of the runs, which were spilled in row order
+    for key, row, values, size in heapq.merge(*(_read_run(run) for run in runs), key=lambda entry: entry[0]):
+        if key != current:
+            if group is not None:
+                yield group
+            current, group = key, (row, [dict.fromkeys(merged) for merged in values], size)
+        else:
+            _add(group[1], values)
+            group = (group[0], group[1], group[2] + size)
+    if group is not None:
+        yield group
+
+
+def coalesce_file(
+    path: Path,
+    work_dir: Path,
+    merge_columns: Sequence[str] = MERGE_COLUMNS,
+    max_groups: int = MAX_GROUPS,
+) -> CoalesceResult:
+    """
+    Coalesce the duplicate edges of one edge file, replacing the file if it had any.
+
+    work_dir holds the spilled runs and the new file until it replaces path,
+    so it should be on the same filesystem.
+    """
+    records = path.suffix == ".parquet" or ".jsonl" in path.suffixes
+    edges = _Records(path, merge_columns) if records else _TSV(path, merge_columns)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    groups: Dict[str, Group] = {}
+    runs: List[Path] = []
+    rows = 0
+    for row in edges.rows():
+        rows += 1
+        key = edges.key(row)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = (row, [dict.fromkeys(values) for values in edges.merged(row)], 1)
+            if len(groups) >= max_groups:
+                runs.append(_spill(groups, work_dir / f"run-{len(runs)}"))
+                groups.clear()
+        else:
+            _add(group[1], edges.merged(row))
+            groups[key] = (group[0], group[1], group[2] + 1)
+
+    if runs:
+        if groups:
+            runs.append(_spill(groups, work_dir / f"run-{len(runs)}"))
+            groups.clear()
+        merged_groups: Iterable[Group] = _merge_runs(runs)
+    elif len(groups) == rows:
+        return CoalesceResult(path, rows, rows)
+    else:
+        merged_groups = (groups[key] for key in sorted(groups))
+
+    count = 0
+
+    def coalesced_rows():
+        nonlocal count
+        for row, seen, size in merged_groups:
+            count += 1
+            yield edges.with_merged(row, [list(merged) for merged in seen], new_id=size > 1)
+
+    output = work_dir / path.name
+    edges.write(output, coalesced_rows())
+    for run in runs:
+        run.unlink()
+    if count < rows:
+        os.replace(output, path)
+    else:
+        output.unlink()
+    return CoalesceResult(path, rows, count, len(runs))
+
+
+def edge_files(output_dir: Path, name: str) -> List[Path]:
+    """The edge files of a transform in output_dir, in every output format."""
+    return [
+        path
+        for path in sorted(output_dir.glob(f"{name}_edges.*"))
+        if path.is_file() and path.name[len(f"{name}_edges") :] in OUTPUT_SUFFIXES
+    ]
+
+
+def coalesce_outputs(
+    output_dir: Path,
+    names: Optional[List[str]] = None,
+    merge_columns: Sequence[str] = MERGE_COLUMNS,
+    max_groups: int = MAX_GROUPS,
+    update_manifest: bool = True,
+) -> List[CoalesceResult]:
+    """
+    Coalesce the edge files of the named transforms (by output name), or of every transform in output_dir.
+
+    The manifest's checksums of rewritten files are updated, so transforms
+    whose edges were coalesced are still current.
+    """
+    if names is None:
+        names = sorted({path.name.rpartition("_edges")[0] for path in output_dir.glob("*_edges.*")})
+    work_dir = staging_path(str(output_dir), "coalesce")
+    results = []
+    try:
+        for name in names:
+            for path in edge_files(output_dir, name):
+                results.append(coalesce_file(path, work_dir, merge_columns, max_groups))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    rewritten = [result.path for result in results if result.coalesced]
+    if update_manifest and rewritten:
+        manifest = Manifest.load(output_dir)
+        if manifest.refresh_outputs(rewritten):
+            manifest.save()
+    return results
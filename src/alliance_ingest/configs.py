@@ -0,0 +1,32 @@
+"""
+Helpers for reading koza transform configs without running them.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+
+def load_config(config: Path) -> Dict[str, Any]:
+    """Load a koza transform (or mapping) YAML as a plain dict."""
+    with open(config) as fh:
+        return yaml.safe_load(fh) or {}
+
+
+def config_input_files(config: Path) -> List[Path]:
+    """Return the reader files of a transform config, resolved against the config directory."""
+    reader = load_config(config).get("reader") or {}
+    return [(config.parent / f).resolve() for f in reader.get("files", [])]
+
+
+def mapping_files(mapping: Path) -> List[Path]:
+    """The data files of a mapping config, which list them under `reader` or at the top level."""
+    data = load_config(mapping)
+    files = (data.get("reader") or {}).get("files") or data.get("files") or []
+    return [(mapping.parent / f).resolve() for f in files]
+
+
+def config_input_size(config: Path) -> int:
+    """Total size in bytes of the input files that exist for a transform config."""
+    return sum(f.stat().st_size for f in config_input_files(config) if f.exists())
@@ -0,0 +1,131 @@
+"""
+Construction of biolink model objects with sampled validation.
+
+The biolink pydantic models validate every field of every object they are
+given, which costs more than the rest of most transforms even though most
+fields are constants or come straight from a validated upstream file. In
+trusted mode, build() instead copies a validated object of the same class and
+field shape and sets the row's fields on the copy directly.
+
+The first row of every shape (the model class and the names and types of the
+fields it is given, not of the items of list fields), and one in every
+`sample` rows, is still validated in full and compared with its trusted
+copy. After any validation failure or difference, every remaining row of the
+run is validated.
+
+Without a sample rate, build() is the plain model constructor.
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+_set = object.__setattr__
+
+
+@dataclass
+class _Template:
+    """The values of a validated object, and the fields of its shape that are given as enum members."""
+
+    values: Dict[str, Any]
+    enums: Tuple[str, ...]
+
+
+def _trusted_copy(model: Type[M], template: "_Template", fields: Dict[str, Any]) -> M:
+    """An instance of model with the template's values updated by fields, without validation."""
+    obj = model.__new__(model)
+    values = template.values.copy()
+    values.update(fields)
+    for name in template.enums:
+        values[name] = values[name].value
+    # Defaults are shared with the template, as they are assigned rather than mutated by the transforms
+    _set(obj, "__dict__", values)
+    _set(obj, "__pydantic_fields_set__", set(fields))
+    _set(obj, "__pydantic_extra__", None)
+    _set(obj, "__pydantic_private__", None)
+    return obj
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Equal and of the same type, so both are written out identically."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b, strict=True))
+    return a == b
+
+
+class Constructor:
+    """Builds model objects, validating all of them or only a sample."""
+
+    def __init__(self, sample: Optional[int] = None):
+        if sample is not None and sample < 1:
+            raise ValueError(f"Validation sample rate must be at least 1, got {sample}")
+        self.sample = sample
+        self.built = 0
+        self.validated = 0
+        # Why validation was turned back on for every row, if it was
+        self.escalated: Optional[str] = None
+        self._templates: Dict[Tuple, _Template] = {}
+
+    @property
+    def trusted(self) -> bool:
+        return self.sample is not None and self.escalated is None
+
+    def build(self, model: Type[M], fields: Dict[str, Any]) -> M:
+        self.built += 1
+        if not self.trusted:
+            self.validated += 1
+            return model(**fields)
+
+        shape = (model, tuple(fields), tuple(map(type, fields.values())))
+        template = self._templates.get(shape)
+        if template is not None and self.built % self.sample:
+            return _trusted_copy(model, template, fields)
+
+        self.validated += 1
+        try:
+            validated = model(**fields)
+        except ValidationError:
+            self.escalate(f"a {model.__name__} failed validation")
+            raise
+        if template is None:
+            enums = ()
+            if model.model_config.get("use_enum_values"):
+                enums = tuple(name for name, value in fields.items() if isinstance(value, Enum))
+            self._templates[shape] = _Template(dict(validated.__dict__), enums)
+        else:
+            trusted = _trusted_copy(model, template, fields)
+            if not (
+                trusted.__pydantic_fields_set__ == validated.__pydantic_fields_set__
+                and trusted.__dict__.keys() == validated.__dict__.keys()
+                and all(_same(trusted.__dict__[name], value) for name, value in validated.__dict__.items())
+            ):
+                self.escalate(f"a trusted {model.__name__} differed from its validated copy")
+        return validated
+
+    def escalate(self, reason: str) -> None:
+        """Validate every remaining row."""
+        if self.trusted:
+            logger.warning(f"Validating every remaining row: {reason} after {self.built} rows")
+            self.escalated = reason
+
+
+_constructor = Constructor()
+
+
+def configure(sample: Optional[int] = None) -> Constructor:
+    """Start a run that validates one in every `sample` rows, or every row without a sample rate."""
+    global _constructor
+    _constructor = Constructor(sample)
+    return _constructor
+
+
+def build(model: Type[M], **fields: Any) -> M:
+    """Build a model object from fields, in the mode of the current run."""
+    return _constructor.build(model, fields)
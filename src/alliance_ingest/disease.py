@@ -1,5 +1,3 @@
-import uuid
-
 from biolink_model.datamodel.pydanticmodel_v2 import (
     Association,
     GeneToDiseaseAssociation,
@@ -9,6 +7,9 @@ from biolink_model.datamodel.pydanticmodel_v2 import (
 from typing import Dict, List
 import koza
 
+from alliance_ingest.construct import build
+from alliance_ingest.ids import association_id
+
 #  TODO: look at row["source"] to update this map
 source_map = {
     "FB": "infores:flybase",
@@ -64,15 +65,24 @@ def transform_record(koza_transform, row: dict) -> List[Association]:
             or row.get("Modifier")):
         return []
 
-    association = AssociationClass(
-        id=str(uuid.uuid1()),
+    primary_knowledge_source = source_map[row["DBObjectID"].split(':')[0]]
+    association = build(
+        AssociationClass,
+        id=association_id(
+            subject=row["DBObjectID"],
+            predicate=predicate,
+            object=row["DOID"],
+            qualifiers=[row["EvidenceCode"]],
+            publications=[row["Reference"]],
+            source=primary_knowledge_source,
+        ),
         subject=row["DBObjectID"],
         predicate=predicate,
         object=row["DOID"],
         has_evidence=[row["EvidenceCode"]],
         # TODO: capture row["ExperimentalCondition"], probably as qualifier?
         publications=[row["Reference"]],
-        primary_knowledge_source=source_map[row["DBObjectID"].split(':')[0]],
+        primary_knowledge_source=primary_knowledge_source,
         aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
         # TODO: set KnowledgeLevelEnum and AgentType enum, it looks like there are inferred edges and that can show up in the KL/AT
         # TODO: the via_orthology association types would probably call for different KL/AT values?
@@ -0,0 +1,213 @@
+"""
+Concurrent, resumable HTTP downloads of the resources in a download.yaml.
+
+Each resource is fetched into `<local_name>.part` and moved into place once
+complete. A failed transfer keeps its part file, and the next attempt (in the
+same run or a later one) asks for the remaining bytes with a Range request.
+If-Range makes the server send the whole file again if it changed meanwhile.
+
+The ETag and Last-Modified of every completed file are kept in a
+`<local_name>.meta.json` sidecar and sent back as If-None-Match and
+If-Modified-Since, so files that are unchanged on the server are answered
+with 304 Not Modified and not transferred at all.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from email.utils import formatdate
+from http.client import HTTPException
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+
+import yaml
+
+PART_SUFFIX = ".part"
+META_SUFFIX = ".meta.json"
+
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class DownloadTask:
+    """A URL and the path it is saved to."""
+
+    url: str
+    path: Path
+
+    @property
+    def part_path(self) -> Path:
+        return self.path.with_name(self.path.name + PART_SUFFIX)
+
+    @property
+    def meta_path(self) -> Path:
+        return self.path.with_name(self.path.name + META_SUFFIX)
+
+    @property
+    def part_meta_path(self) -> Path:
+        return self.part_path.with_name(self.part_path.name + META_SUFFIX)
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a single download: downloaded, resumed, unchanged or failed."""
+
+    url: str
+    path: Path
+    status: str
+    transferred: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+
+def download_tasks(config: Path, output_dir: Path = Path(".")) -> List[DownloadTask]:
+    """Read the resources of a kghub-downloader download.yaml, saved relative to output_dir as it does."""
+    with open(config) as fh:
+        resources = yaml.safe_load(fh) or []
+    return [
+        DownloadTask(url=item["url"], path=output_dir / (item.get("local_name") or item["url"].split("/")[-1]))
+        for item in resources
+    ]
+
+
+def _read_meta(path: Path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _write_meta(path: Path, meta: Dict[str, str]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(meta, fh, indent=2)
+    os.replace(tmp, path)
+
+
+def _validators(response) -> Dict[str, str]:
+    headers = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    return {key: value for key, value in headers.items() if value}
+
+
+def _content_range_start(response) -> Optional[int]:
+    """Start offset of a `Content-Range: bytes <start>-<end>/<total>` header."""
+    content_range = response.headers.get("Content-Range", "")
+    if not content_range.startswith("bytes "):
+        return None
+    return int(content_range[len("bytes ") :].split("-", 1)[0])
+
+
+def _request(task: DownloadTask, ignore_cache: bool) -> Request:
+    """Build a conditional and/or ranged request from what is already on disk."""
+    headers = {}
+    if task.part_path.exists() and not ignore_cache:
+        part_meta = _read_meta(task.part_meta_path)
+        if part_meta.get("url") == task.url and (part_meta.get("etag") or part_meta.get("last_modified")):
+            headers["Range"] = f"bytes={task.part_path.stat().st_size}-"
+            headers["If-Range"] = part_meta.get("etag") or part_meta["last_modified"]
+    if "Range" not in headers and task.path.exists() and not ignore_cache:
+        meta = _read_meta(task.meta_path)
+        if meta.get("url") == task.url and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("url") == task.url and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        elif not meta:
+            # Downloaded before sidecars were kept: only fetch it again if it changed since
+            headers["If-Modified-Since"] = formatdate(task.path.stat().st_mtime, usegmt=True)
+    return Request(task.url, headers=headers)
+
+
+def _fetch(task: DownloadTask, ignore_cache: bool, timeout: float) -> DownloadResult:
+    """Make one attempt at a task, appending to or restarting its part file."""
+    request = _request(task, ignore_cache)
+    try:
+        response = urlopen(request, timeout=timeout)  # noqa: S310 - only http(s) URLs get here
+    except HTTPError as e:
+        if e.code == 304:
+            return DownloadResult(task.url, task.path, "unchanged")
+        if e.code == 416:
+            # The part file is no prefix of the current file; start again
+            task.part_path.unlink(missing_ok=True)
+        raise
+
+    with response:
+        validators = _validators(response)
+        offset = 0
+        if response.status == 206:
+            offset = _content_range_start(response) or 0
+            if offset != task.part_path.stat().st_size:
+                raise HTTPException(f"Server resumed at byte {offset} of {task.part_path}")
+        _write_meta(task.part_meta_path, {"url": task.url, **validators})
+
+        transferred = 0
+        with open(task.part_path, "ab" if offset else "wb") as fh:
+            while chunk := response.read(CHUNK_SIZE):
+                fh.write(chunk)
+                transferred += len(chunk)
+        expected = response.headers.get("Content-Length")
+        if expected is not None and transferred != int(expected):
+            raise HTTPException(f"Connection closed after {transferred} of {expected} bytes of {task.url}")
+
+    os.replace(task.part_path, task.path)
+    task.part_meta_path.unlink(missing_ok=True)
+    _write_meta(task.meta_path, {"url": task.url, **validators})
+    return DownloadResult(task.url, task.path, "resumed" if offset else "downloaded", transferred)
+
+
+def download(
+    task: DownloadTask,
+    ignore_cache: bool = False,
+    retries: int = 3,
+    timeout: float = 60.0,
+    backoff: float = 1.0,
+) -> DownloadResult:
+    """Download a task, retrying failed transfers from where they stopped."""
+    if urlparse(task.url).scheme not in ("http", "https"):
+        return DownloadResult(task.url, task.path, "failed", error=f"Unsupported URL scheme: {task.url}")
+    task.path.parent.mkdir(parents=True, exist_ok=True)
+    if ignore_cache:
+        task.part_path.unlink(missing_ok=True)
+        task.part_meta_path.unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        try:
+            result = _fetch(task, ignore_cache, timeout)
+            result.elapsed = time.perf_counter() - start
+            return result
+        except HTTPError as e:
+            error = f"HTTP {e.code} {e.reason}"
+            if e.code < 500 and e.code not in (408, 416, 429):
+                break
+        except (URLError, HTTPException, OSError) as e:
+            error = f"{type(e).__name__}: {e}"
+        if attempt < retries:
+            time.sleep(backoff * 2**attempt)
+    return DownloadResult(task.url, task.path, "failed", elapsed=time.perf_counter() - start, error=error)
+
+
+def download_all(
+    tasks: List[DownloadTask],
+    connections: int = 4,
+    ignore_cache: bool = False,
+    on_done: Optional[Callable[[DownloadResult], None]] = None,
+    **kwargs,
+) -> List[DownloadResult]:
+    """Download tasks over at most `connections` simultaneous connections. Results are in task order."""
+    results: Dict[int, DownloadResult] = {}
+    with ThreadPoolExecutor(max_workers=max(1, connections)) as pool:
+        futures = {pool.submit(download, task, ignore_cache, **kwargs): index for index, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_done:
+                on_done(results[futures[future]])
+    return [results[index] for index in range(len(tasks))]
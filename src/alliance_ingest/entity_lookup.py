@@ -0,0 +1,116 @@
+r"""
+Build the entity lookup tables that alliance_entity_lookup.yaml consumes.
+
+Each BGI, VARIANT-ALLELE and AGM file is read in a single streaming pass in its
+own process (in this one on a single core), and IDs are deduplicated in memory
+with a set instead of going through an external sort. The tables are written as `<id>\t<category>` lines,
+sorted by ID, exactly as the former `gunzip | jq | sed | sort | uniq` pipeline did.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, AnyStr, Callable, Dict, Iterator, List, Optional, Set, Union
+
+from .files import open_bytes, open_text
+from .jsonstream import iter_json_array
+
+# Bytes of an allele file split into lines at a time
+BLOCK_SIZE = 1 << 22
+
+
+def gene_ids(fh: IO[str]) -> Iterator[str]:
+    for gene in iter_json_array(fh, ["data"]):
+        yield gene["basicGeneticEntity"]["primaryId"]
+
+
+def genotype_ids(fh: IO[str]) -> Iterator[str]:
+    for genotype in iter_json_array(fh, ["data"]):
+        yield genotype["primaryID"]
+
+
+def allele_ids(fh: IO[bytes]) -> Iterator[bytes]:
+    # Allele files are by far the largest: they are split into lines a block at a time and never decoded
+    rest = b""
+    while True:
+        block = fh.read(BLOCK_SIZE)
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop() if block else b""
+        yield from [
+            fields[2].rstrip(b"\r")
+            for line in lines
+            if not line.startswith((b"#", b"Taxon")) and len(fields := line.split(b"\t", 3)) > 2
+        ]
+        if not block:
+            return
+
+
+@dataclass(frozen=True)
+class LookupTable:
+    """A lookup TSV, the downloaded files it is built from and the category of its IDs."""
+
+    filename: str
+    pattern: str
+    category: str
+    extract: Callable[[IO], Iterator[AnyStr]]
+    binary: bool = False
+
+    def sources(self, data_dir: Path) -> List[Path]:
+        """Source files for this table, preferring gzipped files like the Makefile did."""
+        compressed = sorted(data_dir.glob(f"{self.pattern}.gz"))
+        return compressed or sorted(data_dir.glob(self.pattern))
+
+
+LOOKUP_TABLES = [
+    LookupTable("alliance_gene.tsv", "BGI_*.json", "biolink:Gene", gene_ids),
+    LookupTable("alliance_allele.tsv", "VARIANT-ALLELE*.tsv", "biolink:SequenceVariant", allele_ids, binary=True),
+    LookupTable("alliance_genotype.tsv", "AGM_*.json", "biolink:Genotype", genotype_ids),
+]
+
+
+def collect_ids(table: LookupTable, source: Path) -> Set[AnyStr]:
+    """Read every ID of a single source file, as bytes for a binary table."""
+    with open_bytes(source) if table.binary else open_text(source) as fh:
+        return set(table.extract(fh))
+
+
+def write_table(path: Path, ids: Set[Union[str, bytes]], category: str) -> None:
+    """Write a lookup table atomically. IDs are sorted as UTF-8, which is the order of their code points."""
+    tmp = path.with_name(path.name + ".tmp")
+    ordered = sorted(ids)
+    if ordered and isinstance(ordered[0], str):
+        ordered = [entity_id.encode() for entity_id in ordered]
+    line_end = f"\t{category}\n".encode()
+    with open(tmp, "wb") as fh:
+        if ordered:
+            fh.write(line_end.join(ordered) + line_end)
+    os.replace(tmp, path)
+
+
+def build_lookup_tables(data_dir: Path = Path("data"), max_workers: Optional[int] = None) -> Dict[Path, int]:
+    """
+    Build every lookup table from the files in data_dir, one source file per process.
+
+    With a single worker the files are read in this process, as sending the
+    IDs back from another one would only add to the time.
+    Returns the number of unique IDs written to each table.
+    """
+    tasks = [(table, source) for table in LOOKUP_TABLES for source in table.sources(data_dir)]
+    ids_by_table: Dict[str, Set[Union[str, bytes]]] = {table.filename: set() for table in LOOKUP_TABLES}
+
+    if (max_workers or os.cpu_count() or 1) == 1 or len(tasks) < 2:
+        for table, source in tasks:
+            ids_by_table[table.filename].update(collect_ids(table, source))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [(table, pool.submit(collect_ids, table, source)) for table, source in tasks]
+            for table, future in futures:
+                ids_by_table[table.filename].update(future.result())
+
+    counts = {}
+    for table in LOOKUP_TABLES:
+        path = data_dir / table.filename
+        write_table(path, ids_by_table[table.filename], table.category)
+        counts[path] = len(ids_by_table[table.filename])
+    return counts
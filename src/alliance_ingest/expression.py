@@ -1,8 +1,10 @@
-import uuid
 import koza
 from biolink_model.datamodel.pydanticmodel_v2 import GeneToExpressionSiteAssociation, KnowledgeLevelEnum, AgentTypeEnum
 from loguru import logger
 
+from alliance_ingest.construct import build
+from alliance_ingest.ids import association_id
+
 # Inline source_map to avoid relative import issues in Koza 2.0
 source_map = {
     "FB": "infores:flybase",
@@ -56,15 +58,24 @@ def transform_record(koza_transform, row):
 
         # Our current ingest policy is to first use a reported Anatomical structure term...
         associations = []
+        assay = get_data(row, "assay")
         if anatomical_entity_id:
             associations.append(
-                GeneToExpressionSiteAssociation(
-                    id="uuid:" + str(uuid.uuid1()),
+                build(
+                    GeneToExpressionSiteAssociation,
+                    id="uuid:" + association_id(
+                        subject=gene_id,
+                        predicate="biolink:expressed_in",
+                        object=anatomical_entity_id,
+                        qualifiers=[stage_term_id, assay],
+                        publications=publication_ids,
+                        source=source,
+                    ),
                     subject=gene_id,
                     predicate="biolink:expressed_in",
                     object=anatomical_entity_id,
                     stage_qualifier=stage_term_id,
-                    qualifiers=([get_data(row, "assay")] if get_data(row, "assay") else None),
+                    qualifiers=([assay] if assay else None),
                     publications=publication_ids,
                     aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
                     primary_knowledge_source=source,
@@ -77,13 +88,21 @@ def transform_record(koza_transform, row):
             # ... and failing that, fall back to using a subcellular component
             # (but ignore otherwise ignore it, if reported alongside in the record)
             associations.append(
-                GeneToExpressionSiteAssociation(
-                    id="uuid:" + str(uuid.uuid1()),
+                build(
+                    GeneToExpressionSiteAssociation,
+                    id="uuid:" + association_id(
+                        subject=gene_id,
+                        predicate="biolink:expressed_in",
+                        object=cellular_component_id,
+                        qualifiers=[stage_term_id, assay],
+                        publications=publication_ids,
+                        source=source,
+                    ),
                     subject=gene_id,
                     predicate="biolink:expressed_in",
                     object=cellular_component_id,
                     stage_qualifier=stage_term_id,
-                    qualifiers=([get_data(row, "assay")] if get_data(row, "assay") else None),
+                    qualifiers=([assay] if assay else None),
                     publications=publication_ids,
                     aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
                     primary_knowledge_source=source,
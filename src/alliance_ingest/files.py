@@ -0,0 +1,21 @@
+"""
+Small file helpers shared by the pipeline stages.
+"""
+
+import gzip
+from pathlib import Path
+from typing import IO
+
+
+def open_text(path: Path) -> IO[str]:
+    """Open a plain or gzip-compressed input file as text."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def open_bytes(path: Path) -> IO[bytes]:
+    """Open a plain or gzip-compressed input file as bytes."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
@@ -2,6 +2,8 @@ import koza
 from biolink_model.datamodel.pydanticmodel_v2 import Gene
 from loguru import logger
 
+from alliance_ingest.construct import build
+
 # Inline source_map to avoid relative import issues in Koza 2.0
 source_map = {
     "FB": "infores:flybase",
@@ -53,7 +55,8 @@ def transform_record(koza_transform, row):
         else:
             raise ValueError(f"Can't find taxon name for: {in_taxon}")
 
-    gene = Gene(
+    gene = build(
+        Gene,
         id=gene_id,
         symbol=row["symbol"],
         name=row["symbol"],
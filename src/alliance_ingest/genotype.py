@@ -1,4 +1,3 @@
-import uuid  # For generating UUIDs for associations
 from typing import List
 
 from biolink_model.datamodel.pydanticmodel_v2 import (
@@ -10,6 +9,9 @@ from biolink_model.datamodel.pydanticmodel_v2 import (
 )
 import koza
 
+from alliance_ingest.construct import build
+from alliance_ingest.ids import association_id
+
 source_map = {
     "FB": "infores:flybase",
     "MGI": "infores:mgi",
@@ -31,7 +33,8 @@ taxon_label_map = {
 def transform_record(koza_transform, row: dict) -> List:
     # Code to transform each row of data
     # For more information, see https://koza.monarchinitiative.org/Ingests/transform
-    genotype = Genotype(
+    genotype = build(
+        Genotype,
         id=row["primaryID"],
         type=[row["subtype"]] if "subtype" in row else None,
         name=row["name"],
@@ -39,15 +42,24 @@ def transform_record(koza_transform, row: dict) -> List:
         in_taxon_label=taxon_label_map[row["taxonId"]],
     )
     entities = [genotype]
+    primary_knowledge_source = source_map[row["primaryID"].split(':')[0]]
 
     for allele in row["affectedGenomicModelComponents"] if "affectedGenomicModelComponents" in row else []:
-        genotype_to_variant_association = GenotypeToVariantAssociation(
-            id=str(uuid.uuid4()),
+        zygosity = allele["zygosity"] if "zygosity" in allele else None
+        genotype_to_variant_association = build(
+            GenotypeToVariantAssociation,
+            id=association_id(
+                subject=genotype.id,
+                predicate="biolink:has_sequence_variant",
+                object=allele["alleleID"],
+                qualifiers=[zygosity],
+                source=primary_knowledge_source,
+            ),
             subject=genotype.id,
             predicate="biolink:has_sequence_variant",
             object=allele["alleleID"],
-            qualifier=allele["zygosity"] if "zygosity" in allele else None,
-            primary_knowledge_source=source_map[row["primaryID"].split(':')[0]],
+            qualifier=zygosity,
+            primary_knowledge_source=primary_knowledge_source,
             aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
             knowledge_level=KnowledgeLevelEnum.knowledge_assertion,
             agent_type=AgentTypeEnum.manual_agent,
@@ -57,13 +69,19 @@ def transform_record(koza_transform, row: dict) -> List:
 
         gene_data = koza_transform.lookup(allele["alleleID"], "AlleleAssociatedGeneId", "allele_to_gene")
         if gene_data:
-            genotype_to_gene_association = GenotypeToGeneAssociation(
-                id=str(uuid.uuid4()),
+            genotype_to_gene_association = build(
+                GenotypeToGeneAssociation,
+                id=association_id(
+                    subject=genotype.id,
+                    predicate="biolink:related_to",
+                    object=gene_data,
+                    source=primary_knowledge_source,
+                ),
                 subject=genotype.id,
                 # More specific predicate may come eventually, keeping it vague for now
                 predicate="biolink:related_to",
                 object=gene_data,
-                primary_knowledge_source=source_map[row["primaryID"].split(':')[0]],
+                primary_knowledge_source=primary_knowledge_source,
                 aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
                 knowledge_level=KnowledgeLevelEnum.knowledge_assertion,
                 agent_type=AgentTypeEnum.manual_agent,
@@ -0,0 +1,377 @@
+"""
+Seek-point indexes of gzip files, for decompressing one file from several offsets at once.
+
+A gzip file can only be decompressed from its start, as every deflate block
+may refer back to the 32 KB of output before it. As in zlib's zran example
+(and indexed_gzip), the index records a seek point at a deflate block boundary
+about every SPAN bytes of output:
+- the point's output offset;
+- the compressed byte offset of the block and the bit within that byte where
+  it starts;
+- the 32 KB of output before it.
+Decompression can then start at any point, with a raw inflater primed with
+the bits of the block's first byte and the point's window.
+
+Python's zlib module doesn't report block boundaries, and can't prime an
+inflater with the bits of a partial byte, so both the index and the reads
+use zlib's own inflate, inflatePrime and inflateSetDictionary through
+ctypes. zlib releases the GIL while inflating just as the zlib module does.
+
+Layout: the MAGIC bytes, a 4-byte little-endian header length, a JSON header
+(the gzip file's size, its uncompressed length, the span and each point as
+[out, byte, bits, window offset, window length]), then every point's window,
+zlib-compressed. The index of `FILE.gz` is `FILE.gz.gzidx`, next to it.
+
+Only single-member gzip files can be indexed, which covers everything the
+Alliance and gzip itself write.
+"""
+
+import ctypes
+import ctypes.util
+import io
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"AGZI0001"
+
+HEADER_LENGTH = struct.Struct("<I")
+
+INDEX_SUFFIX = ".gzidx"
+
+# Bytes of output between seek points
+SPAN = 8 << 20
+
+# Compressed files smaller than this are not worth splitting, so they are not indexed
+MIN_INDEXED_SIZE = 16 << 20
+
+WINDOW_SIZE = 32 << 10
+
+CHUNK_SIZE = 1 << 20
+
+# A range of a file's output, from a seek point (or a record start, see jsonsplit) to the start of the next range
+# (None for the end of the file)
+Offsets = Tuple[int, Optional[int]]
+
+# zlib constants, as in zlib.h
+Z_OK = 0
+Z_STREAM_END = 1
+Z_NO_FLUSH = 0
+Z_BLOCK = 5
+Z_BUF_ERROR = -5
+# inflateInit2 window bits accepting a gzip header, and for raw deflate
+GZIP_WBITS = 31
+RAW_WBITS = -15
+
+
+class _ZStream(ctypes.Structure):
+    """zlib's z_stream."""
+
+    _fields_ = [
+        ("next_in", ctypes.c_void_p),
+        ("avail_in", ctypes.c_uint),
+        ("total_in", ctypes.c_ulong),
+        ("next_out", ctypes.c_void_p),
+        ("avail_out", ctypes.c_uint),
+        ("total_out", ctypes.c_ulong),
+        ("msg", ctypes.c_char_p),
+        ("state", ctypes.c_void_p),
+        ("zalloc", ctypes.c_void_p),
+        ("zfree", ctypes.c_void_p),
+        ("opaque", ctypes.c_void_p),
+        ("data_type", ctypes.c_int),
+        ("adler", ctypes.c_ulong),
+        ("reserved", ctypes.c_ulong),
+    ]
+
+
+@lru_cache(maxsize=None)
+def _libz() -> ctypes.CDLL:
+    """The zlib shared library, which raises OSError if it can't be found."""
+    name = ctypes.util.find_library("z") or ctypes.util.find_library("zlib")
+    if name is None:
+        raise OSError("The zlib shared library was not found, so gzip files can't be indexed")
+    lib = ctypes.CDLL(name)
+    lib.zlibVersion.restype = ctypes.c_char_p
+    lib.inflateInit2_.argtypes = [ctypes.POINTER(_ZStream), ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+    lib.inflate.argtypes = [ctypes.POINTER(_ZStream), ctypes.c_int]
+    lib.inflateEnd.argtypes = [ctypes.POINTER(_ZStream)]
+    lib.inflatePrime.argtypes = [ctypes.POINTER(_ZStream), ctypes.c_int, ctypes.c_int]
+    lib.inflateSetDictionary.argtypes = [ctypes.POINTER(_ZStream), ctypes.c_char_p, ctypes.c_uint]
+    return lib
+
+
+def _inflater(wbits: int) -> _ZStream:
+    lib = _libz()
+    stream = _ZStream()
+    ret = lib.inflateInit2_(ctypes.byref(stream), wbits, lib.zlibVersion(), ctypes.sizeof(stream))
+    if ret != Z_OK:
+        raise OSError(f"inflateInit2 failed with {ret}")
+    return stream
+
+
+def _check(path: Path, stream: _ZStream, ret: int) -> None:
+    if ret not in (Z_OK, Z_STREAM_END, Z_BUF_ERROR):
+        message = stream.msg.decode() if stream.msg else ret
+        raise ValueError(f"{path} is not valid gzip: {message}")
+
+
+@dataclass
+class SeekPoint:
+    """Where decompression can start: an output offset, and the compressed byte and bit of its block."""
+
+    out: int
+    byte: int
+    bits: int
+    window_offset: int = 0
+    window_length: int = 0
+
+
+@dataclass
+class GzipIndex:
+    """The seek points of a gzip file, read from its index file."""
+
+    path: Path
+    size: int
+    length: int
+    span: int
+    points: List[SeekPoint]
+
+    @classmethod
+    def load(cls, path: Path) -> "GzipIndex":
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a gzip index")
+            (header_length,) = HEADER_LENGTH.unpack(fh.read(HEADER_LENGTH.size))
+            header = json.loads(fh.read(header_length))
+        data_start = len(MAGIC) + HEADER_LENGTH.size + header_length
+        points = [
+            SeekPoint(out, byte, bits, data_start + offset, length)
+            for out, byte, bits, offset, length in header["points"]
+        ]
+        return cls(path, header["size"], header["length"], header["span"], points)
+
+    def window(self, point: SeekPoint) -> bytes:
+        """The 32 KB of output before point."""
+        if not point.window_length:
+            return b""
+        with open(self.path, "rb") as fh:
+            fh.seek(point.window_offset)
+            return zlib.decompress(fh.read(point.window_length))
+
+    def point_at(self, out: int) -> SeekPoint:
+        """The seek point at output offset out."""
+        for point in self.points:
+            if point.out == out:
+                return point
+        raise ValueError(f"{self.path} has no seek point at output offset {out}")
+
+
+def gzip_index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def gzip_index_is_current(path: Path) -> bool:
+    """Whether the gzip file's index exists, is newer than the file and was built from a file of its size."""
+    index_path = gzip_index_path(path)
+    if not path.exists() or not index_path.exists():
+        return False
+    if index_path.stat().st_mtime_ns < path.stat().st_mtime_ns:
+        return False
+    try:
+        return GzipIndex.load(index_path).size == path.stat().st_size
+    except (OSError, ValueError):
+        return False
+
+
+def load_gzip_index(path: Path) -> Optional[GzipIndex]:
+    """The index of a gzip file, or None if it has none or it is stale."""
+    return GzipIndex.load(gzip_index_path(path)) if gzip_index_is_current(path) else None
+
+
+def _find_points(path: Path, span: int) -> Tuple[List[Tuple[int, int, int, bytes]], int]:
+    """Inflate path block by block, returning (out, byte, bits, window) at every span of output, and its length."""
+    lib = _libz()
+    stream = _inflater(GZIP_WBITS)
+    input_buffer = ctypes.create_string_buffer(CHUNK_SIZE)
+    window = ctypes.create_string_buffer(WINDOW_SIZE)
+    points = []
+    total_in = total_out = last = 0
+    try:
+        with open(path, "rb") as fh:
+            while True:
+                read = fh.readinto(input_buffer)
+                if not read:
+                    raise ValueError(f"{path} ends before its gzip stream does")
+                stream.next_in = ctypes.addressof(input_buffer)
+                stream.avail_in = read
+                while stream.avail_in:
+                    if stream.avail_out == 0:
+                        stream.next_out = ctypes.addressof(window)
+                        stream.avail_out = WINDOW_SIZE
+                    total_in += stream.avail_in
+                    total_out += stream.avail_out
+                    # Z_BLOCK returns at the end of every deflate block
+                    ret = lib.inflate(ctypes.byref(stream), Z_BLOCK)
+                    total_in -= stream.avail_in
+                    total_out -= stream.avail_out
+                    _check(path, stream, ret)
+                    if ret == Z_STREAM_END:
+                        rest = ctypes.string_at(stream.next_in, stream.avail_in) + fh.read(2)
+                        if rest[:2] == b"\x1f\x8b":
+                            raise ValueError(f"{path} has more than one gzip member")
+                        return points, total_out
+                    # Bit 128 of data_type marks a block boundary, bit 64 the end of the last block
+                    at_boundary = stream.data_type & 128 and not stream.data_type & 64
+                    if at_boundary and total_out - last >= span:
+                        filled = WINDOW_SIZE - stream.avail_out
+                        data = ctypes.string_at(window, WINDOW_SIZE)
+                        recent = data[filled:] + data[:filled] if total_out >= WINDOW_SIZE else data[:filled]
+                        points.append((total_out, total_in, stream.data_type & 7, recent))
+                        last = total_out
+    finally:
+        lib.inflateEnd(ctypes.byref(stream))
+
+
+def build_gzip_index(path: Path, span: int = SPAN) -> GzipIndex:
+    """Index a gzip file, writing the index next to it atomically. Returns the index."""
+    found, length = _find_points(path, span)
+    points = [[0, 0, 0, 0, 0]]
+    windows = []
+    offset = 0
+    for out, byte, bits, window in found:
+        compressed = zlib.compress(window)
+        points.append([out, byte, bits, offset, len(compressed)])
+        windows.append(compressed)
+        offset += len(compressed)
+    header = json.dumps({"size": path.stat().st_size, "length": length, "span": span, "points": points}).encode()
+
+    index_path = gzip_index_path(path)
+    tmp = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        for compressed in windows:
+            fh.write(compressed)
+    os.replace(tmp, index_path)
+    return GzipIndex.load(index_path)
+
+
+def build_gzip_indexes(paths: Iterable[Path], max_workers: Optional[int] = None) -> Dict[Path, int]:
+    """
+    Index the gzip files among paths that are large enough to split and have no current index.
+
+    zlib releases the GIL while inflating, so the files are indexed on
+    threads. Returns the number of seek points of each file indexed.
+    """
+    stale = [
+        path
+        for path in paths
+        if path.name.endswith(".gz")
+        and path.exists()
+        and path.stat().st_size >= MIN_INDEXED_SIZE
+        and not gzip_index_is_current(path)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        indexes = list(pool.map(build_gzip_index, stale))
+    return {path: len(index.points) for path, index in zip(stale, indexes, strict=True)}
+
+
+def inflate_from(path: Path, index: GzipIndex, point: SeekPoint) -> Iterator[bytes]:
+    """Yield the output of path from point on, in chunks."""
+    lib = _libz()
+    stream = _inflater(GZIP_WBITS if point.out == 0 else RAW_WBITS)
+    input_buffer = ctypes.create_string_buffer(CHUNK_SIZE)
+    output_buffer = ctypes.create_string_buffer(CHUNK_SIZE)
+    try:
+        with open(path, "rb") as fh:
+            if point.out:
+                fh.seek(point.byte - 1 if point.bits else point.byte)
+                if point.bits:
+                    # The block starts in the unused, highest bits of the byte before point.byte
+                    lib.inflatePrime(ctypes.byref(stream), point.bits, fh.read(1)[0] >> (8 - point.bits))
+                window = index.window(point)
+                lib.inflateSetDictionary(ctypes.byref(stream), window, len(window))
+            while True:
+                read = fh.readinto(input_buffer)
+                if not read:
+                    raise ValueError(f"{path} ends before its gzip stream does")
+                stream.next_in = ctypes.addressof(input_buffer)
+                stream.avail_in = read
+                # Inflate until the input is used up and the output buffer isn't filled
+                while True:
+                    stream.next_out = ctypes.addressof(output_buffer)
+                    stream.avail_out = CHUNK_SIZE
+                    ret = lib.inflate(ctypes.byref(stream), Z_NO_FLUSH)
+                    _check(path, stream, ret)
+                    if stream.avail_out < CHUNK_SIZE:
+                        yield ctypes.string_at(output_buffer, CHUNK_SIZE - stream.avail_out)
+                    if ret == Z_STREAM_END:
+                        return
+                    if stream.avail_out:
+                        break
+    finally:
+        lib.inflateEnd(ctypes.byref(stream))
+
+
+def inflate_range(path: Path, index: GzipIndex, start: int, end: Optional[int] = None) -> Iterator[bytes]:
+    """Yield the output of path in [start, end), which may start anywhere, from the seek point before start."""
+    point = max((point for point in index.points if point.out <= start), key=lambda point: point.out)
+    offset = point.out
+    for chunk in inflate_from(path, index, point):
+        if offset + len(chunk) > start:
+            yield chunk[max(start - offset, 0) : None if end is None else end - offset]
+        offset += len(chunk)
+        if end is not None and offset >= end:
+            return
+
+
+def read_lines(path: Path, index: GzipIndex, start: int, end: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the lines of path that start in the output range [start, end), which start at seek points.
+
+    A line that runs past end is yielded whole, and the range it runs into
+    skips it, so the ranges of a file yield each of its lines exactly once.
+    """
+    point = index.point_at(start)
+    # A range starts with a line of its own only if the output before it ends one
+    skip = start > 0 and not index.window(point).endswith(b"\n")
+    offset = start
+    pending = b""
+    for chunk in inflate_from(path, index, point):
+        data = pending + chunk
+        cut = data.rfind(b"\n") + 1
+        lines, pending = data[:cut], data[cut:]
+        if skip and lines:
+            first = lines.index(b"\n") + 1
+            lines, offset, skip = lines[first:], offset + first, False
+        if end is not None and offset + len(lines) > end:
+            # Keep the lines that start before end, the last of them through its newline
+            lines = lines[: lines.index(b"\n", end - offset - 1) + 1] if end > offset else b""
+            yield from io.StringIO(lines.decode(), newline="\n")
+            return
+        offset += len(lines)
+        yield from io.StringIO(lines.decode(), newline="\n")
+    if pending and not skip and (end is None or offset < end):
+        yield pending.decode()
+
+
+def split_offsets(index: GzipIndex, parts: int) -> List[Offsets]:
+    """
+    Split the output of an indexed file into at most parts ranges of about equal length.
+
+    Each range starts at the seek point nearest its share of the output; the
+    last runs to the end of the file (None).
+    """
+    starts = [0]
+    for part in range(1, parts):
+        target = index.length * part // parts
+        nearest = min(index.points, key=lambda point: abs(point.out - target)).out
+        if nearest > starts[-1]:
+            starts.append(nearest)
+    return list(zip(starts, starts[1:] + [None], strict=True))
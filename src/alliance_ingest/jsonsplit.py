@@ -0,0 +1,184 @@
+"""
+Record indexes of large JSON documents, for splitting the array of their records into ranges.
+
+The BGI, AGM, EXPRESSION and PHENOTYPE files are a single object whose `data`
+array holds every record (see jsonstream). Decoding can only start at the
+start of a record, and one can't be found from an arbitrary offset: a `{`
+may as well be inside a string. So each large file is scanned once, after
+download: jsonstream walks down json_path and skips over the records one at
+a time, noting the offset of a record start about every SPAN bytes of
+output and the offset of the array's closing bracket. Skipping a record
+with the json module's C decoder is several times faster than tracking
+brackets and string state from Python, and nothing of it is kept.
+
+The document is decoded as latin-1 while scanning, which maps every byte to
+one character, so character offsets are byte offsets of the file's output:
+JSON's own syntax is ASCII, and no byte of a multi-byte UTF-8 character is.
+
+A range from one record start to another is read by seeking in a plain
+file, or by decompressing from the seek point before it in a gzip file's
+index (see gzindex), and decoding just its elements; the last range runs to
+the end of the array. The ranges of a file read in order yield its records
+in order.
+
+The index of `FILE.json.gz` is `FILE.json.gz.records`, next to it: a JSON
+object with the file's size, the json_path, the span, the record starts and
+the array's end.
+"""
+
+import codecs
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .gzindex import CHUNK_SIZE, MIN_INDEXED_SIZE, SPAN, Offsets, inflate_range, load_gzip_index
+from .jsonstream import find_element_starts, iter_json_elements
+
+RECORDS_SUFFIX = ".records"
+
+JsonPath = List[Union[str, int]]
+
+
+class _DecodedChunks:
+    """The read() of a text stream over chunks of bytes, decoded incrementally."""
+
+    def __init__(self, chunks: Iterable[bytes], encoding: str):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+
+    def read(self, size: int = -1) -> str:
+        for chunk in self.chunks:
+            text = self.decoder.decode(chunk)
+            if text:
+                return text
+        return self.decoder.decode(b"", final=True)
+
+
+@dataclass
+class RecordIndex:
+    """The record starts of the array at json_path of a JSON file, read from its index file."""
+
+    path: Path
+    size: int
+    json_path: JsonPath
+    span: int
+    starts: List[int]
+    end: int
+
+    @classmethod
+    def load(cls, path: Path) -> "RecordIndex":
+        with open(path) as fh:
+            header = json.load(fh)
+        return cls(path, header["size"], header["json_path"], header["span"], header["starts"], header["end"])
+
+
+def record_index_path(path: Path) -> Path:
+    return path.with_name(path.name + RECORDS_SUFFIX)
+
+
+def record_index_is_current(path: Path, json_path: Optional[JsonPath]) -> bool:
+    """Whether the file's record index exists, is newer than it and was built from a file of its size for json_path."""
+    index_path = record_index_path(path)
+    if not path.exists() or not index_path.exists():
+        return False
+    if index_path.stat().st_mtime_ns < path.stat().st_mtime_ns:
+        return False
+    try:
+        index = RecordIndex.load(index_path)
+    except (OSError, ValueError, KeyError):
+        return False
+    return index.size == path.stat().st_size and index.json_path == (json_path or [])
+
+
+def load_record_index(path: Path, json_path: Optional[JsonPath]) -> Optional[RecordIndex]:
+    """The record index of a JSON file, or None if it has none or it is stale."""
+    return RecordIndex.load(record_index_path(path)) if record_index_is_current(path, json_path) else None
+
+
+def _read_bytes(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Yield the output of a plain or gzip file in [start, end), through its gzip index for a later start."""
+    if path.suffix == ".gz" and start:
+        index = load_gzip_index(path)
+        if index is None:
+            raise ValueError(f"{path} has no current gzip index to read a range of")
+        yield from inflate_range(path, index, start, end)
+        return
+    with gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            chunk = fh.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def scan_records(chunks: Iterable[bytes], json_path: Optional[JsonPath], span: int = SPAN) -> Tuple[List[int], int]:
+    """The byte offsets of the record starts, about span bytes apart, and of the array's end in a JSON document."""
+    keys = [key.encode().decode("latin-1") if isinstance(key, str) else key for key in json_path or []]
+    return find_element_starts(_DecodedChunks(chunks, "latin-1"), keys, span)
+
+
+def build_record_index(path: Path, json_path: Optional[JsonPath], span: int = SPAN) -> RecordIndex:
+    """Scan a JSON file for record starts, writing its index next to it atomically. Returns the index."""
+    try:
+        starts, end = scan_records(_read_bytes(path), json_path, span)
+    except (ValueError, KeyError) as e:
+        raise ValueError(f"{path} can't be indexed: {e}") from e
+    index_path = record_index_path(path)
+    tmp = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(
+            {"size": path.stat().st_size, "json_path": json_path or [], "span": span, "starts": starts, "end": end},
+            fh,
+        )
+    os.replace(tmp, index_path)
+    return RecordIndex.load(index_path)
+
+
+def build_record_indexes(inputs: Dict[Path, Optional[JsonPath]], max_workers: Optional[int] = None) -> Dict[Path, int]:
+    """
+    Index the JSON files among inputs (with the json_path of their config) that are large enough to split.
+
+    Files with a current index are skipped. Returns the number of record
+    starts found in each file indexed.
+    """
+    stale = [
+        path
+        for path, json_path in inputs.items()
+        if path.exists() and path.stat().st_size >= MIN_INDEXED_SIZE and not record_index_is_current(path, json_path)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        indexes = list(pool.map(lambda path: build_record_index(path, inputs[path]), stale))
+    return {path: len(index.starts) for path, index in zip(stale, indexes, strict=True)}
+
+
+def split_records(index: RecordIndex, parts: int) -> List[Offsets]:
+    """
+    Split the array of an indexed file into at most parts ranges of about equal length.
+
+    Each range starts at the record start nearest its share of the array;
+    the last runs to the end of the array (None).
+    """
+    if not index.starts:
+        return []
+    first = index.starts[0]
+    starts = [first]
+    for part in range(1, parts):
+        target = first + (index.end - first) * part // parts
+        nearest = min(index.starts, key=lambda start: abs(start - target))
+        if nearest > starts[-1]:
+            starts.append(nearest)
+    return list(zip(starts, starts[1:] + [None], strict=True))
+
+
+def read_records(path: Path, index: RecordIndex, start: int, end: Optional[int] = None) -> Iterator[Any]:
+    """Yield the records of the range [start, end) of an indexed file, which start at record starts."""
+    chunks = _read_bytes(path, start, index.end if end is None else end)
+    yield from iter_json_elements(_DecodedChunks(chunks, "utf-8"))
@@ -0,0 +1,176 @@
+"""
+Incremental reader for the elements of a JSON array nested in a large document.
+
+The Alliance BGI, AGM, EXPRESSION and PHENOTYPE files are a single object
+whose `data` key holds every record. Rather than loading the whole document,
+iter_json_array walks down to the array and decodes one element at a time,
+so memory is bounded by the read chunk plus the largest single record.
+"""
+
+import json
+from typing import IO, Any, Iterator, List, Optional, Tuple, Union
+
+CHUNK_SIZE = 1 << 20
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """A sliding window over a text stream that JSON values are decoded from."""
+
+    def __init__(self, fh: IO[str], chunk_size: int):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        # Offset in the stream of buf[0]
+        self.start = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read another chunk, dropping everything before pos. Returns False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.fh.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.start += self.pos
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character without consuming it ('' at end of file)."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r} in JSON stream")
+        self.pos += 1
+
+    def decode(self) -> Any:
+        """Decode the next complete JSON value, reading more of the stream as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number or literal that ends the buffer may continue in the next chunk
+            if end == len(self.buf) and not isinstance(value, (dict, list, str)) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _descend(buf: _Buffer, key: Union[str, int]) -> None:
+    """Position the buffer at the value of key in the object (or index in the array) that starts next."""
+    if isinstance(key, int):
+        buf.expect("[")
+        for _ in range(key):
+            buf.decode()
+            buf.expect(",")
+        return
+
+    buf.expect("{")
+    while buf.peek() != "}":
+        name = buf.decode()
+        buf.expect(":")
+        if name == key:
+            return
+        buf.decode()
+        if buf.peek() == ",":
+            buf.pos += 1
+    raise KeyError(key)
+
+
+def iter_json_array(
+    fh: IO[str],
+    json_path: Optional[List[Union[str, int]]] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Any]:
+    """
+    Yield the elements of the array found at json_path in a JSON text stream.
+
+    Mirrors koza's JSON reader: if the value at json_path is not an array it
+    is yielded as the only element.
+    """
+    buf = _Buffer(fh, chunk_size)
+    for key in json_path or []:
+        _descend(buf, key)
+
+    if buf.peek() != "[":
+        yield buf.decode()
+        return
+
+    buf.pos += 1
+    if buf.peek() == "]":
+        return
+    while True:
+        yield buf.decode()
+        separator = buf.peek()
+        buf.pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or ']' but found {separator!r} in JSON stream")
+
+
+def iter_json_elements(fh: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a slice of a JSON array, from the start of one of them to the end of the stream.
+
+    The slice may end with the comma after its last element, as a slice cut
+    at the start of the next element does.
+    """
+    buf = _Buffer(fh, chunk_size)
+    while buf.peek():
+        yield buf.decode()
+        if not buf.peek():
+            return
+        buf.expect(",")
+
+
+def find_element_starts(
+    fh: IO[str],
+    json_path: Optional[List[Union[str, int]]] = None,
+    span: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> Tuple[List[int], int]:
+    """
+    Find where the elements of the array at json_path start in a JSON text stream.
+
+    Returns the offset of the first element, then of the first to start at
+    least span characters after the last one returned, and the offset of the
+    array's closing bracket. The elements are decoded only to be skipped, and
+    a value at json_path that is not an array has none.
+    """
+    buf = _Buffer(fh, chunk_size)
+    for key in json_path or []:
+        _descend(buf, key)
+    if buf.peek() != "[":
+        return [], buf.start + buf.pos
+    buf.pos += 1
+
+    starts: List[int] = []
+    while buf.peek() != "]":
+        offset = buf.start + buf.pos
+        if not starts or offset - starts[-1] >= span:
+            starts.append(offset)
+        buf.decode()
+        if buf.peek() != "]":
+            buf.expect(",")
+    return starts, buf.start + buf.pos
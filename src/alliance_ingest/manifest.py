@@ -0,0 +1,153 @@
+"""
+Input fingerprints of each transform, kept in a manifest next to its outputs.
+
+A transform's fingerprint covers its reader files, its YAML config, its
+transform module and the alliance_ingest modules that module imports, its
+mapping configs and their files, and the options that change its output.
+When a transform's fingerprint matches the one recorded for its previous
+outputs, and those outputs are still in place, the transform can be skipped.
+
+Hashing multi-GB inputs on every run would cost more than some transforms,
+so the digest of each file is reused while its size and mtime are unchanged.
+The manifest also records the checksum of every output file, so downstream
+consumers can use it as a cache key.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .configs import config_input_files, load_config, mapping_files
+
+MANIFEST_FILE = "manifest.json"
+
+DIGEST_CHUNK_SIZE = 1 << 20
+
+# Shared helpers imported by transform modules, e.g. `from alliance_ingest.ids import association_id`
+PACKAGE_IMPORT = re.compile(r"^\s*from alliance_ingest\.(\w+) import", re.MULTILINE)
+
+
+def file_digest(path: Path) -> str:
+    """BLAKE2b hex digest of a file's contents."""
+    digest = blake2b()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def transform_module(config: Path, transform: Dict[str, Any]) -> Optional[Path]:
+    """The transform code of a config, found the way koza finds it."""
+    if transform.get("code"):
+        return config.parent / transform["code"]
+    mirrored = config.with_suffix(".py")
+    return mirrored if mirrored.exists() else None
+
+
+def transform_inputs(config: Path) -> List[Path]:
+    """Every file whose contents can change the output of a transform config."""
+    transform = load_config(config).get("transform") or {}
+    inputs = [config.resolve()] + config_input_files(config)
+
+    module = transform_module(config, transform)
+    if module is not None:
+        inputs.append(module.resolve())
+        if module.exists():
+            for name in PACKAGE_IMPORT.findall(module.read_text()):
+                inputs.append((module.parent / f"{name}.py").resolve())
+
+    if transform.get("global_table"):
+        inputs.append((config.parent / transform["global_table"]).resolve())
+    for mapping in transform.get("mappings") or []:
+        mapping_config = (config.parent / mapping).resolve()
+        inputs.append(mapping_config)
+        if mapping_config.exists():
+            inputs.extend(mapping_files(mapping_config))
+    return list(dict.fromkeys(inputs))
+
+
+def transform_outputs(config: Path, output_dir: Path) -> List[Path]:
+    """The node and edge files a transform config has written to output_dir."""
+    name = load_config(config)["name"]
+    return sorted(p for kind in ("nodes", "edges") for p in output_dir.glob(f"{name}_{kind}.*") if p.is_file())
+
+
+@dataclass
+class Manifest:
+    """Fingerprints and output checksums of the transforms that wrote to an output directory."""
+
+    path: Path
+    transforms: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, output_dir: Path) -> "Manifest":
+        path = output_dir / MANIFEST_FILE
+        if not path.exists():
+            return cls(path)
+        with open(path) as fh:
+            return cls(path, json.load(fh).get("transforms", {}))
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"transforms": self.transforms}, fh, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _cached(self, path: Path, stat: os.stat_result) -> Optional[str]:
+        for entry in self.transforms.values():
+            record = entry["inputs"].get(str(path))
+            if record and record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+                return record["blake2b"]
+        return None
+
+    def file_record(self, path: Path) -> Dict[str, Any]:
+        """Size, mtime and digest of a file, reusing the recorded digest while size and mtime match."""
+        if not path.exists():
+            return {"missing": True}
+        stat = path.stat()
+        digest = self._cached(path, stat) or file_digest(path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "blake2b": digest}
+
+    def fingerprint(self, config: Path, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Fingerprint a transform config run with the given output-affecting options."""
+        inputs = {str(path): self.file_record(path) for path in transform_inputs(config)}
+        digest = blake2b(json.dumps(options, sort_keys=True).encode())
+        for path, record in inputs.items():
+            digest.update(f"{path}\0{record.get('blake2b', 'missing')}\0".encode())
+        return {"fingerprint": digest.hexdigest(), "options": options, "inputs": inputs}
+
+    def is_current(self, name: str, fingerprint: Dict[str, Any], output_dir: Path) -> bool:
+        """Whether name's recorded outputs were made from the same fingerprint and are still in place."""
+        entry = self.transforms.get(name)
+        if not entry or entry["fingerprint"] != fingerprint["fingerprint"] or not entry["outputs"]:
+            return False
+        for filename, record in entry["outputs"].items():
+            output = output_dir / filename
+            if not output.exists() or output.stat().st_size != record["size"]:
+                return False
+        return True
+
+    def record(self, name: str, fingerprint: Dict[str, Any], outputs: List[Path]) -> None:
+        """Record the fingerprint a transform ran with and checksums of the outputs it wrote."""
+        self.transforms[name] = {
+            **fingerprint,
+            "outputs": {p.name: {"size": p.stat().st_size, "blake2b": file_digest(p)} for p in outputs},
+            "completed": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    def refresh_outputs(self, outputs: List[Path]) -> bool:
+        """Re-record the checksums of outputs rewritten after their transform ran. Returns whether any were recorded."""
+        refreshed = False
+        for entry in self.transforms.values():
+            for path in outputs:
+                if path.name in entry["outputs"]:
+                    entry["outputs"][path.name] = {"size": path.stat().st_size, "blake2b": file_digest(path)}
+                    refreshed = True
+        return refreshed
@@ -0,0 +1,179 @@
+"""
+Memory-mapped, read-only indexes of single-value koza mapping files.
+
+koza loads a mapping such as alliance_entity_lookup.yaml into a dict of
+dicts in every transform process. For millions of IDs that costs seconds of
+loading and hundreds of MB per process. The index holds the same entries as
+sorted fixed-width keys, each followed by a one-byte value code, and is
+binary-searched through mmap, so it opens instantly and every worker shares
+the same page cache instead of building its own copy.
+
+Layout: the MAGIC bytes, a 4-byte little-endian header length, a JSON
+header (key width, entry count, value column and the distinct values), then
+the records, each the NUL-padded key and the index of its value.
+"""
+
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from .configs import load_config, mapping_files
+
+MAGIC = b"AIDX0001"
+
+HEADER_LENGTH = struct.Struct("<I")
+
+# Every SAMPLE_STRIDE-th key is kept in memory to narrow each search to one block of records
+SAMPLE_STRIDE = 64
+
+
+def mapping_index_path(mapping_config: Path) -> Optional[Path]:
+    """The index file declared by a mapping config under `transform.index`, if any."""
+    index = (load_config(mapping_config).get("transform") or {}).get("index")
+    return (mapping_config.parent / index).resolve() if index else None
+
+
+def read_mapping(mapping_config: Path) -> Dict[str, str]:
+    """
+    Read a mapping's files into {key: value} the way koza does.
+
+    The later of two rows with the same key wins, as in koza's mapping dict.
+    """
+    config = load_config(mapping_config)
+    reader = config["reader"]
+    columns = reader["columns"]
+    key_column = columns.index(config["transform"]["key"])
+    [value_name] = config["transform"]["values"]
+    value_column = columns.index(value_name)
+
+    entries: Dict[str, str] = {}
+    for path in mapping_files(mapping_config):
+        with open(path) as fh:
+            for line in fh:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) == len(columns):
+                    entries[fields[key_column]] = fields[value_column]
+    return entries
+
+
+def write_index(path: Path, entries: Dict[str, str], column: str) -> None:
+    """Write entries as an index file, atomically."""
+    values = sorted(set(entries.values()))
+    if len(values) > 256:
+        raise ValueError(f"{path}: {len(values)} distinct values, at most 256 fit a one-byte code")
+    codes = {value: code for code, value in enumerate(values)}
+    keys = sorted(key.encode() for key in entries)
+    key_width = max((len(key) for key in keys), default=0)
+    header = json.dumps({"key_width": key_width, "count": len(keys), "column": column, "values": values}).encode()
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        for key in keys:
+            fh.write(key.ljust(key_width, b"\0") + bytes((codes[entries[key.decode()]],)))
+    os.replace(tmp, path)
+
+
+def build_mapping_index(mapping_config: Path) -> int:
+    """Build the index a mapping config declares from its current files. Returns the number of entries."""
+    index_path = mapping_index_path(mapping_config)
+    if index_path is None:
+        raise ValueError(f"{mapping_config} declares no transform.index")
+    [column] = load_config(mapping_config)["transform"]["values"]
+    entries = read_mapping(mapping_config)
+    write_index(index_path, entries, column)
+    return len(entries)
+
+
+def index_is_current(mapping_config: Path) -> bool:
+    """Whether the mapping's index exists and is newer than the config and every file it was built from."""
+    index_path = mapping_index_path(mapping_config)
+    if index_path is None or not index_path.exists():
+        return False
+    built = index_path.stat().st_mtime_ns
+    sources = [mapping_config] + mapping_files(mapping_config)
+    return all(source.exists() and source.stat().st_mtime_ns <= built for source in sources)
+
+
+class MappingIndex(Mapping):
+    """
+    A read-only {key: {column: value}} view of an index file, as koza's mappings are.
+
+    Lookups bisect an in-memory sample of every SAMPLE_STRIDE-th key, then
+    binary-search that block of the memory-mapped records. Only the sample
+    is held per process; the records are shared through the page cache.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a mapping index")
+        (header_length,) = HEADER_LENGTH.unpack_from(self._mm, len(MAGIC))
+        self._start = len(MAGIC) + HEADER_LENGTH.size + header_length
+        header = json.loads(self._mm[len(MAGIC) + HEADER_LENGTH.size : self._start])
+        self.key_width = header["key_width"]
+        self.count = header["count"]
+        self.column = header["column"]
+        self.values = header["values"]
+        self._record_size = self.key_width + 1
+        self._sample = [self._key(record) for record in range(0, self.count, SAMPLE_STRIDE)]
+
+    def _key(self, record: int) -> bytes:
+        offset = self._start + record * self._record_size
+        return self._mm[offset : offset + self.key_width]
+
+    def _find(self, key: str) -> int:
+        """Record number of key, or -1."""
+        encoded = key.encode()
+        width = self.key_width
+        if len(encoded) > width:
+            return -1
+        padded = encoded.ljust(width, b"\0")
+        block = bisect_right(self._sample, padded) - 1
+        if block < 0:
+            return -1
+        mm, start, size = self._mm, self._start, self._record_size
+        lo, hi = block * SAMPLE_STRIDE, min((block + 1) * SAMPLE_STRIDE, self.count)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = start + mid * size
+            if mm[offset : offset + width] < padded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key(lo) == padded:
+            return lo
+        return -1
+
+    def _value(self, record: int) -> Dict[str, str]:
+        return {self.column: self.values[self._mm[self._start + record * self._record_size + self.key_width]]}
+
+    def __getitem__(self, key: str) -> Dict[str, str]:
+        record = self._find(key)
+        if record < 0:
+            raise KeyError(key)
+        return self._value(record)
+
+    def get(self, key: str, default=None):
+        record = self._find(key)
+        return self._value(record) if record >= 0 else default
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        for record in range(self.count):
+            yield self._key(record).rstrip(b"\0").decode()
+
+    def close(self) -> None:
+        self._mm.close()
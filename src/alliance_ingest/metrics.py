@@ -0,0 +1,175 @@
+"""
+Runtime metrics of every transform and download launched by the CLI.
+
+Each finished job becomes one JobMetrics record:
+- the wall time, CPU time and peak RSS of the process or worker that ran it;
+- the rows its readers yielded, and those its transform skipped by returning
+  nothing (transforms run in-process only, as `koza transform` subprocesses
+  do not report them);
+- the nodes and edges in its published files;
+- its rows per second;
+- for pipelined transforms, how long the transform loop waited for rows and
+  for room to write, and how full it found its input and output queues.
+
+Records are appended as JSON lines to `metrics.jsonl` in the output
+directory. The latest record of each job can also be written as a Prometheus
+textfile, for node_exporter's textfile collector.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .compression import open_output
+from .configs import load_config
+from .report import find_outputs
+from .scheduler import JobResult
+
+METRICS_FILE = "metrics.jsonl"
+
+PROMETHEUS_PREFIX = "alliance_ingest"
+
+# Prometheus gauges: the record field (or derived value) of each, and its help text
+PROMETHEUS_GAUGES = {
+    "wall_seconds": "Wall time of the job's last run.",
+    "cpu_seconds": "CPU time (user and system) of the job's last run.",
+    "peak_rss_bytes": "Peak resident set size of the job's last run.",
+    "rows_read": "Rows the transform's readers yielded.",
+    "rows_skipped": "Rows the transform skipped without writing entities.",
+    "nodes_written": "Nodes in the transform's output.",
+    "edges_written": "Edges in the transform's output.",
+    "rows_per_second": "Rows read per second of wall time.",
+    "input_wait_seconds": "Seconds a pipelined transform waited for rows from its reader thread.",
+    "output_wait_seconds": "Seconds a pipelined transform waited for room on its writer queue.",
+    "input_queue_depth": "Mean depth of a pipelined transform's input queue, in batches.",
+    "output_queue_depth": "Mean depth of a pipelined transform's output queue, in batches.",
+    "success": "1 if the job's last run succeeded, else 0.",
+    "last_run_timestamp_seconds": "Unix time the job's last run finished.",
+}
+
+COUNT_CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class JobMetrics:
+    """The measurements of one finished transform or download."""
+
+    name: str
+    kind: str
+    status: str
+    finished: str
+    wall_seconds: float
+    cpu_seconds: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    rows_read: Optional[int] = None
+    rows_skipped: Optional[int] = None
+    nodes_written: Optional[int] = None
+    edges_written: Optional[int] = None
+    rows_per_second: Optional[float] = None
+    input_wait_seconds: Optional[float] = None
+    output_wait_seconds: Optional[float] = None
+    input_queue_depth: Optional[float] = None
+    output_queue_depth: Optional[float] = None
+
+
+def count_records(path: Path) -> int:
+    """The number of nodes or edges in an output file: data lines of TSV and JSON Lines, rows of Parquet."""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    lines = 0
+    with open_output(path, "rb") as fh:
+        while chunk := fh.read(COUNT_CHUNK_SIZE):
+            lines += chunk.count(b"\n")
+    return lines - 1 if ".tsv" in path.suffixes else lines
+
+
+def written_counts(config: Path, output_dir: Path) -> Dict[str, int]:
+    """The nodes and edges a transform config wrote to output_dir, counted from its cheapest file of each kind."""
+    name = load_config(config)["name"]
+    return {output.kind: count_records(output.path) for output in find_outputs(output_dir) if output.name == name}
+
+
+def _rounded(value: Optional[float], digits: int) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+def job_metrics(
+    result: JobResult, kind: str, config: Optional[Path] = None, output_dir: Optional[Path] = None
+) -> JobMetrics:
+    """
+    The metrics of a finished job; with a config and output_dir, its written nodes and edges are counted.
+
+    The outputs of a skipped transform are not counted: it wrote nothing, and
+    counting means reading every one of its files again.
+    """
+    status = "skipped" if result.skipped else "ok" if result.ok else "failed"
+    written = written_counts(config, output_dir) if config and output_dir and result.ok and not result.skipped else {}
+    rows_per_second = None
+    if result.rows_read is not None and result.elapsed > 0 and not result.skipped:
+        rows_per_second = round(result.rows_read / result.elapsed, 1)
+    return JobMetrics(
+        name=result.name,
+        kind=kind,
+        status=status,
+        finished=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        wall_seconds=round(result.elapsed, 3),
+        cpu_seconds=None if result.cpu_seconds is None else round(result.cpu_seconds, 3),
+        peak_rss_bytes=result.peak_rss,
+        rows_read=result.rows_read,
+        rows_skipped=result.rows_skipped,
+        nodes_written=written.get("nodes"),
+        edges_written=written.get("edges"),
+        rows_per_second=rows_per_second,
+        input_wait_seconds=_rounded(result.input_wait_seconds, 3),
+        output_wait_seconds=_rounded(result.output_wait_seconds, 3),
+        input_queue_depth=_rounded(result.input_queue_depth, 2),
+        output_queue_depth=_rounded(result.output_queue_depth, 2),
+    )
+
+
+def append_metrics(records: List[JobMetrics], output_dir: Path) -> Path:
+    """Append records to the metrics file of output_dir. Returns the file."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / METRICS_FILE
+    with open(path, "a") as fh:
+        for record in records:
+            fh.write(json.dumps(asdict(record)) + "\n")
+    return path
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_prometheus(records: List[JobMetrics], path: Path) -> None:
+    """
+    Write the latest record of each job as Prometheus gauges.
+
+    The file is replaced atomically, as the textfile collector may read it at any time.
+    """
+    latest = {(record.kind, record.name): record for record in records}
+    lines = []
+    for field, help_text in PROMETHEUS_GAUGES.items():
+        name = f"{PROMETHEUS_PREFIX}_job_{field}"
+        samples = []
+        for (kind, job), record in sorted(latest.items()):
+            if field == "success":
+                value = 0 if record.status == "failed" else 1
+            elif field == "last_run_timestamp_seconds":
+                value = datetime.fromisoformat(record.finished).timestamp()
+            else:
+                value = getattr(record, field)
+            if value is not None:
+                samples.append(f'{name}{{kind="{_label(kind)}",name="{_label(job)}"}} {value}')
+        if samples:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", *samples]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text("\n".join(lines) + "\n")
+    os.replace(tmp, path)
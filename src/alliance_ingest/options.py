@@ -0,0 +1,38 @@
+"""
+Options for in-process transforms.
+
+Kept free of koza imports so the CLI can build them without paying for the
+imports that the warm workers preload.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+# Output format written by our ParquetWriter, in addition to koza's own
+PARQUET_FORMAT = "parquet"
+
+# Depth of each queue of a pipelined transform, in batches
+PIPELINE_QUEUE_SIZE = 8
+
+
+@dataclass
+class TransformOptions:
+    """Execution options for a single in-process transform."""
+
+    output_format: str = "tsv"
+    limit: Optional[int] = None
+    progress: bool = False
+    # Read JSON inputs incrementally, keeping only the properties in the config's `projection`,
+    # and split only the projected columns out of delimited inputs
+    stream: bool = False
+    # Fully validate one in every validate_sample biolink objects instead of all of them
+    validate_sample: Optional[int] = None
+    # Directory to write the transform's trace spans to, for `ingest run --trace`
+    trace_dir: Optional[str] = None
+    # Read and write on threads of their own, connected to the transform loop by queues of queue_size batches
+    pipeline: bool = False
+    queue_size: int = PIPELINE_QUEUE_SIZE
+    # Read each input file's rows from its decoded-row cache entry, writing the entry on first read
+    cache: bool = False
+    # Compress TSV and JSON Lines outputs as they are written, with an OUTPUT_COMPRESSIONS key (gz, zstd)
+    output_compression: Optional[str] = None
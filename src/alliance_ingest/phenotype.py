@@ -1,5 +1,4 @@
-import uuid
-from typing import List
+from typing import List, Optional
 
 # from source_translation import source_map
 from biolink_model.datamodel.pydanticmodel_v2 import (
@@ -12,6 +11,9 @@ from biolink_model.datamodel.pydanticmodel_v2 import (
 import koza
 from loguru import logger
 
+from alliance_ingest.construct import build
+from alliance_ingest.ids import association_id
+
 source_map = {
     "FB": "infores:flybase",
     "MGI": "infores:mgi",
@@ -70,25 +72,37 @@ def transform_record(koza_transform, row: dict) -> List:
     else:
         raise ValueError(f"Unknown category {category} for {id}")
 
-    association = EdgeClass(
-        id="uuid:" + str(uuid.uuid1()),
+    # The condition qualifiers are part of the association ID, so collect them first
+    qualifiers: Optional[List[str]] = None
+    if "conditionRelations" in row.keys() and row["conditionRelations"] is not None:
+        qualifiers = []
+        for conditionRelation in row["conditionRelations"]:
+            for condition in conditionRelation["conditions"]:
+                if condition["conditionClassId"]:
+                    qualifier_term = condition["conditionClassId"]
+                    qualifiers.append(qualifier_term)
+
+    publications = [row["evidence"]["publicationId"]]
+    primary_knowledge_source = source_map[row["objectId"].split(':')[0]]
+    association = build(
+        EdgeClass,
+        id="uuid:" + association_id(
+            subject=id,
+            predicate="biolink:has_phenotype",
+            object=phenotypic_feature_id,
+            qualifiers=qualifiers,
+            publications=publications,
+            source=primary_knowledge_source,
+        ),
         subject=id,
         predicate="biolink:has_phenotype",
         object=phenotypic_feature_id,
-        publications=[row["evidence"]["publicationId"]],
+        qualifiers=qualifiers,
+        publications=publications,
         aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
-        primary_knowledge_source=source_map[row["objectId"].split(':')[0]],
+        primary_knowledge_source=primary_knowledge_source,
         knowledge_level=KnowledgeLevelEnum.knowledge_assertion,
         agent_type=AgentTypeEnum.manual_agent,
     )
 
-    if "conditionRelations" in row.keys() and row["conditionRelations"] is not None:
-        qualifiers: List[str] = []
-        for conditionRelation in row["conditionRelations"]:
-            for condition in conditionRelation["conditions"]:
-                if condition["conditionClassId"]:
-                    qualifier_term = condition["conditionClassId"]
-                    qualifiers.append(qualifier_term)
-        association.qualifiers = qualifiers
-
     return [association]
@@ -0,0 +1,242 @@
+"""
+Pipelined transforms: reading and writing on threads of their own.
+
+A koza runner reads a row, transforms it and writes its entities on one
+thread, so gzip decompression and parsing, the transform code, and
+serialization and compression take turns. With a pipeline, each of the
+runner's data sources is read on a reader thread, and the writer's writes run
+on a writer thread. Both are connected to the transform loop by bounded
+queues:
+- the reader thread puts batches of rows on the input queue, and blocks while
+  it is full;
+- the transform loop puts the entities of its rows on the output queue in
+  batches, and blocks while it is full.
+zlib and file I/O release the GIL, so they overlap with the transform code,
+while the bounds keep a fast reader or a slow writer from piling rows up in
+memory.
+
+Each queue records how full the transform loop found it and how long each
+side waited on it. Time the transform loop spent waiting for rows means the
+transform is reader-bound; time it spent waiting for room on the output queue
+means it is writer-bound. Either way a deeper queue only helps with bursts.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Rows, or writes, handed over a queue at a time
+BATCH_SIZE = 256
+
+# Seconds a blocked side waits before checking whether the other side has stopped
+_POLL_SECONDS = 0.1
+
+# Put on a queue after the last batch
+_DONE = object()
+
+
+@dataclass
+class QueueStats:
+    """How full a queue was when the transform loop used it, and how long its two sides waited on it."""
+
+    capacity: int
+    batches: int = 0
+    depth_total: int = 0
+    max_depth: int = 0
+    # Seconds the producer waited for room, and the consumer for a batch
+    put_wait: float = 0.0
+    get_wait: float = 0.0
+
+    @property
+    def mean_depth(self) -> float:
+        return self.depth_total / self.batches if self.batches else 0.0
+
+    def sample(self, depth: int) -> None:
+        self.batches += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+
+    def describe(self) -> str:
+        return (
+            f"{self.batches} batches, depth {self.mean_depth:.1f} mean / {self.max_depth} max of {self.capacity}, "
+            f"waits {self.put_wait:.2f}s for room, {self.get_wait:.2f}s for batches"
+        )
+
+
+class _Channel:
+    """A bounded queue of batches that times the waits on it, and gives up on either side once stopped."""
+
+    def __init__(self, size: int, stats: QueueStats):
+        self.queue: queue.Queue = queue.Queue(size)
+        self.stats = stats
+        self.stopped = threading.Event()
+
+    def put(self, item: Any, sample: bool = False) -> bool:
+        """Put item on the queue, blocking while it is full. Returns False if the channel was stopped."""
+        if sample:
+            self.stats.sample(self.queue.qsize())
+        start = time.perf_counter()
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            self.stats.put_wait += time.perf_counter() - start
+            return True
+        return False
+
+    def get(self, sample: bool = False) -> Any:
+        """The next item on the queue, blocking while it is empty, or _DONE if the channel was stopped."""
+        if sample:
+            self.stats.sample(self.queue.qsize())
+        start = time.perf_counter()
+        while not self.stopped.is_set():
+            try:
+                item = self.queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            self.stats.get_wait += time.perf_counter() - start
+            return item
+        return _DONE
+
+
+def _read_ahead(rows: Iterable, channel: _Channel, batch_size: int) -> None:
+    """Put the rows on channel in batches, then _DONE, or the exception reading them raised."""
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                if not channel.put(batch):
+                    return
+                batch = []
+        if batch and not channel.put(batch):
+            return
+        channel.put(_DONE)
+    except BaseException as e:
+        channel.put(e)
+
+
+def threaded_rows(rows: Iterable, size: int, stats: QueueStats, batch_size: int = BATCH_SIZE) -> Iterator:
+    """
+    Yield rows read on a thread of its own, at most size batches ahead.
+
+    The thread starts with the first row asked for. Errors reading the rows
+    are raised here, and closing the iterator early stops the thread.
+    """
+    channel = _Channel(size, stats)
+    thread = threading.Thread(target=_read_ahead, args=(rows, channel, batch_size), name="pipeline reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = channel.get(sample=True)
+            if batch is _DONE:
+                return
+            if isinstance(batch, BaseException):
+                raise batch
+            yield from batch
+    finally:
+        channel.stopped.set()
+        thread.join()
+
+
+class ThreadedWriter:
+    """
+    Run a koza writer's writes on a thread of their own, fed in batches through a queue of size batches.
+
+    Replaces the writer's write and finalize: finalize waits for the queued
+    writes, then finalizes the writer. Errors writing are raised from the
+    next write or from finalize.
+    """
+
+    def __init__(self, writer, size: int, stats: QueueStats, batch_size: int = BATCH_SIZE):
+        self.writer_write = writer.write
+        self.writer_finalize = writer.finalize
+        self.batch_size = batch_size
+        self.batch: List[Any] = []
+        self.error = None
+        self.channel = _Channel(size, stats)
+        self.thread = threading.Thread(target=self._write_batches, name="pipeline writer", daemon=True)
+        self.thread.start()
+        writer.write = self.write
+        writer.finalize = self.finalize
+
+    def _write_batches(self) -> None:
+        try:
+            while (batch := self.channel.get()) is not _DONE:
+                for entities in batch:
+                    self.writer_write(entities)
+        except BaseException as e:
+            self.error = e
+            self.channel.stopped.set()
+
+    def _put(self, item: Any) -> None:
+        if not self.channel.put(item, sample=True):
+            raise self.error or RuntimeError("The pipeline writer was stopped")
+
+    def write(self, entities) -> None:
+        self.batch.append(entities)
+        if len(self.batch) == self.batch_size:
+            self._put(self.batch)
+            self.batch = []
+
+    def finalize(self) -> None:
+        if self.batch:
+            self._put(self.batch)
+            self.batch = []
+        self._put(_DONE)
+        self.thread.join()
+        if self.error:
+            raise self.error
+        self.writer_finalize()
+
+    def stop(self) -> None:
+        """Stop the writer thread without writing what is still queued, e.g. after the transform failed."""
+        self.channel.stopped.set()
+        self.thread.join()
+
+
+@dataclass
+class Pipeline:
+    """The queues of a pipelined runner."""
+
+    input: QueueStats
+    output: QueueStats
+    writer: ThreadedWriter
+
+    def stats(self) -> Dict[str, float]:
+        """
+        The transform loop's waits on each queue and the mean depth it found them at.
+
+        Waiting on the input queue means the transform was reader-bound, and on
+        the output queue writer-bound.
+        """
+        return {
+            "input_wait_seconds": self.input.get_wait,
+            "output_wait_seconds": self.output.put_wait,
+            "input_queue_depth": self.input.mean_depth,
+            "output_queue_depth": self.output.mean_depth,
+        }
+
+    def summary(self) -> str:
+        return f"Pipeline input queue: {self.input.describe()}; output queue: {self.output.describe()}"
+
+    def stop(self) -> None:
+        self.writer.stop()
+
+
+def use_pipeline(runner, size: int, batch_size: int = BATCH_SIZE) -> Pipeline:
+    """
+    Read each of the runner's data sources on a reader thread and write on a writer thread.
+
+    size is the depth of each queue, in batches of batch_size rows or writes.
+    Apply before anything else wraps the runner's data or writer, so that
+    only the reading and writing themselves move off the transform loop.
+    """
+    input_stats = QueueStats(size)
+    output_stats = QueueStats(size)
+    runner.data = {tag: threaded_rows(rows, size, input_stats, batch_size) for tag, rows in runner.data.items()}
+    writer = ThreadedWriter(runner.writer, size, output_stats, batch_size)
+    return Pipeline(input_stats, output_stats, writer)
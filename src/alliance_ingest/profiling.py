@@ -0,0 +1,287 @@
+"""
+Profile transforms in this process, for `ingest transform --profile`.
+
+CPU mode runs the transform under cProfile and writes:
+- `<name>.prof`, the cProfile dump, for pstats, snakeviz and the like;
+- `<name>.collapsed`, stacks sampled from the transform's thread, one line per
+  stack with its frames joined by ";" and followed by its sample count, as
+  read by flamegraph.pl, inferno and speedscope.
+cProfile only records callers and callees, not whole stacks, so the stacks
+for the flame graph are sampled separately while the profile runs.
+
+Memory mode runs the transform under tracemalloc and writes
+`<name>.memory.txt`. The report holds the peak traced memory and a breakdown
+of a snapshot taken between rows near the peak, by area (biolink model construction,
+reader, writer, transform code, other) and by allocation site within each
+area. An allocation belongs to the area of the innermost frame of its
+traceback that is in one of them. So a pydantic allocation made by a
+transform's entity constructor counts as biolink model construction, and a
+json.loads called from a koza reader counts as reader.
+
+Both modes run the transform exactly as a warm worker does, after importing
+the modules a worker preloads, so --limit, --stream and the other transform
+options apply and the imports are left out of the profile.
+"""
+
+import cProfile
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from .configs import load_config
+from .options import TransformOptions
+from .scheduler import staging_path
+from .worker import preload, run_transform
+
+PROFILE_DIR = "profiles"
+
+T = TypeVar("T")
+
+# Seconds between stack samples in CPU mode
+SAMPLE_INTERVAL = 0.001
+
+# A new snapshot is taken when traced memory grows this much past the last one
+SNAPSHOT_GROWTH = 1.25
+
+TRACEBACK_FRAMES = 30
+
+TOP_SITES = 15
+
+# Areas of the memory report, in the order they are matched against a traceback's frames
+MEMORY_AREAS = {
+    "biolink model construction": ["/biolink_model/", "/pydantic/", "/pydantic_core/", "alliance_ingest/construct.py"],
+    "reader": ["/koza/io/reader/", "alliance_ingest/readers.py", "alliance_ingest/jsonstream.py"],
+    "writer": ["/koza/io/writer/", "alliance_ingest/writers.py"],
+}
+
+
+class ProfileMode(str, Enum):
+    """What `ingest transform --profile` measures."""
+
+    cpu = "cpu"
+    memory = "memory"
+
+
+class _Poller(threading.Thread):
+    """Call poll every interval seconds until stopped."""
+
+    def __init__(self, poll: Callable[[], None], interval: float):
+        super().__init__(daemon=True)
+        self.poll = poll
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def _in_new_thread(target: Callable[..., T], *args) -> T:
+    """
+    Call target on a thread of its own and return its result.
+
+    The thread's stack starts at the call, not under the CLI's dozen or so
+    frames, which tracemalloc would otherwise record for every allocation.
+    """
+    outcome: Dict[str, Any] = {}
+
+    def call():
+        try:
+            outcome["result"] = target(*args)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=call, name="profile")
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({path.parent.name}/{path.name}:{code.co_firstlineno})".replace(";", ",")
+
+
+def collapsed_stacks(samples: Counter) -> str:
+    """Sampled stacks (tuples of frame labels, outermost first) in the collapsed stack format."""
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in samples.most_common())
+
+
+def profile_cpu(run: Callable[[], None], name: str, profile_dir: Path) -> List[Path]:
+    """Run under cProfile, sampling the stacks of this thread. Returns the dump and collapsed stack files."""
+    thread_id = threading.get_ident()
+    samples: Counter = Counter()
+
+    def sample():
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        # Stacks start at run, leaving out the frames of the caller
+        while frame is not None and frame.f_code is not run.__code__:
+            stack.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        if stack and frame is not None:
+            samples[tuple(reversed(stack))] += 1
+
+    profiler = cProfile.Profile()
+    sampler = _Poller(sample, SAMPLE_INTERVAL)
+    # Hand the GIL over often enough for the sampler to keep to its interval
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(SAMPLE_INTERVAL)
+    sampler.start()
+    try:
+        profiler.runcall(run)
+    finally:
+        sampler.stop()
+        sys.setswitchinterval(switch_interval)
+
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    dump = profile_dir / f"{name}.prof"
+    profiler.dump_stats(str(dump))
+    collapsed = profile_dir / f"{name}.collapsed"
+    collapsed.write_text(collapsed_stacks(samples))
+    return [dump, collapsed]
+
+
+def memory_area(traceback: tracemalloc.Traceback, transform_code: Optional[Path] = None) -> str:
+    """The area of an allocation: that of the innermost frame of its traceback in one of them."""
+    areas = dict(MEMORY_AREAS)
+    if transform_code:
+        areas["transform code"] = [f"{transform_code.parent.name}/{transform_code.name}"]
+    # Frames are ordered from the oldest to the most recent
+    for frame in reversed(traceback):
+        filename = frame.filename.replace("\\", "/")
+        for area, patterns in areas.items():
+            if any(pattern in filename for pattern in patterns):
+                return area
+    return "other"
+
+
+def memory_report(
+    snapshot: tracemalloc.Snapshot, peak: int, transform_code: Optional[Path] = None, top: int = TOP_SITES
+) -> str:
+    """A text report of the memory held in snapshot by area, with the top allocation sites of each."""
+    by_area: Dict[str, int] = defaultdict(int)
+    sites: Dict[str, Counter] = defaultdict(Counter)
+    for stat in snapshot.statistics("traceback"):
+        area = memory_area(stat.traceback, transform_code)
+        by_area[area] += stat.size
+        frame = stat.traceback[-1]
+        sites[area][f"{frame.filename}:{frame.lineno}"] += stat.size
+    total = sum(by_area.values())
+
+    lines = [
+        f"Peak traced memory: {peak / 1e6:.1f} MB",
+        f"Held at the snapshot nearest the peak: {total / 1e6:.1f} MB",
+        "",
+        "By area:",
+    ]
+    for area, size in sorted(by_area.items(), key=lambda item: -item[1]):
+        lines.append(f"  {area:<28} {size / 1e6:10.2f} MB  {size / total:6.1%}" if total else f"  {area}")
+    for area in sorted(by_area, key=by_area.get, reverse=True):
+        lines += ["", f"Top allocation sites, {area}:"]
+        for site, site_size in sites[area].most_common(top):
+            lines.append(f"  {site_size / 1e3:12,.1f} KB  {site}")
+    return "\n".join(lines) + "\n"
+
+
+def profile_memory(
+    run: Callable[[Callable[[Any], None]], None],
+    name: str,
+    profile_dir: Path,
+    transform_code: Optional[Path] = None,
+    top: int = TOP_SITES,
+) -> List[Path]:
+    """
+    Run under tracemalloc, keeping the largest snapshot taken between rows as memory grows. Returns the report file.
+
+    run is called with a function that instruments the KozaRunner. The peak
+    is tracemalloc's own, so it includes allocations within a row.
+    """
+    # The kept snapshot is itself traced memory, so it is subtracted from the peak
+    state = {"size": 0, "peak": 0, "overhead": 0, "snapshot": None}
+
+    def peak() -> int:
+        return tracemalloc.get_traced_memory()[1] - state["overhead"]
+
+    def check():
+        current = tracemalloc.get_traced_memory()[0] - state["overhead"]
+        if current > state["size"] * SNAPSHOT_GROWTH:
+            state["peak"] = max(state["peak"], peak())
+            state["snapshot"] = None
+            before = tracemalloc.get_traced_memory()[0]
+            state["snapshot"] = tracemalloc.take_snapshot()
+            state["size"] = current
+            state["overhead"] = tracemalloc.get_traced_memory()[0] - before
+            # Taking a snapshot briefly allocates much more than it keeps
+            tracemalloc.reset_peak()
+
+    def checked(rows: Iterable) -> Iterator:
+        for row in rows:
+            check()
+            yield row
+
+    def instrument(runner) -> None:
+        runner.data = {tag: checked(rows) for tag, rows in runner.data.items()}
+
+    tracemalloc.start(TRACEBACK_FRAMES)
+    try:
+        run(instrument)
+    finally:
+        state["peak"] = max(state["peak"], peak())
+        snapshot = state["snapshot"] or tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    report = profile_dir / f"{name}.memory.txt"
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    report.write_text(memory_report(snapshot.filter_traces(ignored), state["peak"], transform_code, top))
+    return [report]
+
+
+def transform_code(config: Path) -> Optional[Path]:
+    """The transform code file of a config, resolved against the config directory."""
+    code = (load_config(config).get("transform") or {}).get("code")
+    return (config.parent / code).resolve() if code else None
+
+
+def profile_transform(
+    config: Path, output_dir: Path, mode: ProfileMode, options: TransformOptions, top: int = TOP_SITES
+) -> Tuple[List[Path], float]:
+    """
+    Profile one transform config in this process, writing the profiles to output_dir/profiles.
+
+    The transform's own outputs go to a scratch staging directory and are
+    discarded, so a profile of a slice never replaces published outputs.
+    Returns the files written and the wall time of the profiled run.
+    """
+    scratch = staging_path(str(output_dir), f"profile-{config.stem}")
+    shutil.rmtree(scratch, ignore_errors=True)
+    scratch.mkdir(parents=True)
+    profile_dir = output_dir / PROFILE_DIR
+    # Import koza and biolink as a warm worker has, so the profile is of the transform and not of imports
+    preload()
+
+    def run(instrument: Optional[Callable[[Any], None]] = None):
+        run_transform(str(config), str(scratch), options, instrument=instrument)
+
+    start = time.perf_counter()
+    try:
+        if mode == ProfileMode.cpu:
+            written = _in_new_thread(profile_cpu, run, config.stem, profile_dir)
+        else:
+            written = _in_new_thread(profile_memory, run, config.stem, profile_dir, transform_code(config), top)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return written, time.perf_counter() - start
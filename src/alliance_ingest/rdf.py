@@ -0,0 +1,267 @@
+"""
+N-Triples export of every transform's nodes and edges.
+
+kgx serializes each node and edge on its own, so a nodes or edges file can be
+cut into chunks that are converted independently. TSV and JSON Lines files
+are split at line boundaries into byte ranges of about CHUNK_SIZE bytes, and
+Parquet files into their row groups. Compressed files, such as those of
+--output-compression, can only be read from their start, so they are
+decompressed as they are read and cut into chunk files of about CHUNK_SIZE
+bytes in the staging directory. The chunks are converted to gzipped
+N-Triples in a process pool. The compressed chunks are then appended, in
+order, to `{name}.nt.gz`. A sequence of gzip members is itself a valid gzip
+file, so nothing is compressed twice. Only a few chunks per worker are in
+flight at a time, and a compressed file is only cut as far as those chunks,
+so memory and staging disk use do not grow with the graph.
+"""
+
+import os
+import shutil
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, groupby
+from pathlib import Path
+from typing import IO, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .compression import COMPRESSED_SUFFIXES, open_output
+from .report import OutputFile, find_outputs
+from .scheduler import publish_outputs, staging_path
+
+CHUNK_SIZE = 32 << 20
+
+COPY_CHUNK_SIZE = 1 << 20
+
+RDF_FILE = "{name}.nt.gz"
+
+# Sources of each transform's records, most preferred first: files that can be read in place come before compressed ones
+RDF_SOURCE_SUFFIXES = [".tsv", ".jsonl", ".parquet", ".tsv.zst", ".jsonl.zst", ".tsv.gz", ".jsonl.gz"]
+
+# kgx tells nodes from edges by the file name, and records that name as the knowledge source, so each chunk is
+# written under the name of the transform's own TSV or JSON Lines file, in a directory of its own
+CHUNK_DIR = "chunk-{index:06d}"
+
+# Chunks queued per worker, so the next chunk is ready when a worker frees up
+CHUNKS_PER_WORKER = 2
+
+
+@dataclass
+class Chunk:
+    """
+    Part of a nodes or edges file: a byte range of a text file, or a row group of a Parquet file.
+
+    A chunk cut out of a compressed file has the byte range of its own file, at path.
+    """
+
+    output: OutputFile
+    index: int
+    start: int
+    end: int
+    path: Optional[Path] = None
+
+    @property
+    def format(self) -> str:
+        # Parquet rows are handed to kgx as they would have been written to TSV
+        return "jsonl" if self.output.suffix.startswith(".jsonl") else "tsv"
+
+
+def plan_chunks(output: OutputFile, chunk_size: int = CHUNK_SIZE, first_index: int = 0) -> List[Chunk]:
+    """Split an uncompressed nodes or edges file into chunks that start and end on record boundaries."""
+    if output.suffix.endswith(COMPRESSED_SUFFIXES):
+        raise ValueError(f"{output.path} can only be read from its start, and is cut by cut_chunks")
+    if output.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        row_groups = pq.ParquetFile(output.path).num_row_groups
+        return [Chunk(output, first_index + i, i, i + 1) for i in range(row_groups)]
+
+    chunks = []
+    size = output.path.stat().st_size
+    with open(output.path, "rb") as fh:
+        start = len(fh.readline()) if output.suffix == ".tsv" else 0
+        while start < size:
+            end = start + chunk_size
+            if end < size:
+                # Move the end on to the start of the next line
+                fh.seek(end - 1)
+                fh.readline()
+                end = fh.tell()
+            end = min(end, size)
+            chunks.append(Chunk(output, first_index + len(chunks), start, end))
+            start = end
+    return chunks
+
+
+def _line_blocks(fh: IO[bytes]) -> Iterator[bytes]:
+    """Blocks of a binary stream that end on line boundaries, apart from a last line without a newline."""
+    carry = b""
+    while block := fh.read(COPY_CHUNK_SIZE):
+        block = carry + block
+        cut = block.rfind(b"\n") + 1
+        carry = block[cut:]
+        if cut:
+            yield block[:cut]
+    if carry:
+        yield carry
+
+
+def cut_chunks(
+    output: OutputFile, staging_dir: Path, chunk_size: int = CHUNK_SIZE, first_index: int = 0
+) -> Iterator[Chunk]:
+    """
+    Cut a compressed nodes or edges file into chunk files in staging_dir as it is decompressed.
+
+    Each chunk ends on a line boundary and, for TSV, starts with the file's header. The next chunk is only cut
+    when it is asked for, so a caller that holds back bounds the staging disk in use.
+    """
+    index = first_index
+    path = None
+    written = 0
+    with open_output(output.path, "rb") as fh:
+        blocks = _line_blocks(fh)
+        header = b""
+        if output.suffix.startswith(".tsv"):
+            first = next(blocks, b"")
+            cut = first.find(b"\n") + 1 or len(first)
+            header = first[:cut]
+            blocks = chain([first[cut:]], blocks)
+        for block in blocks:
+            pos = 0
+            while pos < len(block):
+                if path is None:
+                    path = staging_dir / f"{CHUNK_DIR.format(index=index)}.records"
+                    path.write_bytes(header)
+                    written = 0
+                end = pos + chunk_size - written
+                if end < len(block):
+                    # Move the end on to the start of the next line, as plan_chunks does
+                    end = block.find(b"\n", end - 1) + 1 or len(block)
+                end = min(end, len(block))
+                with open(path, "ab") as out:
+                    out.write(block[pos:end])
+                written += end - pos
+                pos = end
+                if written >= chunk_size:
+                    yield Chunk(output, index, 0, path.stat().st_size, path)
+                    index += 1
+                    path = None
+    if path is not None:
+        yield Chunk(output, index, 0, path.stat().st_size, path)
+
+
+def _write_records(chunk: Chunk, path: Path) -> None:
+    """Write the records of a chunk as a file kgx can read."""
+    source = chunk.output.path
+    if chunk.output.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        from koza.io.utils import build_export_row
+
+        table = pq.ParquetFile(source).read_row_group(chunk.start)
+        with open(path, "w") as out:
+            out.write("\t".join(table.column_names) + "\n")
+            # As koza's TSVWriter writes a row
+            for record in table.to_pylist():
+                row = build_export_row(record, list_delimiter="|")
+                out.write("\t".join(str(row[column]) if column in row else "" for column in table.column_names) + "\n")
+    elif chunk.path is not None:
+        # Cut out of a compressed file by cut_chunks, with its header
+        chunk.path.replace(path)
+    else:
+        with open(source, "rb") as fh, open(path, "wb") as out:
+            if chunk.format == "tsv":
+                out.write(fh.readline())
+            fh.seek(chunk.start)
+            remaining = chunk.end - chunk.start
+            while remaining and (block := fh.read(min(remaining, COPY_CHUNK_SIZE))):
+                out.write(block)
+                remaining -= len(block)
+
+
+def write_chunk(chunk: Chunk, staging_dir: Path) -> Path:
+    """Convert one chunk to gzipped N-Triples in staging_dir. Returns the .nt.gz file."""
+    from kgx.cli.cli_utils import transform as kgx_transform
+
+    chunk_dir = staging_dir / CHUNK_DIR.format(index=chunk.index)
+    chunk_dir.mkdir(exist_ok=True)
+    records = chunk_dir / f"{chunk.output.name}_{chunk.output.kind}.{chunk.format}"
+    target = staging_dir / f"{chunk_dir.name}.nt.gz"
+    _write_records(chunk, records)
+    try:
+        kgx_transform(
+            inputs=[str(records)],
+            input_format=chunk.format,
+            stream=True,
+            output=str(target),
+            output_format="nt",
+            output_compression="gz",
+        )
+    finally:
+        shutil.rmtree(chunk_dir)
+    return target
+
+
+def _transform_chunks(output_dir: Path, chunk_size: int) -> Iterator[Tuple[str, Path, Chunk]]:
+    """The chunks of every transform, nodes before edges, with the staging directory of each transform."""
+    outputs = sorted(find_outputs(output_dir, RDF_SOURCE_SUFFIXES), key=lambda output: output.name)
+    for name, files in groupby(outputs, key=lambda output: output.name):
+        staging_dir = staging_path(str(output_dir), f"{name}.rdf")
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        index = 0
+        for output in sorted(files, key=lambda output: output.kind != "nodes"):
+            if output.suffix.endswith(COMPRESSED_SUFFIXES):
+                chunks: Iterable[Chunk] = cut_chunks(output, staging_dir, chunk_size, index)
+            else:
+                chunks = plan_chunks(output, chunk_size, index)
+            for chunk in chunks:
+                yield name, staging_dir, chunk
+                index += 1
+        if not index:
+            staging_dir.rmdir()
+
+
+def export_rdf(output_dir: Path, max_workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Dict[Path, int]:
+    """
+    Write `{name}.nt.gz` for every transform with nodes or edges in output_dir.
+
+    Returns the number of chunks each file was converted in.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    counts: Dict[Path, int] = {}
+    pending: Deque[Tuple[str, Path, Future]] = deque()
+    current: Optional[Tuple[str, Path]] = None
+    out = None
+
+    def append(name: str, staging_dir: Path, future: Future) -> None:
+        nonlocal current, out
+        if current != (name, staging_dir):
+            finish()
+            current = (name, staging_dir)
+            out = open(staging_dir / RDF_FILE.format(name=name), "wb")
+            counts[output_dir / RDF_FILE.format(name=name)] = 0
+        part = future.result()
+        with open(part, "rb") as fh:
+            shutil.copyfileobj(fh, out, COPY_CHUNK_SIZE)
+        part.unlink()
+        counts[output_dir / RDF_FILE.format(name=name)] += 1
+
+    def finish() -> None:
+        if current is not None:
+            out.close()
+            publish_outputs(current[1], output_dir)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            for name, staging_dir, chunk in _transform_chunks(output_dir, chunk_size):
+                if len(pending) >= workers * CHUNKS_PER_WORKER:
+                    append(*pending.popleft())
+                pending.append((name, staging_dir, pool.submit(write_chunk, chunk, staging_dir)))
+            while pending:
+                append(*pending.popleft())
+            finish()
+        except BaseException:
+            for *_, future in pending:
+                future.cancel()
+            if out is not None:
+                out.close()
+            raise
+    return counts
@@ -0,0 +1,346 @@
+"""
+Alternative koza data sources used by the in-process runner.
+
+They yield the same row dicts as koza's own Source for the same reader config,
+honouring files, filters, required_properties and the row limit. With a
+projection, rows only hold the listed properties or columns.
+"""
+
+import csv
+import io
+import sys
+from itertools import chain
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from koza.io.reader.csv_reader import FIELDTYPE_CLASS, CSVReader
+from koza.io.utils import check_data
+from koza.model.formats import InputFormat
+from koza.model.reader import CSVReaderConfig, FieldType, JSONReaderConfig
+from koza.utils.row_filter import RowFilter
+from loguru import logger
+
+from .cache import cached_rows
+from .files import open_text
+from .gzindex import Offsets, load_gzip_index, read_lines
+from .jsonsplit import load_record_index, read_records
+from .jsonstream import iter_json_array
+
+# A projection tree: each key maps to the projection of its value, or None to keep it whole
+Projection = Dict[str, Optional["Projection"]]
+
+
+def resolve_files(files: List[str], base_directory: Path) -> List[Path]:
+    """Resolve reader files against the config directory the way koza does."""
+    return [Path(f) if Path(f).is_absolute() else base_directory / f for f in files]
+
+
+def build_projection(properties: List[str]) -> Projection:
+    """Turn dotted property paths such as `whereExpressed.stageTermId` into a projection tree."""
+    tree: Projection = {}
+    for prop in properties:
+        node = tree
+        *parents, leaf = prop.split(".")
+        for part in parents:
+            child = node.get(part, {})
+            if child is None:
+                break
+            node = node.setdefault(part, child)
+        else:
+            node[leaf] = None
+    return tree
+
+
+def project(value: Any, projection: Projection) -> Any:
+    """Keep only the projected keys of a record, descending into nested objects and lists of objects."""
+    if isinstance(value, dict):
+        projected = {}
+        for key, sub in projection.items():
+            if key in value:
+                projected[key] = value[key] if sub is None else project(value[key], sub)
+        return projected
+    if isinstance(value, list):
+        return [project(item, projection) for item in value]
+    return value
+
+
+class StreamingJSONSource:
+    """
+    Yield the records of JSON reader files one at a time instead of loading each document.
+
+    With a projection only the listed properties of each record are kept, so
+    nothing else from the record outlives the decode of that one element.
+    """
+
+    def __init__(
+        self,
+        config: JSONReaderConfig,
+        base_directory: Path,
+        row_limit: int = 0,
+        projection: Optional[List[str]] = None,
+    ):
+        self.config = config
+        self.files = resolve_files(config.files, base_directory)
+        self.row_limit = row_limit
+        self.projection = build_projection(projection) if projection else None
+        self._filter = RowFilter(config.filters)
+
+    def _check_required(self, path: Path, item: Any) -> None:
+        if not isinstance(item, dict):
+            raise ValueError(f"Expected JSON objects in {path}, found {type(item).__name__}")
+        required = self.config.required_properties or []
+        missing_properties = [prop for prop in required if not check_data(item, prop)]
+        if missing_properties:
+            raise ValueError(
+                f"Required properties are missing from {path}\n"
+                f"Missing properties: {missing_properties}\n"
+                f"Row: {item}"
+            )
+
+    def _items(self, path: Path) -> Iterator[Any]:
+        with open_text(path) as fh:
+            yield from iter_json_array(fh, self.config.json_path)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        num_rows = 0
+        for path in self.files:
+            for item in self._items(path):
+                self._check_required(path, item)
+                if self._filter and not self._filter.include_row(item):
+                    continue
+                yield project(item, self.projection) if self.projection else item
+
+                num_rows += 1
+                if self.row_limit and num_rows == self.row_limit:
+                    logger.info(f"Reached row limit {self.row_limit} (read {num_rows})")
+                    return
+
+
+class RangeJSONSource(StreamingJSONSource):
+    """
+    Yield the records of one range of the array of an indexed JSON file.
+
+    The range is a pair of byte offsets at record starts of the file's
+    record index (see jsonsplit), the second None for the end of the array.
+    Records are checked, filtered and projected as in StreamingJSONSource.
+    """
+
+    def __init__(
+        self,
+        config: JSONReaderConfig,
+        path: Path,
+        offsets: Offsets,
+        row_limit: int = 0,
+        projection: Optional[List[str]] = None,
+    ):
+        super().__init__(config, path.parent, row_limit, projection)
+        self.files = [path]
+        self.offsets = offsets
+        index = load_record_index(path, config.json_path)
+        if index is None:
+            raise ValueError(f"{path} has no current record index to read a range of")
+        self.index = index
+
+    def _items(self, path: Path) -> Iterator[Any]:
+        return read_records(path, self.index, *self.offsets)
+
+
+class CachedSource(StreamingJSONSource):
+    """
+    Yield the rows of JSON or delimited reader files through the decoded-row cache (see cache).
+
+    Files without a cache entry are parsed as koza's Source parses them, and
+    their rows cached. JSON records are checked, and rows of either kind
+    filtered, projected and limited, as in StreamingJSONSource.
+    """
+
+    def _parse(self, path: Path) -> Iterator[Any]:
+        with open_text(path) as fh:
+            if self.config.format == InputFormat.json:
+                yield from iter_json_array(fh, self.config.json_path)
+            else:
+                yield from CSVReader(fh, self.config)
+
+    def _items(self, path: Path) -> Iterator[Any]:
+        return cached_rows(path, self.config, lambda: self._parse(path))
+
+    def _check_required(self, path: Path, item: Any) -> None:
+        if self.config.format == InputFormat.json:
+            super()._check_required(path, item)
+
+
+class ProjectedTSVSource:
+    """
+    Yield only the projected columns of delimited reader files.
+
+    Each line is scanned with str.find up to the last projected column and
+    only the projected fields are sliced out of it, so wide columns that are
+    not projected (such as the sequences of VARIANT-ALLELE files) are never
+    split into strings of their own. Lines holding the quote character are
+    parsed by the csv module instead, so quoting is handled as koza does.
+    Headers, comments, blank lines, column types and filters follow koza's
+    CSVReader.
+    """
+
+    def __init__(
+        self,
+        config: CSVReaderConfig,
+        base_directory: Path,
+        row_limit: int = 0,
+        projection: Optional[List[str]] = None,
+    ):
+        self.config = config
+        self.files = resolve_files(config.files, base_directory)
+        self.row_limit = row_limit
+        filter_columns = [column_filter.column for column_filter in config.filters]
+        self.projection = list(dict.fromkeys((projection or []) + filter_columns))
+        self._filter = RowFilter(config.filters)
+        # Lines parsed by the csv module can hold columns as wide as the ones this source skips
+        csv.field_size_limit(sys.maxsize)
+
+    def _columns(self, path: Path, header: List[str]) -> List[Tuple[int, str, Callable[[str], Any]]]:
+        """Index, name and converter of each projected column, in file order."""
+        missing = [name for name in self.projection if name not in header]
+        if missing:
+            raise ValueError(f"Projected columns missing in source file {path}: {missing}")
+        type_map = self.config.field_type_map or {}
+        return sorted(
+            (header.index(name), name, FIELDTYPE_CLASS.get(type_map.get(name, FieldType.str), str))
+            for name in self.projection
+        )
+
+    def _rows(self, path: Path, fh: IO[str]) -> Iterator[Dict[str, Any]]:
+        reader = CSVReader(fh, self.config)
+        header = reader.header
+        columns = self._columns(path, header)
+        delimiter = reader.csv_kwargs["delimiter"]
+        quotechar = csv.get_dialect(self.config.dialect).quotechar
+        comment_char = self.config.comment_char
+        width = len(header)
+
+        for line in fh:
+            line = line.rstrip("\r\n")
+            if not line:
+                if self.config.skip_blank_lines:
+                    continue
+                yield {name: convert("NaN") for _, name, convert in columns}
+                continue
+            if quotechar and quotechar in line:
+                # A quoted field may hold delimiters or span lines
+                fields = next(csv.reader(chain([line + "\n"], fh), **reader.csv_kwargs))
+                if comment_char and fields[0].startswith(comment_char):
+                    continue
+                if len(fields) < width:
+                    raise ValueError(f"CSV file {path} is missing {width - len(fields)} column(s)")
+                yield {name: convert(fields[index].strip()) for index, name, convert in columns}
+                continue
+            if comment_char and line.startswith(comment_char):
+                continue
+            found = line.count(delimiter) + 1
+            if found < width:
+                raise ValueError(f"CSV file {path} is missing {width - found} column(s)")
+
+            row = {}
+            column, start = 0, 0
+            for index, name, convert in columns:
+                while column < index:
+                    start = line.find(delimiter, start) + 1
+                    column += 1
+                end = line.find(delimiter, start)
+                row[name] = convert(line[start : end if end >= 0 else len(line)].strip())
+            yield row
+
+    def _open(self, path: Path) -> IO[str]:
+        return open_text(path)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        num_rows = 0
+        for path in self.files:
+            with self._open(path) as fh:
+                for row in self._rows(path, fh):
+                    if self._filter and not self._filter.include_row(row):
+                        continue
+                    yield row
+
+                    num_rows += 1
+                    if self.row_limit and num_rows == self.row_limit:
+                        logger.info(f"Reached row limit {self.row_limit} (read {num_rows})")
+                        return
+
+
+class _LineStream(io.TextIOBase):
+    """A read-once text stream over lines, which koza's CSVReader can rewind before reading."""
+
+    def __init__(self, lines: Iterable[str], name: str):
+        self._lines = iter(lines)
+        # Read by CSVReader for its messages, as of a file
+        self.name = name
+        self._started = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readline(self, size: int = -1) -> str:
+        self._started = True
+        return next(self._lines, "")
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if offset or whence != io.SEEK_SET or self._started:
+            raise io.UnsupportedOperation("A line stream can only be rewound before it is read")
+        return 0
+
+
+class RangeTSVSource(ProjectedTSVSource):
+    """
+    Yield the rows of one range of an indexed gzip delimited file.
+
+    The range is a pair of output offsets at seek points of the file's gzip
+    index (see gzindex), the second None for the end of the file. Only the
+    lines that start in the range are read. The lines before a later range's
+    first row that koza reads for the header (comments and the header line)
+    are read from the start of the file and put in front of them, so rows
+    are parsed as in the whole file: with a projection as ProjectedTSVSource
+    does, and without one by koza's CSVReader. A range must not start inside
+    a quoted field that spans lines.
+    """
+
+    def __init__(
+        self,
+        config: CSVReaderConfig,
+        path: Path,
+        offsets: Offsets,
+        row_limit: int = 0,
+        projection: Optional[List[str]] = None,
+    ):
+        super().__init__(config, path.parent, row_limit, projection)
+        self.files = [path]
+        self.offsets = offsets
+        self.projected = bool(projection)
+        index = load_gzip_index(path)
+        if index is None:
+            raise ValueError(f"{path} has no current gzip index to read a range of")
+        self.index = index
+
+    def _preamble(self, path: Path) -> List[str]:
+        """The lines koza's CSVReader reads from the start of path for the header."""
+        lines = []
+        with open_text(path) as fh:
+
+            def recorded():
+                for line in fh:
+                    lines.append(line)
+                    yield line
+
+            # Reading the header consumes the preamble lines, which recorded() keeps
+            _ = CSVReader(_LineStream(recorded(), str(path)), self.config).header
+        return lines
+
+    def _open(self, path: Path) -> IO[str]:
+        start, end = self.offsets
+        preamble = self._preamble(path) if start else []
+        return _LineStream(chain(preamble, read_lines(path, self.index, start, end)), str(path))
+
+    def _rows(self, path: Path, fh: IO[str]) -> Iterator[Dict[str, Any]]:
+        if self.projected:
+            return super()._rows(path, fh)
+        return iter(CSVReader(fh, self.config))
@@ -0,0 +1,155 @@
+"""
+Category, prefix and predicate breakdowns of every transform's outputs.
+
+Every `{name}_nodes.*` and `{name}_edges.*` file in the output directory is
+counted in one DuckDB session. The per-file aggregates are combined with
+UNION ALL into a single query, so DuckDB plans all the scans together and
+runs them on its thread pool instead of one COPY per file. The small result
+is then split into `{name}_nodes_report.tsv` and `{name}_edges_report.tsv`,
+the files published with each release and rendered by mkdocs-macros.py.
+"""
+
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .compression import open_output
+
+# Output files, most preferred first when a transform has more than one format
+OUTPUT_SUFFIXES = [".parquet", ".tsv", ".tsv.zst", ".tsv.gz", ".jsonl", ".jsonl.zst", ".jsonl.gz"]
+
+REPORT_FILE = "{name}_{kind}_report.tsv"
+
+# Report columns of each kind and the output column each is computed from; *_prefix columns hold the CURIE prefix
+REPORT_COLUMNS = {
+    "nodes": [("category", "category"), ("prefix", "id")],
+    "edges": [
+        ("category", "category"),
+        ("subject_prefix", "subject"),
+        ("predicate", "predicate"),
+        ("object_prefix", "object"),
+    ],
+}
+
+# The name DuckDB gives count(*), kept as the header of the report files
+COUNT_COLUMN = "count_star()"
+
+
+@dataclass
+class OutputFile:
+    """A node or edge file written by a transform."""
+
+    name: str
+    kind: str
+    path: Path
+
+    @property
+    def suffix(self) -> str:
+        return self.path.name[len(f"{self.name}_{self.kind}") :]
+
+
+def other_formats(path: Path, suffixes: List[str] = OUTPUT_SUFFIXES) -> List[Path]:
+    """The paths of a node or edge file in every other output format, whether they exist or not."""
+    for kind in REPORT_COLUMNS:
+        name, found, suffix = path.name.rpartition(f"_{kind}")
+        if found and suffix in suffixes:
+            return [path.with_name(f"{name}_{kind}{other}") for other in suffixes if other != suffix]
+    return []
+
+
+def find_outputs(output_dir: Path, suffixes: List[str] = OUTPUT_SUFFIXES) -> List[OutputFile]:
+    """The node and edge files of every transform in output_dir, one per transform and kind, by suffix preference."""
+    found: Dict[Tuple[str, str], OutputFile] = {}
+    for kind in REPORT_COLUMNS:
+        for path in sorted(output_dir.glob(f"*_{kind}.*")):
+            name, _, suffix = path.name.rpartition(f"_{kind}")
+            if not path.is_file() or suffix not in suffixes:
+                continue
+            output = OutputFile(name, kind, path)
+            current = found.get((name, kind))
+            if current is None or suffixes.index(suffix) < suffixes.index(current.suffix):
+                found[(name, kind)] = output
+    return [found[key] for key in sorted(found)]
+
+
+def _scan(output: OutputFile) -> str:
+    path = str(output.path).replace("'", "''")
+    if output.suffix == ".parquet":
+        return f"read_parquet('{path}')"
+    if output.suffix.startswith(".jsonl"):
+        return f"read_json('{path}', format = 'newline_delimited')"
+    return f"read_csv('{path}', delim = '\\t', header = true, all_varchar = true)"
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _columns(connection, output: OutputFile, scan: str) -> Dict[str, str]:
+    """The column names and DuckDB types of an output file."""
+    if output.suffix.startswith(".tsv"):
+        # Every TSV column is read as text; the header line is enough and spares DuckDB a second sniff of the file
+        with open_output(output.path) as fh:
+            return dict.fromkeys(fh.readline().rstrip("\r\n").split("\t"), "VARCHAR")
+    return {row[0]: row[1] for row in connection.execute(f"DESCRIBE SELECT * FROM {scan}").fetchall()}
+
+
+def _select(connection, output: OutputFile) -> str:
+    """The aggregate of one output file, with NULL for report columns the file does not have."""
+    scan = _scan(output)
+    columns = _columns(connection, output, scan)
+    expressions = []
+    for alias, column in REPORT_COLUMNS[output.kind]:
+        if column not in columns:
+            expression = "NULL"
+        elif columns[column].endswith("[]"):
+            # Lists (Parquet, JSON Lines) are reported as they are written to TSV
+            expression = f"array_to_string({column}, '|')"
+        else:
+            expression = column
+        if alias.endswith("prefix"):
+            expression = f"split_part({expression}, ':', 1)"
+        expressions.append(f"CAST({expression} AS VARCHAR) AS {alias}")
+    # Nodes have no predicate or object columns; pad them to the edge layout
+    for alias, _ in REPORT_COLUMNS["edges"][len(expressions) :]:
+        expressions.append(f"NULL AS {alias}")
+    return (
+        f"SELECT {_literal(output.name)} AS name, {_literal(output.kind)} AS kind, {', '.join(expressions)}, "
+        f"count(*) AS count FROM {scan} GROUP BY ALL"
+    )
+
+
+def build_reports(outputs: List[OutputFile], threads: Optional[int] = None) -> Dict[Tuple[str, str], List[tuple]]:
+    """Count every output in a single query. Returns the sorted report rows of each (name, kind)."""
+    import duckdb
+
+    reports: Dict[Tuple[str, str], List[tuple]] = {(output.name, output.kind): [] for output in outputs}
+    if not outputs:
+        return reports
+    connection = duckdb.connect()
+    try:
+        if threads:
+            connection.execute(f"SET threads TO {int(threads)}")
+        query = " UNION ALL ".join(f"({_select(connection, output)})" for output in outputs)
+        for name, kind, *row in connection.execute(f"SELECT * FROM ({query}) ORDER BY ALL").fetchall():
+            width = len(REPORT_COLUMNS[kind])
+            reports[(name, kind)].append(tuple(row[:width]) + (row[-1],))
+    finally:
+        connection.close()
+    return reports
+
+
+def write_reports(output_dir: Path, report_dir: Optional[Path] = None, threads: Optional[int] = None) -> List[Path]:
+    """Write the node and edge reports of every transform in output_dir. Returns the report files."""
+    report_dir = report_dir or output_dir
+    report_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for (name, kind), rows in build_reports(find_outputs(output_dir), threads).items():
+        path = report_dir / REPORT_FILE.format(name=name, kind=kind)
+        with open(path, "w", newline="") as fh:
+            writer = csv.writer(fh, delimiter="\t", lineterminator="\n")
+            writer.writerow([alias for alias, _ in REPORT_COLUMNS[kind]] + [COUNT_COLUMN])
+            writer.writerows(["" if value is None else value for value in row] for row in rows)
+        written.append(path)
+    return written
@@ -0,0 +1,236 @@
+"""
+Build koza runners for in-process execution with alliance-specific options.
+
+The runner itself is koza's; the options here only swap in different data
+sources, writers or mappings around it, so transform code runs unchanged.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from koza.model.formats import InputFormat, OutputFormat
+from koza.model.koza import KozaConfig
+from koza.runner import KozaRunner
+from loguru import logger
+
+from .compression import compressed_suffix, open_output
+from .configs import load_config
+from .gzindex import Offsets
+from .mapping_index import MappingIndex, index_is_current, mapping_index_path
+from .options import PARQUET_FORMAT, TransformOptions
+from .readers import (
+    CachedSource,
+    ProjectedTSVSource,
+    RangeJSONSource,
+    RangeTSVSource,
+    StreamingJSONSource,
+    resolve_files,
+)
+from .writers import ParquetWriter
+
+
+def use_streaming_readers(config: KozaConfig, runner: KozaRunner, base_directory: Path, options: TransformOptions):
+    """
+    Replace koza's JSON sources with StreamingJSONSource.
+
+    Delimited sources are replaced with ProjectedTSVSource when the config
+    lists the columns its transform reads as a projection.
+    """
+    projection = config.transform.extra_fields.get("projection")
+    for reader in config.get_readers():
+        if reader.reader.format == InputFormat.json:
+            runner.data[reader.tag] = iter(
+                StreamingJSONSource(
+                    reader.reader,
+                    base_directory,
+                    row_limit=options.limit or 0,
+                    projection=projection,
+                )
+            )
+        elif reader.reader.format == InputFormat.csv and projection:
+            runner.data[reader.tag] = iter(
+                ProjectedTSVSource(
+                    reader.reader,
+                    base_directory,
+                    row_limit=options.limit or 0,
+                    projection=projection,
+                )
+            )
+
+
+def use_cached_readers(config: KozaConfig, runner: KozaRunner, base_directory: Path, options: TransformOptions):
+    """
+    Read the files of JSON and delimited sources through the decoded-row cache, with CachedSource.
+
+    With --stream, only the config's projection is kept of each row.
+    """
+    projection = config.transform.extra_fields.get("projection") if options.stream else None
+    for reader in config.get_readers():
+        if reader.reader.format in (InputFormat.json, InputFormat.csv):
+            runner.data[reader.tag] = iter(
+                CachedSource(reader.reader, base_directory, row_limit=options.limit or 0, projection=projection)
+            )
+
+
+def use_range_reader(
+    config: KozaConfig, runner: KozaRunner, base_directory: Path, options: TransformOptions, offsets: Offsets
+):
+    """
+    Read only a range of the single, indexed file of a config, for a shard of it.
+
+    A delimited file is read from its gzip index, and a JSON file from its
+    record index. With --stream, only the config's projection is kept of each
+    row, as in ProjectedTSVSource and StreamingJSONSource.
+    """
+    projection = config.transform.extra_fields.get("projection") if options.stream else None
+    for reader in config.get_readers():
+        files = resolve_files(reader.reader.files, base_directory)
+        if len(files) != 1:
+            raise ValueError(f"A range can only be read from a single file, not {reader.reader.files}")
+        if reader.reader.format == InputFormat.csv:
+            source = RangeTSVSource
+        elif reader.reader.format == InputFormat.json:
+            source = RangeJSONSource
+        else:
+            raise ValueError(f"A range can't be read from a {reader.reader.format.value} file")
+        runner.data[reader.tag] = iter(
+            source(reader.reader, files[0], offsets, row_limit=options.limit or 0, projection=projection)
+        )
+
+
+def use_compressed_outputs(runner: KozaRunner, compression: str):
+    """
+    Write the node and edge files of koza's TSV and JSON Lines writers compressed, on compressor threads.
+
+    koza opens its files, and writes the TSV headers, as the writer is
+    created; each file is replaced by a compressed one, named with the
+    compression's suffix, starting with what koza already wrote.
+    """
+    for attribute in ("nodeFH", "edgeFH"):
+        fh = getattr(runner.writer, attribute, None)
+        if fh is None:
+            continue
+        fh.close()
+        path = Path(fh.name)
+        written = path.read_text()
+        path.unlink()
+        compressed = open_output(path.with_name(path.name + compressed_suffix(compression)), "wt")
+        compressed.write(written)
+        setattr(runner.writer, attribute, compressed)
+
+
+def use_mapping_indexes(runner: KozaRunner, base_directory: Path):
+    """
+    Open mappings that have a current index as a MappingIndex instead of loading them into a dict.
+
+    Mappings without an index, or with one older than their files, are still
+    loaded by koza. The mappings keep the order of the config, which decides
+    precedence for lookups without a map name.
+    """
+    load_mappings = runner.load_mappings
+
+    def load_indexed_mappings():
+        names = {}
+        indexed = {}
+        for filename in runner.mapping_filenames:
+            # Absolute filenames stay as they are, as in koza
+            mapping_config = base_directory / filename
+            names[filename] = load_config(mapping_config)["name"]
+            if index_is_current(mapping_config):
+                indexed[filename] = MappingIndex(mapping_index_path(mapping_config))
+                logger.info(f"Using mapping index {indexed[filename].path} for {names[filename]}")
+            elif mapping_index_path(mapping_config) is not None:
+                logger.warning(f"Mapping index for {mapping_config} is missing or stale, loading the mapping instead")
+
+        filenames = runner.mapping_filenames
+        runner.mapping_filenames = [filename for filename in filenames if filename not in indexed]
+        try:
+            loaded = load_mappings()
+        finally:
+            runner.mapping_filenames = filenames
+        return {
+            names[filename]: indexed[filename] if filename in indexed else loaded[names[filename]]
+            for filename in filenames
+        }
+
+    runner.load_mappings = load_indexed_mappings
+
+
+@dataclass
+class RowCounts:
+    """Rows a runner's readers yielded, and those its transform turned into entities."""
+
+    read: int = 0
+    transformed: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.read - self.transformed
+
+
+def count_rows(runner: KozaRunner) -> RowCounts:
+    """
+    Count the rows the runner reads and the rows its transform skips.
+
+    koza writes the result of transform_record once per row, and not at all
+    for None, so a row is skipped when nothing or an empty list is written
+    for it.
+    """
+    counts = RowCounts()
+
+    def counted(rows: Iterable) -> Iterable:
+        for row in rows:
+            counts.read += 1
+            yield row
+
+    runner.data = {tag: counted(rows) for tag, rows in runner.data.items()}
+    write = runner.writer.write
+
+    def write_counted(entities) -> None:
+        if entities:
+            counts.transformed += 1
+        write(entities)
+
+    runner.writer.write = write_counted
+    return counts
+
+
+def build_runner(
+    config_file: str,
+    output_dir: str,
+    options: TransformOptions,
+    input_files: Optional[List[str]] = None,
+    offsets: Optional[Offsets] = None,
+) -> Tuple[KozaConfig, KozaRunner]:
+    """
+    Load a transform config into a KozaRunner, applying the given options.
+
+    input_files replaces the config's reader files, e.g. to run a single shard,
+    and offsets limits the reading of a single such file to a range of it.
+    Otherwise, files are read through the decoded-row cache with options.cache.
+    """
+    parquet = options.output_format == PARQUET_FORMAT
+    config, runner = KozaRunner.from_config_file(
+        config_file,
+        output_dir=output_dir,
+        # koza has no Parquet writer; take none of its writers and add ours below
+        output_format=OutputFormat.passthrough if parquet else OutputFormat(options.output_format),
+        row_limit=options.limit or 0,
+        show_progress=options.progress,
+        input_files=input_files,
+    )
+    if parquet:
+        runner.writer = ParquetWriter(output_dir, config.name, config.writer)
+    elif options.output_compression:
+        use_compressed_outputs(runner, options.output_compression)
+    base_directory = Path(config_file).parent
+    # A range is read straight from its file, since cache entries hold whole files
+    if offsets is not None:
+        use_range_reader(config, runner, base_directory, options, offsets)
+    elif options.cache:
+        use_cached_readers(config, runner, base_directory, options)
+    elif options.stream:
+        use_streaming_readers(config, runner, base_directory, options)
+    use_mapping_indexes(runner, base_directory)
+    return config, runner
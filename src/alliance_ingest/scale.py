@@ -0,0 +1,184 @@
+"""
+End-to-end scale test of the ingest pipeline on synthetic releases.
+
+At every scale a fresh workspace gets a copy of the transform configs and a
+synthetic release in `data/`. Then each stage runs as its own `ingest`
+subprocess from that workspace, as a release build would: synthesize,
+post-download, transform and report. The wall time of each stage is measured,
+and so is its peak RSS. The peak RSS comes from wait4, which includes every
+worker process the stage waited for.
+
+A stage scales linearly when its time grows in step with the input. The
+exponent of its growth between two scales is
+log(time ratio) / log(scale ratio). It is about 1 for a linear stage, and
+stages well above 1 are flagged as superlinear.
+"""
+
+import json
+import math
+import os
+import platform
+import re
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .report import find_outputs
+from .synthetic import SEED
+from .usage import run_measured
+
+SCALES = [1.0, 5.0, 10.0]
+
+# Growth exponents above this are reported as superlinear
+SUPERLINEAR_EXPONENT = 1.15
+
+CONFIG_DIR = Path("src/alliance_ingest")
+
+LOG_DIR = "logs"
+
+
+@dataclass
+class StageResult:
+    stage: str
+    seconds: float
+    peak_rss_mb: float
+    returncode: int
+
+
+def scale_min_counts(config: str, scale: float) -> str:
+    """
+    Scale the min_node_count and min_edge_count of a transform config.
+
+    The minimums are set for a full release, so the checks still hold for synthetic releases smaller or larger
+    than it.
+    """
+    return re.sub(
+        r"^(\s*min_(?:node|edge)_count:\s*)(\d+)",
+        lambda match: f"{match[1]}{int(int(match[2]) * scale)}",
+        config,
+        flags=re.MULTILINE,
+    )
+
+
+def prepare_workspace(workspace: Path, scale: float, config_dir: Path = CONFIG_DIR) -> None:
+    """Copy the transform configs and their code into a fresh workspace laid out like the repository."""
+    if workspace.exists():
+        shutil.rmtree(workspace)
+    target = workspace / CONFIG_DIR
+    target.mkdir(parents=True)
+    for path in sorted(config_dir.glob("*.py")):
+        shutil.copy2(path, target / path.name)
+    for path in sorted(config_dir.glob("*.yaml")):
+        (target / path.name).write_text(scale_min_counts(path.read_text(), scale))
+    (workspace / LOG_DIR).mkdir()
+
+
+def run_stage(stage: str, command: List[str], cwd: Path) -> StageResult:
+    """Run one stage as a subprocess, logging its output. Returns its wall time and peak RSS."""
+    with open(cwd / LOG_DIR / f"{stage}.log", "wb") as log:
+        start = time.perf_counter()
+        returncode, usage = run_measured(command, stdout=log, cwd=cwd)
+        seconds = time.perf_counter() - start
+    return StageResult(stage, round(seconds, 2), round(usage.peak_rss / (1 << 20), 1), returncode)
+
+
+def stage_commands(scale: float, seed: int, transform_args: List[str]) -> Dict[str, List[str]]:
+    """The `ingest` command of every stage, run from the workspace."""
+    ingest = [sys.executable, "-m", "alliance_ingest.cli"]
+    return {
+        "synthesize": ingest + ["synthesize", "--scale", str(scale), "--seed", str(seed), "--data-dir", "data"],
+        "post-download": ingest + ["post-download", "--data-dir", "data"],
+        "transform": ingest + ["transform", "--output-dir", "output", "--executor", "worker"] + transform_args,
+        "report": ingest + ["report", "--output-dir", "output"],
+    }
+
+
+def _size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def _outputs(output_dir: Path) -> Dict[str, int]:
+    """The size of every node and edge file, which also shows transforms that wrote nothing."""
+    return {output.path.name: output.path.stat().st_size for output in find_outputs(output_dir)}
+
+
+def run_scale(
+    scale: float, workdir: Path, transform_args: List[str], seed: int = SEED, keep: bool = False
+) -> Dict[str, Any]:
+    """Run every stage at one scale, stopping at the first that fails."""
+    workspace = workdir / f"scale-{scale:g}"
+    prepare_workspace(workspace, scale)
+    stages = []
+    for stage, command in stage_commands(scale, seed, transform_args).items():
+        result = run_stage(stage, command, workspace)
+        stages.append(result)
+        if result.returncode != 0:
+            break
+    outcome = {
+        "scale": scale,
+        "workspace": str(workspace),
+        "input_bytes": _size(workspace / "data") if (workspace / "data").exists() else 0,
+        "output_bytes": _size(workspace / "output") if (workspace / "output").exists() else 0,
+        "stages": [asdict(result) for result in stages],
+        "outputs": _outputs(workspace / "output") if (workspace / "output").exists() else {},
+    }
+    if not keep and all(result.returncode == 0 for result in stages):
+        shutil.rmtree(workspace)
+    return outcome
+
+
+def growth_exponents(scales: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """The growth exponent of every stage's time and peak RSS, from the smallest to the largest scale."""
+    completed = [run for run in scales if all(stage["returncode"] == 0 for stage in run["stages"])]
+    if len(completed) < 2:
+        return {}
+    first, last = min(completed, key=lambda run: run["scale"]), max(completed, key=lambda run: run["scale"])
+    if first["scale"] == last["scale"]:
+        return {}
+    ratio = math.log(last["scale"] / first["scale"])
+    exponents = {}
+    for before, after in zip(first["stages"], last["stages"], strict=True):
+        exponents[before["stage"]] = {
+            measure: round(math.log(after[measure] / before[measure]) / ratio, 2)
+            for measure in ("seconds", "peak_rss_mb")
+            if before[measure] > 0 and after[measure] > 0
+        }
+    return exponents
+
+
+def superlinear(exponents: Dict[str, Dict[str, float]], threshold: float = SUPERLINEAR_EXPONENT) -> List[str]:
+    """Messages for the stages whose time or peak RSS grows faster than the input."""
+    return [
+        f"{stage}: {measure} grows as scale^{exponent:.2f}"
+        for stage, measures in exponents.items()
+        for measure, exponent in measures.items()
+        if exponent > threshold
+    ]
+
+
+def run_scale_test(
+    scales: List[float],
+    workdir: Path,
+    transform_args: Optional[List[str]] = None,
+    seed: int = SEED,
+    keep: bool = False,
+) -> Dict[str, Any]:
+    """Run the pipeline at every scale, smallest first. Returns the measurements and growth exponents."""
+    runs = [run_scale(scale, workdir, transform_args or [], seed, keep) for scale in sorted(scales)]
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "scales": runs,
+        "exponents": growth_exponents(runs),
+    }
+
+
+def write_results(results: Dict[str, Any], path: Path) -> None:
+    path.write_text(json.dumps(results, indent=2) + "\n")
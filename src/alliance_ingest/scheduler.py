@@ -0,0 +1,157 @@
+"""
+Bounded worker pool for running independent ingest jobs side by side.
+
+Each job writes into its own staging directory inside the output directory.
+Only when the job succeeds are its files moved into place, so a failed or
+interrupted transform never leaves half-written outputs behind.
+"""
+
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from .report import other_formats
+from .usage import Usage, run_measured
+
+STAGING_DIR = ".staging"
+
+
+@dataclass
+class Job:
+    """A command to run, optionally staged into its own output directory."""
+
+    name: str
+    cmd: List[str]
+    staging_dir: Optional[Path] = None
+    config: Optional[Path] = None
+
+
+@dataclass
+class JobResult:
+    """Exit status and timing of a finished job."""
+
+    name: str
+    returncode: int
+    elapsed: float
+    log_file: Optional[Path] = None
+    # Not run because its outputs were already up to date
+    skipped: bool = False
+    # Resources used, when measured, and for in-process transforms the rows read and skipped
+    cpu_seconds: Optional[float] = None
+    peak_rss: Optional[int] = None
+    rows_read: Optional[int] = None
+    rows_skipped: Optional[int] = None
+    # For pipelined transforms, the transform loop's waits on its input and output queues and their mean depths
+    input_wait_seconds: Optional[float] = None
+    output_wait_seconds: Optional[float] = None
+    input_queue_depth: Optional[float] = None
+    output_queue_depth: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def staging_path(output_dir: str, name: str) -> Path:
+    """Return the staging directory for a job writing into output_dir."""
+    return Path(output_dir) / STAGING_DIR / name
+
+
+def publish_outputs(staging_dir: Path, output_dir: Path) -> List[Path]:
+    """
+    Atomically move every file in staging_dir into output_dir.
+
+    The node and edge files a transform wrote before in other output formats
+    are removed, so readers of output_dir never find a stale one.
+    """
+    published = []
+    for staged in sorted(staging_dir.iterdir()):
+        if staged.is_file():
+            target = output_dir / staged.name
+            os.replace(staged, target)
+            for stale in other_formats(target):
+                stale.unlink(missing_ok=True)
+            published.append(target)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return published
+
+
+def run_job(
+    job: Job,
+    output_dir: Path,
+    log_dir: Optional[Path] = None,
+    on_start: Optional[Callable[[Job], None]] = None,
+) -> JobResult:
+    """Run a single job, publishing its staged outputs on success."""
+    if on_start:
+        on_start(job)
+    log_file = log_dir / f"{job.name.replace(' ', '_')}.log" if log_dir else None
+    if job.staging_dir:
+        shutil.rmtree(job.staging_dir, ignore_errors=True)
+        job.staging_dir.mkdir(parents=True)
+
+    start = time.perf_counter()
+    usage = Usage()
+    try:
+        if log_file:
+            with open(log_file, "w") as log:
+                returncode, usage = run_measured(job.cmd, stdout=log)
+        else:
+            returncode, usage = run_measured(job.cmd)
+    except FileNotFoundError:
+        returncode = 127
+    elapsed = time.perf_counter() - start
+
+    if job.staging_dir:
+        if returncode == 0:
+            publish_outputs(job.staging_dir, output_dir)
+        else:
+            shutil.rmtree(job.staging_dir, ignore_errors=True)
+
+    return JobResult(
+        name=job.name,
+        returncode=returncode,
+        elapsed=elapsed,
+        log_file=log_file,
+        cpu_seconds=usage.cpu_seconds,
+        peak_rss=usage.peak_rss,
+    )
+
+
+def run_jobs(
+    jobs: List[Job],
+    output_dir: Path,
+    max_workers: int = 1,
+    on_start: Optional[Callable[[Job], None]] = None,
+    on_done: Optional[Callable[[JobResult], None]] = None,
+) -> List[JobResult]:
+    """
+    Run jobs in a pool of at most max_workers at a time.
+
+    With a single worker, jobs run in order and their output goes straight to
+    the terminal. With more, each job's output is captured to a log file under
+    output_dir/logs so concurrent transforms don't interleave.
+    Results are returned in the order the jobs were given.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    log_dir = None
+    if max_workers > 1:
+        log_dir = output_dir / "logs"
+        log_dir.mkdir(exist_ok=True)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {}
+        for job in jobs:
+            futures[pool.submit(run_job, job, output_dir, log_dir, on_start)] = job
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future].name] = result
+            if on_done:
+                on_done(result)
+
+    return [results[job.name] for job in jobs]
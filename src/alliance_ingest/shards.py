@@ -0,0 +1,323 @@
+"""
+Run multi-file transforms as one shard per input file and merge the results.
+
+Each shard is the transform config run on a single one of its reader files,
+writing into its own directory under the transform's staging directory. A
+large delimited gzip file with a current seek-point index (see gzindex) is
+split further, into ranges of lines read from different seek points, and a
+large JSON file with a current record index (see jsonsplit) into ranges of
+the records of its array, so a transform dominated by one file can still use
+every worker. When every shard of a transform has finished, the shard outputs
+are concatenated in the order the files are listed in the config, and the
+ranges of a file in file order, so the merged files hold the same rows in the
+same order as a sequential run.
+The writer's min_node_count and min_edge_count are then checked against the
+merged totals before the files are published.
+"""
+
+import shutil
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .compression import compressed_suffix, open_output
+from .configs import load_config
+from .gzindex import Offsets, load_gzip_index, split_offsets
+from .jsonsplit import load_record_index, split_records
+from .options import TransformOptions
+from .scheduler import Job, JobResult, publish_outputs
+from .worker import WarmPool, run_transform
+
+SHARD_DIR = "shard-{index}"
+
+COPY_CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class Shard:
+    """One reader file of a transform config (or all of them, for files=None)."""
+
+    name: str
+    index: int
+    output_dir: Path
+    files: Optional[List[str]] = None
+    size: int = 0
+    # The range of its single file's output to read, for a file split by its gzip or record index
+    offsets: Optional[Offsets] = None
+
+
+def _file_ranges(path: Path, pieces: int, reader: dict) -> Tuple[List[Offsets], int, int]:
+    """A file's ranges from its index, with the offsets of the first range's start and the last range's end."""
+    if reader.get("format", "csv") == "csv":
+        index = load_gzip_index(path)
+        return (split_offsets(index, pieces), 0, index.length) if index else ([], 0, 0)
+    if reader.get("format") != "json" or (path.suffix == ".gz" and load_gzip_index(path) is None):
+        return [], 0, 0
+    records = load_record_index(path, reader.get("json_path"))
+    if records is None or not records.starts:
+        return [], 0, 0
+    return split_records(records, pieces), records.starts[0], records.end
+
+
+def _file_pieces(path: Path, size: int, pieces: int, reader: dict) -> List[Tuple[Optional[Offsets], int]]:
+    """The ranges to split a file into, with their approximate compressed sizes, or the whole file."""
+    ranges, first, last = _file_ranges(path, pieces, reader) if pieces > 1 else ([], 0, 0)
+    if len(ranges) < 2:
+        return [(None, size)]
+    return [((start, end), size * ((last if end is None else end) - start) // (last - first)) for start, end in ranges]
+
+
+def plan_shards(config: Path, staging_dir: Path, split: bool = True, parts: int = 1) -> List[Shard]:
+    """
+    Split a transform config into one shard per reader file, and a large indexed file into ranges.
+
+    Each delimited file with a current gzip index, and each JSON file with a
+    current record index (and gzip index, if compressed), is split into about
+    as many ranges as its share of the config's input size of parts, so with
+    parts workers a single dominant file gives each of them a range. Files are kept
+    as written in the config, since koza resolves them against the config
+    directory. A config that is not split any further, and any config when
+    split is false, becomes a single shard over all of its files.
+    """
+    reader = load_config(config).get("reader") or {}
+    files = reader.get("files") or []
+    sizes = {f: (config.parent / f).stat().st_size if (config.parent / f).exists() else 0 for f in files}
+    total = sum(sizes.values())
+    pieces: List[Tuple[Optional[List[str]], Optional[Offsets], int]] = []
+    if split:
+        for f in files:
+            share = round(parts * sizes[f] / total) if total else 1
+            file_pieces = _file_pieces(config.parent / f, sizes[f], share, reader)
+            pieces += [([f], offsets, size) for offsets, size in file_pieces]
+    if len(pieces) < 2:
+        pieces = [(None, None, total)]
+
+    return [
+        Shard(
+            name=f"{config.stem}.{index}",
+            index=index,
+            output_dir=staging_dir / SHARD_DIR.format(index=index),
+            files=shard_files,
+            size=size,
+            offsets=offsets,
+        )
+        for index, (shard_files, offsets, size) in enumerate(pieces)
+    ]
+
+
+def _copy_counting_lines(src, dst) -> int:
+    lines = 0
+    while chunk := src.read(COPY_CHUNK_SIZE):
+        dst.write(chunk)
+        lines += chunk.count(b"\n")
+    return lines
+
+
+def _merge_parquet(paths: List[Path], output: Path) -> int:
+    """Copy the row groups of Parquet files, in order, into one file. Returns the number of rows."""
+    import pyarrow.parquet as pq
+
+    from .writers import PARQUET_COMPRESSION
+
+    rows = 0
+    writer = None
+    try:
+        for path in paths:
+            shard = pq.ParquetFile(path)
+            if writer is None:
+                writer = pq.ParquetWriter(output, shard.schema_arrow, compression=PARQUET_COMPRESSION)
+            elif shard.schema_arrow != writer.schema:
+                raise ValueError(f"{path} has a different schema than the other shards of {output.name}")
+            for row_group in range(shard.num_row_groups):
+                writer.write_table(shard.read_row_group(row_group))
+            rows += shard.metadata.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def merge_shards(shard_dirs: List[Path], output_dir: Path, compression: Optional[str] = None) -> Dict[str, int]:
+    """
+    Concatenate same-named files of the shard directories, in shard order, into output_dir.
+
+    TSV files keep the header of the first shard only; the other shards must
+    have the same header. Parquet files are merged row group by row group and
+    must have the same schema. With an --output-compression, the other files
+    are compressed as they are merged, and named with its suffix. Returns the
+    number of data rows in each merged file, by the merged file's name.
+    """
+    names = sorted(
+        {f.name for shard_dir in shard_dirs if shard_dir.exists() for f in shard_dir.iterdir() if f.is_file()}
+    )
+    counts = {}
+    for name in names:
+        if name.endswith(".parquet"):
+            paths = [shard_dir / name for shard_dir in shard_dirs if (shard_dir / name).exists()]
+            counts[name] = _merge_parquet(paths, output_dir / name)
+            continue
+        header = None
+        rows = 0
+        merged = name + compressed_suffix(compression)
+        with open_output(output_dir / merged, "wb") as out:
+            for shard_dir in shard_dirs:
+                path = shard_dir / name
+                if not path.exists():
+                    continue
+                with open(path, "rb") as fh:
+                    if name.endswith(".tsv"):
+                        shard_header = fh.readline()
+                        if header is None:
+                            header = shard_header
+                            out.write(header)
+                        elif shard_header != header:
+                            raise ValueError(f"{path} has a different header than the other shards of {name}")
+                    rows += _copy_counting_lines(fh, out)
+        counts[merged] = rows
+    return counts
+
+
+def check_min_counts(config: Path, counts: Dict[str, int]) -> None:
+    """Raise ValueError if the merged node or edge files have fewer rows than the writer requires."""
+    transform = load_config(config)
+    writer = transform.get("writer") or {}
+    for kind in ("node", "edge"):
+        minimum = writer.get(f"min_{kind}_count")
+        if not minimum:
+            continue
+        prefix = f"{transform['name']}_{kind}s."
+        for name, count in counts.items():
+            if name.startswith(prefix) and count < minimum:
+                raise ValueError(f"{name} has {count} rows, fewer than min_{kind}_count {minimum}")
+
+
+def _total(values: List[Optional[float]]) -> Optional[float]:
+    return None if any(value is None for value in values) else sum(values)
+
+
+def _largest(values: List[Optional[float]]) -> Optional[float]:
+    present = [value for value in values if value is not None]
+    return max(present) if present else None
+
+
+def combined_usage(results: List[JobResult]) -> Dict[str, Optional[float]]:
+    """
+    The combined resources of a transform's shards.
+
+    CPU time, rows and queue waits are totalled; peak RSS and mean queue
+    depths are the largest of any shard.
+    """
+    return {
+        "cpu_seconds": _total([result.cpu_seconds for result in results]),
+        "peak_rss": _largest([result.peak_rss for result in results]),
+        "rows_read": _total([result.rows_read for result in results]),
+        "rows_skipped": _total([result.rows_skipped for result in results]),
+        "input_wait_seconds": _total([result.input_wait_seconds for result in results]),
+        "output_wait_seconds": _total([result.output_wait_seconds for result in results]),
+        "input_queue_depth": _largest([result.input_queue_depth for result in results]),
+        "output_queue_depth": _largest([result.output_queue_depth for result in results]),
+    }
+
+
+def run_sharded(
+    pool: WarmPool,
+    jobs: List[Job],
+    output_dir: Path,
+    options: TransformOptions,
+    log_dir: Optional[Path] = None,
+    on_start: Optional[Callable[[Job], None]] = None,
+    on_done: Optional[Callable[[JobResult], None]] = None,
+) -> List[JobResult]:
+    """
+    Run transform jobs on the pool as shards, largest shard first, and return one result per job.
+
+    Jobs need a config and a staging_dir. Indexed gzip files are split into
+    about as many ranges as the pool has workers. With a row limit,
+    transforms are not split, as the limit applies to the rows of the whole
+    transform, and the minimum counts are not checked.
+    """
+    shards_by_job = {
+        job.name: plan_shards(job.config, job.staging_dir, split=not options.limit, parts=pool.max_workers)
+        for job in jobs
+    }
+    owners: Dict[str, Job] = {}
+    shards: Dict[str, Shard] = {}
+    for job in jobs:
+        for shard in shards_by_job[job.name]:
+            owners[shard.name] = job
+            shards[shard.name] = shard
+    shard_jobs = [
+        Job(name=shard.name, cmd=[], config=owners[shard.name].config)
+        for shard in sorted(shards.values(), key=lambda shard: shard.size, reverse=True)
+    ]
+
+    # Shards write plain files, which are compressed as they are merged
+    shard_options = replace(options, output_compression=None)
+
+    started: Dict[str, float] = {}
+    remaining = {job.name: len(shards_by_job[job.name]) for job in jobs}
+    # Log file of the first failed shard of each failed transform
+    failed: Dict[str, Optional[Path]] = {}
+    results: Dict[str, JobResult] = {}
+    shard_results: Dict[str, List[JobResult]] = {}
+
+    def start_shard(shard_job: Job):
+        job = owners[shard_job.name]
+        if job.name not in started:
+            started[job.name] = time.perf_counter()
+            shutil.rmtree(job.staging_dir, ignore_errors=True)
+            job.staging_dir.mkdir(parents=True)
+            if on_start:
+                on_start(job)
+
+    def submit(shard_job: Job, log_file: Optional[str]):
+        shard = shards[shard_job.name]
+        return pool.executor.submit(
+            run_transform,
+            str(shard_job.config),
+            str(shard.output_dir),
+            shard_options,
+            log_file,
+            shard.files,
+            shard.offsets,
+        )
+
+    def finish_shard(shard_result: JobResult):
+        job = owners[shard_result.name]
+        shard_results.setdefault(job.name, []).append(shard_result)
+        if not shard_result.ok:
+            failed.setdefault(job.name, shard_result.log_file)
+        remaining[job.name] -= 1
+        if remaining[job.name] == 0:
+            results[job.name] = finish_job(job)
+            if on_done:
+                on_done(results[job.name])
+
+    def finish_job(job: Job) -> JobResult:
+        ok = job.name not in failed
+        if ok:
+            try:
+                shard_dirs = [shard.output_dir for shard in shards_by_job[job.name]]
+                counts = merge_shards(shard_dirs, job.staging_dir, options.output_compression)
+                if not options.limit:
+                    check_min_counts(job.config, counts)
+            except (OSError, ValueError) as e:
+                logger.error(f"{job.name}: {type(e).__name__}: {e}")
+                ok = False
+        if ok:
+            publish_outputs(job.staging_dir, output_dir)
+        else:
+            shutil.rmtree(job.staging_dir, ignore_errors=True)
+        return JobResult(
+            name=job.name,
+            returncode=0 if ok else 1,
+            elapsed=time.perf_counter() - started[job.name],
+            log_file=failed.get(job.name),
+            **combined_usage(shard_results[job.name]),
+        )
+
+    pool.run(shard_jobs, output_dir, submit, log_dir, start_shard, finish_shard)
+    return [results[job.name] for job in jobs]
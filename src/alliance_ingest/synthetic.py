@@ -0,0 +1,595 @@
+"""
+Synthetic Alliance FMS files, at a chosen scale of the current release.
+
+The files are laid out as downloaded by download.yaml: BGI, AGM, PHENOTYPE
+and EXPRESSION JSON with `metaData` and `data`, and VARIANT-ALLELE and
+DISEASE-ALLIANCE_COMBINED TSV under a commented preamble. Records carry the
+fields the transforms read along with the ones they ignore, so readers parse
+realistic row widths.
+
+IDs are computed from a provider and an index rather than kept in memory, so
+any scale can be generated, and cross-references agree between files:
+genotype components and disease and phenotype subjects are generated genes,
+alleles and genotypes, which the entity lookup tables built from the BGI,
+VARIANT-ALLELE and AGM files resolve. Every file has its own random stream
+derived from the seed, so files can be written in parallel and reproduced one
+at a time.
+"""
+
+import gzip
+import json
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+SEED = 20240601
+
+# Records per file at scale 1, roughly those of the current Alliance release
+RELEASE_RECORDS = {
+    "BGI_MGI.json.gz": 85_000,
+    "BGI_RGD.json.gz": 60_000,
+    "BGI_WB.json.gz": 48_000,
+    "BGI_FB.json.gz": 25_000,
+    "BGI_ZFIN.json.gz": 38_000,
+    "BGI_SGD.json.gz": 7_000,
+    "BGI_XBXL.json.gz": 35_000,
+    "BGI_XBXT.json.gz": 30_000,
+    "VARIANT-ALLELE_NCBITaxon10090.tsv.gz": 280_000,
+    "VARIANT-ALLELE_NCBITaxon10116.tsv.gz": 50_000,
+    "VARIANT-ALLELE_NCBITaxon7955.tsv.gz": 60_000,
+    "VARIANT-ALLELE_NCBITaxon6239.tsv.gz": 150_000,
+    "AGM_MGI.json.gz": 70_000,
+    "AGM_ZFIN.json.gz": 45_000,
+    "AGM_RGD.json.gz": 1_500,
+    "DISEASE-ALLIANCE_COMBINED.tsv.gz": 100_000,
+    "PHENOTYPE_RGD.json.gz": 70_000,
+    "PHENOTYPE_MGI.json.gz": 320_000,
+    "PHENOTYPE_WB.json.gz": 150_000,
+    "EXPRESSION_RGD.json.gz": 25_000,
+    "EXPRESSION_MGI.json.gz": 1_100_000,
+    "EXPRESSION_ZFIN.json.gz": 350_000,
+    "EXPRESSION_FB.json.gz": 250_000,
+    "EXPRESSION_WB.json.gz": 200_000,
+    "EXPRESSION_SGD.json.gz": 20_000,
+}
+
+# Level 1 keeps generation fast at large scales; reading is no slower than for the published files
+COMPRESS_LEVEL = 1
+
+# Entity numbers of each kind start from their own base, so IDs sharing a prefix never collide
+GENE_BASE = 1_000_000
+ALLELE_BASE = 5_000_000
+GENOTYPE_BASE = 8_000_000
+
+# Variants without an allele, as the transforms skip them
+NO_ALLELE_ID_EVERY = 100
+
+# Share of expression records and disease rows that repeat a recent statement from another reference,
+# as the same annotation recurs in the published files once per paper that supports it
+REPEAT_FRACTION = 0.3
+REPEAT_WINDOW = 1000
+
+ALLELE_COLUMNS = [
+    "Taxon",
+    "SpeciesName",
+    "AlleleId",
+    "AlleleSymbol",
+    "AlleleSynonyms",
+    "VariantId",
+    "VariantSymbol",
+    "VariantSynonyms",
+    "VariantCrossReferences",
+    "AlleleAssociatedGeneId",
+    "AlleleAssociatedGeneSymbol",
+    "VariantAffectedGeneId",
+    "VariantAffectedGeneSymbol",
+    "Category",
+    "VariantsTypeId",
+    "VariantsTypeName",
+    "VariantsHgvsNames",
+    "Assembly",
+    "Chromosome",
+    "StartPosition",
+    "EndPosition",
+    "SequenceOfReference",
+    "SequenceOfVariant",
+    "MostSevereConsequenceName",
+    "VariantInformationReference",
+    "HasDiseaseAnnotations",
+    "HasPhenotypeAnnotations",
+]
+
+DISEASE_COLUMNS = [
+    "Taxon",
+    "SpeciesName",
+    "DBobjectType",
+    "DBObjectID",
+    "DBObjectSymbol",
+    "AssociationType",
+    "DOID",
+    "DOtermName",
+    "WithOrtholog",
+    "InferredFromID",
+    "InferredFromSymbol",
+    "ExperimentalCondition",
+    "Modifier",
+    "EvidenceCode",
+    "EvidenceCodeName",
+    "Reference",
+    "Date",
+    "Source",
+]
+
+ZF_STANDARD_CONDITIONS = "Has Condition: standard conditions"
+
+
+@dataclass(frozen=True)
+class Provider:
+    """A data provider: its taxon, ID formats and the files it publishes."""
+
+    name: str
+    taxon: str
+    species: str
+    gene: str
+    allele: Optional[str] = None
+    genotype: Optional[str] = None
+    genotype_subtype: str = "genotype"
+    anatomy: str = "UBERON"
+    phenotype: str = "MP"
+    assembly: str = ""
+    # Added to every entity number, for providers sharing an ID prefix
+    offset: int = 0
+
+    @property
+    def taxon_file(self) -> str:
+        return self.taxon.replace(":", "")
+
+    def gene_id(self, index: int) -> str:
+        return self.gene.format(self.offset + GENE_BASE + index)
+
+    def allele_id(self, index: int) -> str:
+        return self.allele.format(self.offset + ALLELE_BASE + index)
+
+    def genotype_id(self, index: int) -> str:
+        return self.genotype.format(self.offset + GENOTYPE_BASE + index)
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in [
+        Provider(
+            "MGI",
+            "NCBITaxon:10090",
+            "Mus musculus",
+            "MGI:{}",
+            "MGI:{}",
+            "MGI:{}",
+            anatomy="EMAPA",
+            assembly="GRCm39",
+        ),
+        Provider(
+            "RGD",
+            "NCBITaxon:10116",
+            "Rattus norvegicus",
+            "RGD:{}",
+            "RGD:{}",
+            "RGD:{}",
+            genotype_subtype="strain",
+            assembly="mRatBN7.2",
+        ),
+        Provider(
+            "ZFIN",
+            "NCBITaxon:7955",
+            "Danio rerio",
+            "ZFIN:ZDB-GENE-{}",
+            "ZFIN:ZDB-ALT-{}",
+            "ZFIN:ZDB-FISH-{}",
+            genotype_subtype="fish",
+            anatomy="ZFA",
+            phenotype="ZP",
+            assembly="GRCz11",
+        ),
+        Provider(
+            "WB",
+            "NCBITaxon:6239",
+            "Caenorhabditis elegans",
+            "WB:WBGene{:08d}",
+            "WB:WBVar{:08d}",
+            anatomy="WBbt",
+            phenotype="WB:WBPhenotype",
+            assembly="WBcel235",
+        ),
+        Provider("FB", "NCBITaxon:7227", "Drosophila melanogaster", "FB:FBgn{:07d}", anatomy="FBbt", assembly="R6"),
+        Provider("SGD", "NCBITaxon:559292", "Saccharomyces cerevisiae", "SGD:S{:09d}", assembly="R64-2-1"),
+        Provider("XBXL", "NCBITaxon:8355", "Xenopus laevis", "Xenbase:XB-GENE-{}", anatomy="XAO"),
+        Provider(
+            "XBXT", "NCBITaxon:8364", "Xenopus tropicalis", "Xenbase:XB-GENE-{}", anatomy="XAO", offset=20_000_000
+        ),
+        # Human genes only appear in the disease file, curated by RGD
+        Provider("HGNC", "NCBITaxon:9606", "Homo sapiens", "HGNC:{}"),
+    ]
+}
+
+
+@dataclass(frozen=True)
+class Release:
+    """The sizes of a synthetic release, which fix every entity ID that can be referenced."""
+
+    scale: float = 1.0
+    seed: int = SEED
+
+    def records(self, filename: str) -> int:
+        return max(1, round(RELEASE_RECORDS[filename] * self.scale))
+
+    def genes(self, provider: Provider) -> int:
+        # Human genes are referenced from the disease file only
+        return (
+            self.records(f"BGI_{provider.name}.json.gz") if provider.name != "HGNC" else self.records("BGI_RGD.json.gz")
+        )
+
+    def alleles(self, provider: Provider) -> int:
+        return self.records(f"VARIANT-ALLELE_{provider.taxon_file}.tsv.gz") if provider.allele else 0
+
+    def genotypes(self, provider: Provider) -> int:
+        return self.records(f"AGM_{provider.name}.json.gz") if provider.genotype else 0
+
+    def rng(self, filename: str) -> random.Random:
+        """The random stream of one file."""
+        return random.Random(f"{self.seed}:{filename}")
+
+    def any_gene(self, provider: Provider, rng: random.Random) -> str:
+        return provider.gene_id(rng.randrange(self.genes(provider)))
+
+    def any_allele(self, provider: Provider, rng: random.Random) -> str:
+        index = rng.randrange(self.alleles(provider))
+        return provider.allele_id(index - 1 if not has_allele_id(index) else index)
+
+    def any_genotype(self, provider: Provider, rng: random.Random) -> str:
+        return provider.genotype_id(rng.randrange(self.genotypes(provider)))
+
+
+def has_allele_id(index: int) -> bool:
+    """Whether a VARIANT-ALLELE row has an AlleleId; one in every NO_ALLELE_ID_EVERY rows is "-"."""
+    return index % NO_ALLELE_ID_EVERY != NO_ALLELE_ID_EVERY - 1
+
+
+def _pmid(rng: random.Random) -> str:
+    return f"PMID:{rng.randint(1_000_000, 39_999_999)}"
+
+
+def _term(prefix: str, rng: random.Random, digits: int = 7) -> str:
+    return f"{prefix}:{rng.randrange(10 ** digits):0{digits}d}"
+
+
+def _date(rng: random.Random) -> str:
+    return f"{rng.randint(2000, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00-05:00"
+
+
+def gene_records(release: Release, provider: Provider, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """BGI records: every gene of the provider, in ID order."""
+    for index in range(release.genes(provider)):
+        entity: Dict[str, Any] = {
+            "primaryId": provider.gene_id(index),
+            "taxonId": provider.taxon,
+            "crossReferences": [
+                {"id": f"{prefix}:{rng.randrange(10**8)}", "pages": ["gene"]}
+                for prefix in rng.sample(["ENSEMBL", "NCBI_Gene", "UniProtKB", "PANTHER"], rng.randint(0, 4))
+            ],
+            "genomeLocations": [
+                {
+                    "assembly": provider.assembly,
+                    "chromosome": str(rng.randint(1, 20)),
+                    "startPosition": (start := rng.randrange(10**8)),
+                    "endPosition": start + rng.randint(100, 100_000),
+                    "strand": rng.choice("+-"),
+                }
+            ],
+        }
+        if rng.random() < 0.6:
+            # Xenbase synonyms carry stray carriage returns
+            suffix = "\r" if provider.name.startswith("XB") and rng.random() < 0.1 else ""
+            entity["synonyms"] = [f"syn{index}-{i}{suffix}" for i in range(rng.randint(1, 5))]
+        if rng.random() < 0.3:
+            entity["secondaryIds"] = [provider.gene_id(index).replace(":", ":OLD", 1)]
+        record = {
+            "basicGeneticEntity": entity,
+            "symbol": f"{provider.name.lower()}g{index}",
+            "soTermId": rng.choice(["SO:0001217", "SO:0001217", "SO:0001217", "SO:0000336", "SO:0001263"]),
+            "geneSynopsis": "Predicted to enable DNA binding activity.",
+        }
+        if rng.random() < 0.85:
+            record["name"] = f"{provider.species} gene {index}"
+        yield record
+
+
+def allele_rows(release: Release, provider: Provider, rng: random.Random) -> Iterator[Dict[str, str]]:
+    """VARIANT-ALLELE rows: every allele of the provider, most of them of a generated gene."""
+    for index in range(release.alleles(provider)):
+        has_gene = rng.random() < 0.85
+        gene = release.any_gene(provider, rng) if has_gene else "-"
+        has_variant = rng.random() < 0.4
+        start = rng.randrange(10**8)
+        variant_type = rng.choice(
+            [
+                ("SO:1000008", "point_mutation"),
+                ("SO:0000159", "deletion"),
+                ("SO:0000667", "insertion"),
+                ("SO:1000032", "delins"),
+                ("SO:0002007", "MNV"),
+            ]
+        )
+        yield {
+            "Taxon": provider.taxon,
+            "SpeciesName": provider.species,
+            "AlleleId": provider.allele_id(index) if has_allele_id(index) else "-",
+            "AlleleSymbol": f"{provider.name.lower()}a{index}<tm{rng.randint(1, 9)}>",
+            "AlleleSynonyms": rng.choice(["-", "-", "-", f"a{index}", f"a{index}, a{index}b, a{index}c"]),
+            "VariantId": f"NC_{rng.randrange(10**6):06d}.1:g.{start}A>G" if has_variant else "-",
+            "VariantSymbol": f"v{index}" if has_variant else "-",
+            "VariantSynonyms": "-",
+            "VariantCrossReferences": "-",
+            "AlleleAssociatedGeneId": gene,
+            "AlleleAssociatedGeneSymbol": f"g{gene.rsplit(':', 1)[-1]}" if has_gene else "-",
+            "VariantAffectedGeneId": gene if has_variant else "-",
+            "VariantAffectedGeneSymbol": "-",
+            "Category": "allele" if not has_variant else "variant",
+            "VariantsTypeId": variant_type[0] if has_variant else "-",
+            "VariantsTypeName": variant_type[1] if has_variant else "-",
+            "VariantsHgvsNames": f"g.{start}A>G" if has_variant else "-",
+            "Assembly": provider.assembly if has_variant else "-",
+            "Chromosome": str(rng.randint(1, 20)) if has_variant else "-",
+            "StartPosition": str(start) if has_variant else "-",
+            "EndPosition": str(start + rng.randint(0, 50)) if has_variant else "-",
+            "SequenceOfReference": "".join(rng.choices("ACGT", k=rng.randint(1, 60))) if has_variant else "-",
+            "SequenceOfVariant": rng.choice("ACGT") if has_variant else "-",
+            "MostSevereConsequenceName": rng.choice(["missense_variant", "stop_gained", "-"]),
+            "VariantInformationReference": _pmid(rng) if has_variant else "-",
+            "HasDiseaseAnnotations": rng.choice(["true", "false"]),
+            "HasPhenotypeAnnotations": rng.choice(["true", "false"]),
+        }
+
+
+def genotype_records(release: Release, provider: Provider, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """AGM records: every genotype of the provider, with components that are generated alleles."""
+    for index in range(release.genotypes(provider)):
+        genotype_id = provider.genotype_id(index)
+        record: Dict[str, Any] = {
+            "primaryID": genotype_id,
+            "name": f"{provider.name.lower()}a{index}<tm1>/{provider.name.lower()}a{index}<+> [background:] C57BL/6J",
+            "taxonId": provider.taxon,
+            "crossReference": {"id": genotype_id, "pages": [provider.genotype_subtype]},
+        }
+        if rng.random() < 0.95:
+            record["subtype"] = provider.genotype_subtype
+        components = []
+        for _ in range(rng.choice([0, 1, 1, 1, 2, 2, 3] if provider.name != "RGD" else [0, 0, 1])):
+            component = {"alleleID": release.any_allele(provider, rng)}
+            if rng.random() < 0.85:
+                component["zygosity"] = rng.choice(["GENO:0000136", "GENO:0000135", "GENO:0000137", "GENO:0000134"])
+            components.append(component)
+        if components:
+            record["affectedGenomicModelComponents"] = components
+        if rng.random() < 0.2:
+            record["synonyms"] = [f"{provider.name.lower()}-strain-{index}"]
+        yield record
+
+
+def phenotype_records(release: Release, provider: Provider, rng: random.Random, count: int) -> Iterator[Dict[str, Any]]:
+    """PHENOTYPE records of the provider's genes, alleles and genotypes, all of which are in the entity lookup."""
+    subjects: List[Callable[[Provider, random.Random], str]] = [release.any_gene, release.any_allele]
+    weights = [40, 15]
+    if provider.genotype:
+        subjects.append(release.any_genotype)
+        weights.append(45)
+    for _ in range(count):
+        subject = rng.choices(subjects, weights)[0]
+        object_id = subject(provider, rng)
+        terms = 1 if rng.random() < 0.98 else rng.choice([0, 2])
+        record: Dict[str, Any] = {
+            "objectId": object_id,
+            "phenotypeTermIdentifiers": [
+                {"termId": _term(provider.phenotype, rng), "termOrder": order + 1} for order in range(terms)
+            ],
+            "phenotypeStatement": "abnormal morphology",
+            "evidence": {
+                "publicationId": _pmid(rng),
+                "crossReference": {"id": f"{provider.name}:{rng.randrange(10**7)}", "pages": ["reference"]},
+            },
+            "dateAssigned": _date(rng),
+        }
+        if rng.random() < 0.15:
+            record["conditionRelations"] = [
+                {
+                    "conditionRelationType": rng.choice(["has_condition", "induced_by"]),
+                    "conditions": [
+                        {
+                            "conditionClassId": _term("ZECO", rng),
+                            "conditionStatement": "chemical treatment",
+                            "chemicalOntologyId": _term("CHEBI", rng, 5),
+                        }
+                        for _ in range(rng.randint(1, 2))
+                    ],
+                }
+            ]
+        if subject == release.any_genotype:
+            record["primaryGeneticEntityIDs"] = [release.any_allele(provider, rng)]
+        yield record
+
+
+def expression_records(
+    release: Release, provider: Provider, rng: random.Random, count: int
+) -> Iterator[Dict[str, Any]]:
+    """EXPRESSION records of the provider's genes, at an anatomical structure or else a cellular component."""
+    recent: deque = deque(maxlen=REPEAT_WINDOW)
+    for _ in range(count):
+        if recent and rng.random() < REPEAT_FRACTION:
+            record = {key: value for key, value in rng.choice(recent).items() if key != "crossReference"}
+            yield {**record, "evidence": {"publicationId": _pmid(rng)}, "dateAssigned": _date(rng)}
+            continue
+        where: Dict[str, Any] = {"whereExpressedStatement": "expressed somewhere"}
+        site = rng.random()
+        if provider.name != "SGD" and site < 0.85:
+            where["anatomicalStructureTermId"] = _term(provider.anatomy, rng)
+            where["anatomicalStructureUberonSlimTermIds"] = [{"uberonTerm": _term("UBERON", rng)}]
+        if provider.name == "SGD" or 0.6 < site < 0.99:
+            where["cellularComponentTermId"] = _term("GO", rng)
+        when: Dict[str, Any] = {
+            "stageName": "adult",
+            "stageUberonSlimTerm": {"uberonTerm": "post embryonic, pre-adult"},
+        }
+        if rng.random() < 0.6:
+            when["stageTermId"] = _term(provider.anatomy if provider.anatomy != "EMAPA" else "MmusDv", rng)
+        record: Dict[str, Any] = {
+            "geneId": release.any_gene(provider, rng),
+            "evidence": {"publicationId": _pmid(rng)},
+            "whenExpressed": when,
+            "whereExpressed": where,
+            "assay": rng.choice(["MMO:0000655", "MMO:0000658", "MMO:0000640", "MMO:0000647"]),
+            "dateAssigned": _date(rng),
+        }
+        if rng.random() < 0.5:
+            record["crossReference"] = {"id": f"{provider.name}:{rng.randrange(10**7)}", "pages": ["gene/expression"]}
+        recent.append(record)
+        yield record
+
+
+def disease_rows(release: Release, rng: random.Random, count: int) -> Iterator[Dict[str, str]]:
+    """DISEASE-ALLIANCE_COMBINED rows of generated genes, alleles and genotypes, of every provider."""
+    providers = ["MGI", "RGD", "ZFIN", "WB", "FB", "SGD", "HGNC"]
+    weights = [45, 12, 12, 8, 7, 2, 14]
+    recent: deque = deque(maxlen=REPEAT_WINDOW)
+    for _ in range(count):
+        if recent and rng.random() < REPEAT_FRACTION:
+            yield {
+                **rng.choice(recent),
+                "EvidenceCode": rng.choice(["ECO:0000033", "ECO:0000304", "ECO:0007013", "ECO:0000250"]),
+                "Reference": _pmid(rng),
+                "Date": f"{rng.randint(2000, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+            }
+            continue
+        provider = PROVIDERS[rng.choices(providers, weights)[0]]
+        kinds = (
+            ["gene"]
+            + (["allele"] if provider.allele else [])
+            + (["affected_genomic_model"] * 2 if provider.genotype else [])
+        )
+        kind = rng.choice(kinds)
+        if kind == "gene":
+            object_id = release.any_gene(provider, rng)
+            association = rng.choice(
+                ["is_implicated_in", "is_marker_for", "implicated_via_orthology", "biomarker_via_orthology"]
+            )
+        elif kind == "allele":
+            object_id = release.any_allele(provider, rng)
+            association = "is_implicated_in"
+        else:
+            object_id = release.any_genotype(provider, rng)
+            association = "is_model_of" if rng.random() < 0.9 else "is_not_model_of"
+        condition = ""
+        if provider.name == "ZFIN" and kind == "affected_genomic_model":
+            condition = rng.choice([ZF_STANDARD_CONDITIONS] * 7 + ["Induced By: chemical treatment", ""])
+        row = {
+            "Taxon": provider.taxon,
+            "SpeciesName": provider.species,
+            "DBobjectType": kind,
+            "DBObjectID": object_id,
+            "DBObjectSymbol": f"sym{object_id.rsplit(':', 1)[-1]}",
+            "AssociationType": association,
+            "DOID": _term("DOID", rng),
+            "DOtermName": "disease",
+            "WithOrtholog": release.any_gene(PROVIDERS["HGNC"], rng) if "orthology" in association else "",
+            "InferredFromID": "",
+            "InferredFromSymbol": "",
+            "ExperimentalCondition": condition,
+            "Modifier": "" if rng.random() < 0.97 else "Ameliorated By: drug treatment",
+            "EvidenceCode": rng.choice(["ECO:0000033", "ECO:0000304", "ECO:0007013", "ECO:0000250"]),
+            "EvidenceCodeName": "author statement supported by traceable reference",
+            "Reference": _pmid(rng),
+            "Date": f"{rng.randint(2000, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+            "Source": "RGD" if provider.name == "HGNC" else provider.name,
+        }
+        recent.append(row)
+        yield row
+
+
+def _write_json(path: Path, provider: Provider, records: Iterator[Dict[str, Any]]) -> int:
+    meta = {
+        "dataProvider": {"crossReference": {"id": provider.name, "pages": ["homepage"]}, "type": "curated"},
+        "dateProduced": "2024-06-01T00:00:00-05:00",
+        "release": "synthetic",
+    }
+    count = 0
+    with gzip.open(path, "wt", compresslevel=COMPRESS_LEVEL) as fh:
+        fh.write('{"metaData": ' + json.dumps(meta) + ',\n"data": [')
+        for record in records:
+            fh.write((",\n" if count else "\n") + json.dumps(record))
+            count += 1
+        fh.write("\n]}\n")
+    return count
+
+
+def _write_tsv(path: Path, columns: List[str], rows: Iterator[Dict[str, str]]) -> int:
+    count = 0
+    with gzip.open(path, "wt", compresslevel=COMPRESS_LEVEL) as fh:
+        fh.write("#########################################################\n")
+        fh.write(f"# {path.name.split('.')[0]}\n# Synthetic Alliance of Genome Resources file\n")
+        fh.write("#########################################################\n")
+        fh.write("\t".join(columns) + "\n")
+        for row in rows:
+            fh.write("\t".join(row[column] for column in columns) + "\n")
+            count += 1
+    return count
+
+
+def write_file(data_dir: Path, filename: str, release: Release) -> int:
+    """Write one synthetic file into data_dir. Returns the number of records written."""
+    rng = release.rng(filename)
+    path = data_dir / filename
+    kind, _, rest = filename.partition("_")
+    source = rest.split(".")[0]
+    if kind == "BGI":
+        provider = PROVIDERS[source]
+        return _write_json(path, provider, gene_records(release, provider, rng))
+    if kind == "AGM":
+        provider = PROVIDERS[source]
+        return _write_json(path, provider, genotype_records(release, provider, rng))
+    if kind == "PHENOTYPE":
+        provider = PROVIDERS[source]
+        return _write_json(path, provider, phenotype_records(release, provider, rng, release.records(filename)))
+    if kind == "EXPRESSION":
+        provider = PROVIDERS[source]
+        return _write_json(path, provider, expression_records(release, provider, rng, release.records(filename)))
+    if kind == "VARIANT-ALLELE":
+        provider = next(provider for provider in PROVIDERS.values() if provider.taxon_file == source)
+        return _write_tsv(path, ALLELE_COLUMNS, allele_rows(release, provider, rng))
+    if kind == "DISEASE-ALLIANCE":
+        return _write_tsv(path, DISEASE_COLUMNS, disease_rows(release, rng, release.records(filename)))
+    raise ValueError(f"No synthetic generator for {filename}")
+
+
+def generate(
+    data_dir: Path,
+    scale: float = 1.0,
+    seed: int = SEED,
+    files: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[Path, int]:
+    """
+    Write every synthetic file (or just the named ones) into data_dir, one file per process.
+
+    Returns the number of records written to each file.
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    release = Release(scale, seed)
+    names = files or list(RELEASE_RECORDS)
+    # The largest files first, so they do not start last
+    names = sorted(names, key=release.records, reverse=True)
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        counts = dict(
+            zip(names, pool.map(write_file, [data_dir] * len(names), names, [release] * len(names)), strict=True)
+        )
+    return {data_dir / name: counts[name] for name in RELEASE_RECORDS if name in counts}
@@ -0,0 +1,224 @@
+"""
+Chrome trace event (Perfetto) timeline of an ingest run.
+
+The CLI records a span for every phase of the pipeline and for every download
+and transform config, each config in a lane of its own, so overlapping jobs
+and idle gaps between stages show up when the file is opened in
+chrome://tracing or ui.perfetto.dev.
+
+Transforms on warm workers also record spans inside the transform:
+- building the runner, which opens the readers;
+- loading mappings;
+- the first row, which is when readers decompress and, for koza's JSON
+  reader, parse the whole file;
+- the transform_record loop, with the time spent reading, transforming and
+  writing rows as arguments;
+- the writer flush.
+Workers write their spans to part files next to the trace, and the parts are
+merged into it when it is saved. Both sides stamp events with time.monotonic_ns,
+which is system-wide, so the processes share one timeline.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+PARTS_SUFFIX = ".parts"
+
+
+def _event(
+    name: str, cat: str, start_ns: int, end_ns: int, lane: str, args: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    # Raw events keep nanosecond stamps and the process id; Tracer.save converts them to trace events
+    return {
+        "name": name,
+        "cat": cat,
+        "start_ns": start_ns,
+        "end_ns": end_ns,
+        "pid": os.getpid(),
+        "lane": lane,
+        "args": args or {},
+    }
+
+
+class Tracer:
+    """Spans of one run, written as a Chrome trace JSON file by save()."""
+
+    def __init__(self, path: Path, process_name: str = "ingest"):
+        self.path = path
+        self.process_name = process_name
+        self.origin_ns = time.monotonic_ns()
+        self.events: List[Dict[str, Any]] = []
+        self._open: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def parts_dir(self) -> Path:
+        """Where workers write their spans until the trace is saved."""
+        return self.path.with_name(self.path.name + PARTS_SUFFIX)
+
+    def add(self, name: str, cat: str, start_ns: int, end_ns: int, lane: str, **args) -> None:
+        with self._lock:
+            self.events.append(_event(name, cat, start_ns, end_ns, lane, args))
+
+    @contextmanager
+    def span(self, name: str, cat: str = "phase", lane: str = "pipeline", **args) -> Iterator[None]:
+        start = time.monotonic_ns()
+        try:
+            yield
+        finally:
+            self.add(name, cat, start, time.monotonic_ns(), lane, **args)
+
+    def begin(self, key: str, name: str, cat: str, lane: str) -> None:
+        """Open a span that is closed by end(key), for jobs reported through start and done callbacks."""
+        with self._lock:
+            self._open[key] = (name, cat, lane, time.monotonic_ns())
+
+    def end(self, key: str, **args) -> None:
+        with self._lock:
+            opened = self._open.pop(key, None)
+        if opened:
+            name, cat, lane, start = opened
+            self.add(name, cat, start, time.monotonic_ns(), lane, **args)
+
+    def save(self) -> Path:
+        """Merge the workers' parts into the trace and write it. Returns the trace file."""
+        events = list(self.events)
+        if self.parts_dir.exists():
+            for part in sorted(self.parts_dir.glob("*.json")):
+                events.extend(json.loads(part.read_text()))
+            shutil.rmtree(self.parts_dir)
+
+        lanes: Dict[tuple, int] = {}
+        trace_events: List[Dict[str, Any]] = []
+        for pid in sorted({event["pid"] for event in events} | {os.getpid()}):
+            label = self.process_name if pid == os.getpid() else f"worker {pid}"
+            trace_events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": label}})
+        for event in sorted(events, key=lambda event: event["start_ns"]):
+            lane = (event["pid"], event["lane"])
+            if lane not in lanes:
+                lanes[lane] = len(lanes) + 1
+                trace_events.append(
+                    {"name": "thread_name", "ph": "M", "pid": lane[0], "tid": lanes[lane], "args": {"name": lane[1]}}
+                )
+            trace_events.append(
+                {
+                    "name": event["name"],
+                    "cat": event["cat"],
+                    "ph": "X",
+                    "ts": (event["start_ns"] - self.origin_ns) / 1000,
+                    "dur": (event["end_ns"] - event["start_ns"]) / 1000,
+                    "pid": event["pid"],
+                    "tid": lanes[lane],
+                    "args": event["args"],
+                }
+            )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"traceEvents": trace_events, "displayTimeUnit": "ms"}))
+        return self.path
+
+
+@contextmanager
+def traced(tracer: Optional[Union["Tracer", "RunnerTrace"]], name: str, **kwargs) -> Iterator[None]:
+    """A span of tracer, or nothing without one."""
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, **kwargs):
+        yield
+
+
+class RunnerTrace:
+    """Spans inside one in-process transform, written to a part file of the trace by save()."""
+
+    def __init__(self, name: str, parts_dir: str):
+        self.name = name
+        self.parts_dir = Path(parts_dir)
+        self.lane = f"transform {name}"
+        self.events: List[Dict[str, Any]] = []
+
+    def add(self, name: str, start_ns: int, end_ns: int, **args) -> None:
+        self.events.append(_event(f"{self.name}: {name}", "transform", start_ns, end_ns, self.lane, args))
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        start = time.monotonic_ns()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.monotonic_ns(), **args)
+
+    def instrument(self, runner) -> None:
+        """Record the mapping load, first row, transform_record loop and writer flush of a KozaRunner."""
+        load_mappings = runner.load_mappings
+
+        def traced_load_mappings():
+            with self.span("load mappings"):
+                return load_mappings()
+
+        runner.load_mappings = traced_load_mappings
+
+        timings = {"write_ns": 0}
+        write = runner.writer.write
+
+        def traced_write(entities) -> None:
+            start = time.monotonic_ns()
+            write(entities)
+            timings["write_ns"] += time.monotonic_ns() - start
+
+        runner.writer.write = traced_write
+        runner.data = {tag: self._rows(tag, rows, timings) for tag, rows in runner.data.items()}
+
+        finalize = runner.writer.finalize
+
+        def traced_finalize():
+            with self.span("writer flush"):
+                return finalize()
+
+        runner.writer.finalize = traced_finalize
+
+    def _rows(self, tag: Optional[str], rows: Iterable, timings: Dict[str, int]) -> Iterator:
+        """Pass rows through, timing the first row on its own and the rest as the transform_record loop."""
+        label = f" [{tag}]" if tag else ""
+        iterator = iter(rows)
+        count = 0
+        read_ns = 0
+        loop_start = None
+        while True:
+            start = time.monotonic_ns()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                end = time.monotonic_ns()
+                if loop_start is None:
+                    self.add(f"first row{label}", start, end)
+                    loop_start = end
+                    timings["write_ns"] = 0
+                else:
+                    read_ns += end - start
+            count += 1
+            yield row
+        loop_end = time.monotonic_ns()
+        seconds = (loop_end - loop_start) / 1e9
+        self.add(
+            f"transform_record loop{label}",
+            loop_start,
+            loop_end,
+            rows=count,
+            read_seconds=round(read_ns / 1e9, 3),
+            write_seconds=round(timings["write_ns"] / 1e9, 3),
+            transform_seconds=round(seconds - (read_ns + timings["write_ns"]) / 1e9, 3),
+        )
+
+    def save(self) -> None:
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        part = self.parts_dir / f"{os.getpid()}-{time.monotonic_ns()}.json"
+        part.write_text(json.dumps(self.events))
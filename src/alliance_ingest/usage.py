@@ -0,0 +1,76 @@
+"""
+CPU time and peak RSS of jobs, run either as subprocesses or in this process.
+
+A subprocess is reaped with wait4, whose resource usage covers the process
+and every child it waited for, such as the workers of a pool. In-process jobs
+on a warm worker measure the worker itself. Their CPU time is a getrusage
+delta, and their peak RSS is the kernel's high-water mark, which is reset
+when the job starts. The reset needs Linux's /proc/self/clear_refs. Elsewhere
+the peak is that of the worker's whole life so far.
+"""
+
+import os
+import re
+import resource
+import subprocess
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Iterator, List, Optional, Tuple, Union
+
+
+@dataclass
+class Usage:
+    cpu_seconds: float = 0.0
+    peak_rss: int = 0
+
+
+def _maxrss_bytes(usage: resource.struct_rusage) -> int:
+    # Kilobytes on Linux, bytes on macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def from_rusage(usage: resource.struct_rusage) -> Usage:
+    return Usage(usage.ru_utime + usage.ru_stime, _maxrss_bytes(usage))
+
+
+def run_measured(cmd: List[str], stdout: Optional[Union[int, IO]] = None, **kwargs) -> Tuple[int, Usage]:
+    """Run a command to completion. Returns its exit code and resource usage."""
+    stderr = subprocess.STDOUT if stdout is not None else None
+    process = subprocess.Popen(cmd, stdout=stdout, stderr=stderr, **kwargs)
+    _, status, usage = os.wait4(process.pid, 0)
+    # The process is already reaped; recording its status keeps Popen from waiting on it again
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, from_rusage(usage)
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as fh:
+            match = re.search(r"^VmHWM:\s+(\d+) kB", fh.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return int(match[1]) * 1024 if match else None
+
+
+@contextmanager
+def measure_self() -> Iterator[Usage]:
+    """Measure the CPU time and peak RSS of this process while the block runs."""
+    reset = _reset_peak_rss()
+    start = resource.getrusage(resource.RUSAGE_SELF)
+    usage = Usage()
+    try:
+        yield usage
+    finally:
+        end = resource.getrusage(resource.RUSAGE_SELF)
+        usage.cpu_seconds = (end.ru_utime - start.ru_utime) + (end.ru_stime - start.ru_stime)
+        usage.peak_rss = (_peak_rss() if reset else None) or _maxrss_bytes(end)
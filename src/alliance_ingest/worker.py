@@ -0,0 +1,251 @@
+"""
+Run koza transforms and downloads in-process on warm worker processes.
+
+Starting `uv run koza` for every config pays for environment resolution, a
+fresh interpreter and a cold import of koza, the biolink pydantic model and
+pydantic itself. Workers in a WarmPool import those once when they start and
+then call the koza and kghub-downloader APIs directly for each config.
+"""
+
+import importlib
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .gzindex import Offsets
+from .options import TransformOptions
+from .pipeline import use_pipeline
+from .scheduler import Job, JobResult, publish_outputs
+from .trace import RunnerTrace, traced
+from .usage import measure_self
+
+PRELOAD_MODULES = [
+    "pydantic",
+    "koza",
+    "koza.runner",
+    "biolink_model.datamodel.pydanticmodel_v2",
+    "kghub_downloader.download_utils",
+]
+
+# Task stats that are copied onto the JobResult
+USAGE_STATS = ["cpu_seconds", "peak_rss", "rows_read", "rows_skipped"]
+
+# Stats of pipelined transforms only, also copied onto the JobResult
+PIPELINE_STATS = ["input_wait_seconds", "output_wait_seconds", "input_queue_depth", "output_queue_depth"]
+
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | {message}"
+
+# Seconds this worker spent importing PRELOAD_MODULES when it started
+_startup_seconds = 0.0
+
+
+def preload() -> float:
+    """Import the heavy modules once for this worker process."""
+    global _startup_seconds
+    start = time.perf_counter()
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+    _startup_seconds = time.perf_counter() - start
+    return _startup_seconds
+
+
+def _configure_logging(log_file: Optional[str]) -> None:
+    from loguru import logger
+
+    logger.remove()
+    if log_file:
+        logger.add(log_file, format=LOG_FORMAT, mode="w")
+    else:
+        logger.add(sys.stderr, format=LOG_FORMAT)
+
+
+def _task_stats(start: float) -> Dict[str, Any]:
+    return {"pid": os.getpid(), "startup": _startup_seconds, "elapsed": time.perf_counter() - start}
+
+
+def run_transform(
+    config: str,
+    output_dir: str,
+    options: TransformOptions,
+    log_file: Optional[str] = None,
+    input_files: Optional[List[str]] = None,
+    offsets: Optional[Offsets] = None,
+    instrument: Optional[Callable[[Any], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run a single koza transform config in this process, optionally on a subset of its reader files.
+
+    offsets limits a single input file to a range of its output (see gzindex).
+    instrument is called with the KozaRunner before it runs, as the memory
+    profiler does to check traced memory between rows.
+    """
+    from loguru import logger
+
+    from .runner import build_runner, count_rows
+
+    # The module the transform code imports, which is not necessarily this package's own
+    construct = importlib.import_module("alliance_ingest.construct")
+
+    start = time.perf_counter()
+    _configure_logging(log_file)
+    constructor = construct.configure(options.validate_sample)
+    trace = None
+    pipeline = None
+    if options.trace_dir:
+        files = f" ({', '.join(Path(f).name for f in input_files)})" if input_files else ""
+        if offsets:
+            files = f"{files[:-1]} from {offsets[0]})"
+        trace = RunnerTrace(Path(config).stem + files, options.trace_dir)
+    try:
+        with measure_self() as usage:
+            with traced(trace, "build runner"):
+                _, runner = build_runner(config, output_dir, options, input_files, offsets)
+            if options.pipeline:
+                pipeline = use_pipeline(runner, options.queue_size)
+            rows = count_rows(runner)
+            if trace:
+                trace.instrument(runner)
+            if instrument:
+                instrument(runner)
+            runner.run()
+    except Exception:
+        logger.exception(f"Transform {config} failed")
+        raise
+    finally:
+        # Trusted construction lasts for this run only
+        construct.configure()
+        if pipeline:
+            pipeline.stop()
+        if trace:
+            trace.save()
+    if options.validate_sample:
+        escalated = f", then every row after {constructor.escalated}" if constructor.escalated else ""
+        logger.info(f"Validated {constructor.validated} of {constructor.built} objects built{escalated}")
+    if pipeline:
+        logger.info(pipeline.summary())
+    return {
+        **_task_stats(start),
+        "cpu_seconds": usage.cpu_seconds,
+        "peak_rss": usage.peak_rss,
+        "rows_read": rows.read,
+        "rows_skipped": rows.skipped,
+        **(pipeline.stats() if pipeline else {}),
+    }
+
+
+def run_download(
+    config: str,
+    output_dir: str = ".",
+    ignore_cache: bool = False,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """Download every resource of a download.yaml in this process."""
+    from kghub_downloader.download_utils import download_from_yaml
+    from kghub_downloader.model import DownloadOptions
+
+    start = time.perf_counter()
+    options = DownloadOptions(ignore_cache=ignore_cache, verbose=verbose)
+    with measure_self() as usage:
+        report = download_from_yaml(yaml_file=config, output_dir=output_dir, download_options=options)
+    if report.failed:
+        raise RuntimeError(f"{len(report.failed)} downloads failed: {', '.join(map(str, report.failed))}")
+    return {**_task_stats(start), "cpu_seconds": usage.cpu_seconds, "peak_rss": usage.peak_rss}
+
+
+@dataclass
+class WarmPool:
+    """A pool of long-lived worker processes with koza and biolink preloaded."""
+
+    max_workers: int = 1
+    startup_by_pid: Dict[int, float] = field(default_factory=dict)
+    tasks_run: int = 0
+
+    def __post_init__(self):
+        self.executor = ProcessPoolExecutor(max_workers=max(1, self.max_workers), initializer=preload)
+
+    def __enter__(self) -> "WarmPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.executor.shutdown()
+
+    def run(
+        self,
+        jobs: List[Job],
+        output_dir: Path,
+        submit: Callable[[Job, Optional[str]], Future],
+        log_dir: Optional[Path] = None,
+        on_start: Optional[Callable[[Job], None]] = None,
+        on_done: Optional[Callable[[JobResult], None]] = None,
+    ) -> List[JobResult]:
+        """
+        Submit jobs to the pool and collect their results in job order.
+
+        submit receives each job and the log file it should write to (None
+        without a log_dir) and returns the future of its task. Staged outputs
+        are published on success exactly as in the subprocess path.
+        """
+        from loguru import logger
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        if log_dir:
+            log_dir.mkdir(exist_ok=True)
+
+        futures = {}
+        for job in jobs:
+            if job.staging_dir:
+                shutil.rmtree(job.staging_dir, ignore_errors=True)
+                job.staging_dir.mkdir(parents=True)
+            log_file = log_dir / f"{job.name}.log" if log_dir else None
+            if on_start:
+                on_start(job)
+            future = submit(job, str(log_file) if log_file else None)
+            futures[future] = (job, log_file, time.perf_counter())
+
+        results = {}
+        for future in as_completed(futures):
+            job, log_file, submitted = futures[future]
+            try:
+                stats = future.result()
+                self.startup_by_pid[stats["pid"]] = stats["startup"]
+                returncode, elapsed = 0, stats["elapsed"]
+            except Exception as e:
+                logger.error(f"{job.name}: {type(e).__name__}: {e}")
+                returncode, elapsed, stats = 1, time.perf_counter() - submitted, {}
+            self.tasks_run += 1
+            result = JobResult(
+                name=job.name,
+                returncode=returncode,
+                elapsed=elapsed,
+                log_file=log_file,
+                **{key: stats[key] for key in USAGE_STATS + PIPELINE_STATS if key in stats},
+            )
+            if job.staging_dir:
+                if result.ok:
+                    publish_outputs(job.staging_dir, output_dir)
+                else:
+                    shutil.rmtree(job.staging_dir, ignore_errors=True)
+            if on_done:
+                on_done(result)
+            results[job.name] = result
+        return [results[job.name] for job in jobs]
+
+    def startup_savings(self) -> Tuple[float, float]:
+        """
+        Compare the import cost paid by the warm workers with the subprocess path.
+
+        Returns (paid, avoided): the seconds the workers spent importing the
+        preloaded modules, and the seconds one cold import per task would have
+        cost instead. The subprocess path also pays for `uv run` environment
+        resolution and interpreter start, so avoided is a lower bound.
+        """
+        paid = sum(self.startup_by_pid.values())
+        if not self.startup_by_pid:
+            return 0.0, 0.0
+        per_process = paid / len(self.startup_by_pid)
+        return paid, per_process * self.tasks_run
@@ -0,0 +1,186 @@
+"""
+Alternative koza writers used by the in-process runner.
+
+They take the same writer config as koza's TSVWriter and write the same
+node and edge columns, in the same order, as `{name}_nodes.<ext>` and
+`{name}_edges.<ext>`.
+"""
+
+import inspect
+import typing
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from koza.converter.kgx_converter import KGXConverter
+from koza.io.utils import column_types
+from koza.io.writer.tsv_writer import TSVWriter
+from koza.io.writer.writer import KozaWriter
+from koza.model.writer import WriterConfig
+from pydantic import BaseModel
+
+ROW_GROUP_SIZE = 100_000
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def _is_list(annotation: Any) -> bool:
+    origin = typing.get_origin(annotation)
+    if origin in (list, set, tuple):
+        return True
+    return any(_is_list(arg) for arg in typing.get_args(annotation))
+
+
+@lru_cache(maxsize=1)
+def biolink_list_slots() -> frozenset:
+    """Slots that are multivalued in the biolink pydantic model."""
+    from biolink_model.datamodel import pydanticmodel_v2
+
+    slots = set()
+    for cls in vars(pydanticmodel_v2).values():
+        if inspect.isclass(cls) and issubclass(cls, BaseModel) and cls.__module__ == pydanticmodel_v2.__name__:
+            slots.update(name for name, info in cls.model_fields.items() if _is_list(info.annotation))
+    return frozenset(slots)
+
+
+def column_type(column: str) -> pa.DataType:
+    """Arrow type of a node or edge column: a list of strings for multivalued slots, else a string."""
+    if column_types.get(column) is bool:
+        return pa.bool_()
+    if column_types.get(column) is list or column in biolink_list_slots():
+        return pa.list_(pa.string())
+    return pa.string()
+
+
+def _null(value: Any) -> bool:
+    return value is None or value == "" or value == " "
+
+
+def _to_list(value: Any) -> Optional[List[str]]:
+    if isinstance(value, (list, set, tuple)):
+        return [str(v) for v in value if not _null(v)] or None
+    return None if _null(value) else [str(value)]
+
+
+# String forms of booleans, as they are written to TSV
+_BOOLEANS = {"true": True, "1": True, "false": False, "0": False}
+
+
+def _to_bool(value: Any) -> Optional[bool]:
+    if _null(value):
+        return None
+    if isinstance(value, bool):
+        return value
+    try:
+        return _BOOLEANS[str(value).strip().lower()]
+    except KeyError:
+        raise ValueError(f"Not a boolean: {value!r}") from None
+
+
+def _to_str(value: Any) -> Optional[str]:
+    if isinstance(value, (list, set, tuple)):
+        return "|".join(str(v) for v in value if not _null(v)) or None
+    return None if _null(value) else str(value)
+
+
+class _ParquetTable:
+    """The buffered row group and Parquet file of either nodes or edges."""
+
+    def __init__(self, path: Path, columns: List[str], row_group_size: int):
+        self.path = path
+        self.schema = pa.schema([(column, column_type(column)) for column in columns])
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._converters: Dict[str, Callable[[Any], Any]] = {}
+        for field in self.schema:
+            if pa.types.is_list(field.type):
+                self._converters[field.name] = _to_list
+            elif pa.types.is_boolean(field.type):
+                self._converters[field.name] = _to_bool
+            else:
+                self._converters[field.name] = _to_str
+        self._buffer: Dict[str, List[Any]] = {column: [] for column in columns}
+        self._writer = pq.ParquetWriter(path, self.schema, compression=PARQUET_COMPRESSION)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Buffer a record, nulls removed as by koza's build_export_row, writing a row group when full."""
+        # Convert the whole record first, so a value that can't be converted leaves the buffer as it was
+        values = [(column, convert(record.get(column))) for column, convert in self._converters.items()]
+        for column, value in values:
+            self._buffer[column].append(value)
+        self.rows += 1
+        if self.rows % self.row_group_size == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer[self.schema[0].name]:
+            self._writer.write_table(pa.Table.from_pydict(self._buffer, schema=self.schema))
+            self._buffer = {column: [] for column in self._buffer}
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+
+class ParquetWriter(KozaWriter):
+    """
+    Write nodes and edges as zstd-compressed Parquet files, one row group per row_group_size rows.
+
+    Multivalued biolink slots such as publications, qualifiers and
+    aggregator_knowledge_source are list<string> columns instead of
+    pipe-joined strings; other columns are strings, as in the TSV files.
+    Values keep their tabs and newlines, which koza only replaces for TSV.
+    """
+
+    def __init__(
+        self,
+        output_dir: str | Path,
+        source_name: str,
+        config: WriterConfig,
+        row_group_size: int = ROW_GROUP_SIZE,
+    ):
+        self.converter = KGXConverter()
+        self.sssom_config = config.sssom_config
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+        self.tables: Dict[str, _ParquetTable] = {}
+        if config.node_properties:
+            self._open(output_dir, source_name, "node", list(config.node_properties), row_group_size)
+        if config.edge_properties:
+            edge_properties = list(config.edge_properties)
+            if config.sssom_config:
+                edge_properties = TSVWriter.add_sssom_columns(edge_properties)
+            self._open(output_dir, source_name, "edge", edge_properties, row_group_size)
+
+    def _open(
+        self,
+        output_dir: str | Path,
+        source_name: str,
+        record_type: Literal["node", "edge"],
+        properties: List[str],
+        row_group_size: int,
+    ) -> None:
+        columns = list(TSVWriter._order_columns(properties, record_type))
+        path = Path(output_dir) / f"{source_name}_{record_type}s.parquet"
+        self.tables[record_type] = _ParquetTable(path, columns, row_group_size)
+
+    def write(self, entities: Iterable) -> None:
+        nodes, edges = self.converter.convert(entities)
+        for node in nodes:
+            self.write_row(node, "node")
+        for edge in edges:
+            if self.sssom_config:
+                edge = self.sssom_config.apply_mapping(edge)
+            self.write_row(edge, "edge")
+
+    def write_row(self, record: Dict[str, Any], record_type: Literal["node", "edge"]) -> None:
+        table: Optional[_ParquetTable] = self.tables.get(record_type)
+        if table is not None:
+            table.append(record)
+
+    def finalize(self) -> None:
+        for table in self.tables.values():
+            table.close()
@@ -2,6 +2,7 @@
 Testing configuration and utilities for alliance-ingest.
 Provides replacements for Koza 1.x testing utilities to work with Koza 2.0+.
 """
+import gzip
 import tempfile
 import json
 import importlib.util
@@ -9,6 +10,7 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Any, Union, Optional
 import pytest
+import yaml
 
 
 # Additional fixtures that might be needed by the tests
@@ -21,3 +23,33 @@ def taxon_label_map_cache():
         "NCBITaxon:6239": "Caenorhabditis elegans"
     }
 
+
+DISEASE_CONFIG = Path(__file__).parent.parent / "src" / "alliance_ingest" / "disease.yaml"
+
+
+@pytest.fixture
+def disease_config(tmp_path):
+    """The disease transform config, reading two small DISEASE-ALLIANCE files of five rows each in tmp_path."""
+    config = yaml.safe_load(DISEASE_CONFIG.read_text())
+    columns = config["reader"]["columns"]
+    config["reader"]["files"] = []
+    for provider in ["MGI", "ZFIN"]:
+        data_file = tmp_path / f"DISEASE-ALLIANCE_{provider}.tsv.gz"
+        with gzip.open(data_file, "wt") as fh:
+            fh.write("\t".join(columns) + "\n")
+            for i in range(5):
+                row = dict.fromkeys(columns, "")
+                row.update(
+                    DBobjectType="affected_genomic_model",
+                    DBObjectID=f"{provider}:{1000 + i}",
+                    AssociationType="is_model_of",
+                    DOID=f"DOID:00600{i}",
+                    EvidenceCode="ECO:0000033",
+                    Reference=f"PMID:2988545{i}",
+                )
+                fh.write("\t".join(row[column] for column in columns) + "\n")
+        config["reader"]["files"].append(data_file.name)
+    config["transform"]["code"] = str(DISEASE_CONFIG.with_suffix(".py"))
+    config_file = tmp_path / "disease.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+    return config_file
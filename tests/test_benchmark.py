@@ -0,0 +1,39 @@
+import json
+import random
+
+from src.alliance_ingest.benchmark import CORPORA, compare, run_benchmarks
+
+
+def test_corpora_are_reproducible():
+    for corpus in CORPORA.values():
+        assert corpus(random.Random(1), 50) == corpus(random.Random(1), 50)
+
+
+def test_every_transform_is_benchmarked():
+    results = run_benchmarks(rows=200, repeat=1)
+
+    assert set(results["transforms"]) == {"allele", "disease", "expression", "gene", "genotype", "phenotype"}
+    for result in results["transforms"].values():
+        assert result["rows"] == 200
+        assert result["entities"] > 0
+        assert result["rows_per_second"] > 0
+        assert result["alloc_bytes_per_row"] > 0
+    # The mixed corpus includes rows the disease transform skips
+    assert results["transforms"]["disease"]["entities"] < 200
+    assert json.loads(json.dumps(results)) == results
+
+
+def test_regressions_beyond_the_threshold():
+    baseline = {"transforms": {"gene": {"rows_per_second": 1000.0, "alloc_bytes_per_row": 2000.0}}}
+
+    def run(rows_per_second, alloc_bytes_per_row):
+        result = {"rows_per_second": rows_per_second, "alloc_bytes_per_row": alloc_bytes_per_row}
+        return {"transforms": {"gene": result, "allele": result}}
+
+    assert compare(run(950.0, 2100.0), baseline, threshold=0.1) == []
+    assert compare(run(850.0, 2000.0), baseline, threshold=0.1) == ["gene: 850 rows/s, 15% below 1,000"]
+    assert compare(run(1000.0, 2500.0), baseline, threshold=0.1) == [
+        "gene: 2,500 bytes allocated per row, 25% above 2,000"
+    ]
+    baseline["transforms"]["gene"]["alloc_bytes_per_row"] = 0.0
+    assert compare(run(1000.0, 10.0), baseline, threshold=0.1) == ["gene: 10 bytes allocated per row, above 0"]
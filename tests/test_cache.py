@@ -0,0 +1,110 @@
+import gzip
+import json
+import marshal
+import os
+from pathlib import Path
+
+import pytest
+import yaml
+from koza.model.reader import CSVReaderConfig, JSONReaderConfig
+from koza.model.source import Source
+
+from src.alliance_ingest.cache import CACHE_DIR, ENTRY_SUFFIX, entry_path, read_entry, settings_key
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.readers import CachedSource
+from src.alliance_ingest.worker import run_transform
+
+ALLELE_CONFIG = Path(__file__).parent.parent / "src" / "alliance_ingest" / "allele.yaml"
+
+
+def entries(tmp_path):
+    return sorted(path.name for path in (tmp_path / CACHE_DIR).glob(f"*{ENTRY_SUFFIX}"))
+
+
+def write_json(path, rows):
+    with gzip.open(path, "wt") as fh:
+        json.dump({"metaData": {"release": "test"}, "data": rows}, fh)
+
+
+@pytest.fixture
+def json_config(tmp_path):
+    rows = [
+        {"primaryId": f"MGI:{i}", "score": i * 0.5, "tags": ["a", None, True], "note": {"t": "é"}} for i in range(3000)
+    ]
+    write_json(tmp_path / "ROWS.json.gz", rows)
+    return JSONReaderConfig(files=["ROWS.json.gz"], json_path=["data"], required_properties=["primaryId"])
+
+
+def test_cached_json_rows_match_koza_source(json_config, tmp_path):
+    expected = list(Source(json_config, tmp_path))
+    assert list(CachedSource(json_config, tmp_path)) == expected
+    assert len(entries(tmp_path)) == 1
+    # Read from the entry
+    assert list(CachedSource(json_config, tmp_path)) == expected
+    assert list(CachedSource(json_config, tmp_path, row_limit=5)) == expected[:5]
+
+
+def test_cached_tsv_rows_match_koza_source(tmp_path):
+    path = tmp_path / "ROWS.tsv"
+    path.write_text("# comment\na\tb\tc\n" + "".join(f"{i}\tx{i}\t{i % 3}\n" for i in range(50)))
+    config = CSVReaderConfig(files=[path.name], delimiter="\t", comment_char="#", field_type_map={"a": "int"})
+    expected = list(Source(config, tmp_path))
+    assert list(CachedSource(config, tmp_path)) == expected
+    assert list(read_entry(entry_path(path, config))) == expected
+    assert list(CachedSource(config, tmp_path)) == expected
+
+
+def test_entry_only_written_after_a_full_read(json_config, tmp_path):
+    assert len(list(CachedSource(json_config, tmp_path, row_limit=10))) == 10
+    rows = iter(CachedSource(json_config, tmp_path))
+    next(rows)
+    rows.close()
+    assert entries(tmp_path) == []
+    assert not list((tmp_path / CACHE_DIR).glob("*.tmp"))
+
+
+def test_changed_file_or_settings_replace_the_entry(json_config, tmp_path):
+    list(CachedSource(json_config, tmp_path))
+    [first] = entries(tmp_path)
+
+    path = tmp_path / "ROWS.json.gz"
+    write_json(path, [{"primaryId": "MGI:1"}])
+    os.utime(path, ns=(0, 0))
+    assert list(CachedSource(json_config, tmp_path)) == [{"primaryId": "MGI:1"}]
+    [second] = entries(tmp_path)
+    assert second != first
+
+    config = JSONReaderConfig(files=["ROWS.json.gz"], json_path=["metaData"])
+    assert list(CachedSource(config, tmp_path)) == [{"release": "test"}]
+    [third] = entries(tmp_path)
+    assert third != second
+
+
+def test_marshal_version_is_part_of_the_key(json_config, monkeypatch):
+    key = settings_key(json_config)
+    monkeypatch.setattr(marshal, "version", marshal.version + 1)
+    assert settings_key(json_config) != key
+
+
+def test_transform_same_with_cache(tmp_path):
+    columns = yaml.safe_load(ALLELE_CONFIG.read_text())["reader"]["columns"]
+    path = tmp_path / "VARIANT-ALLELE_NCBITaxon10090.tsv.gz"
+    with gzip.open(path, "wt") as fh:
+        fh.write("\t".join(columns) + "\n")
+        for i in range(20):
+            row = {column: f"{column}-{i}" for column in columns}
+            row.update(Taxon="NCBITaxon:10090", AlleleId=f"MGI:{5000 + i}", AlleleSynonyms="-")
+            fh.write("\t".join(row[column] for column in columns) + "\n")
+    config = yaml.safe_load(ALLELE_CONFIG.read_text())
+    config["reader"]["files"] = [path.name]
+    config["transform"]["code"] = str(ALLELE_CONFIG.with_suffix(".py"))
+    config["writer"]["min_node_count"] = config["writer"]["min_edge_count"] = 0
+    config_file = tmp_path / "allele.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    run_transform(str(config_file), str(tmp_path / "koza"), TransformOptions())
+    for output in ["cold", "warm"]:
+        run_transform(str(config_file), str(tmp_path / output), TransformOptions(cache=True))
+        for name in ["alliance_allele_nodes.tsv", "alliance_allele_edges.tsv"]:
+            assert (tmp_path / output / name).read_bytes() == (tmp_path / "koza" / name).read_bytes()
+    assert len(entries(tmp_path)) == 1
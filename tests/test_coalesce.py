@@ -0,0 +1,110 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.alliance_ingest.coalesce import coalesce_file, coalesce_outputs
+from src.alliance_ingest.ids import association_id
+from src.alliance_ingest.manifest import Manifest
+
+HEADER = ["id", "subject", "predicate", "object", "has_evidence", "publications", "qualifiers"]
+
+EDGES = [
+    ["uuid:1", "MGI:1", "biolink:expressed_in", "UBERON:1", "ECO:1", "PMID:1", "MMO:1"],
+    ["uuid:2", "MGI:2", "biolink:expressed_in", "UBERON:1", "ECO:1", "PMID:2", "MMO:1"],
+    ["uuid:3", "MGI:1", "biolink:expressed_in", "UBERON:1", "ECO:2", "PMID:3|PMID:1", "MMO:1"],
+    # A different assay is a different statement
+    ["uuid:4", "MGI:1", "biolink:expressed_in", "UBERON:1", "ECO:1", "PMID:4", "MMO:2"],
+    ["uuid:5", "MGI:1", "biolink:expressed_in", "UBERON:1", "", "PMID:5", "MMO:1"],
+]
+
+# The ID of the coalesced first, third and fifth edges
+MERGED_ID = "uuid:" + association_id(
+    "MGI:1", "biolink:expressed_in", "UBERON:1", ["ECO:1", "ECO:2", "MMO:1"], ["PMID:1", "PMID:3", "PMID:5"]
+)
+
+
+def write_tsv(path, rows):
+    path.write_text("".join("\t".join(row) + "\n" for row in [HEADER] + rows))
+
+
+@pytest.mark.parametrize("max_groups", [1_000_000, 1])
+def test_tsv_edges_are_coalesced(tmp_path, max_groups):
+    path = tmp_path / "alliance_expression_edges.tsv"
+    write_tsv(path, EDGES)
+
+    result = coalesce_file(path, tmp_path / "work", max_groups=max_groups)
+
+    assert (result.rows, result.edges, result.coalesced) == (5, 3, True)
+    assert (result.runs > 0) == (max_groups == 1)
+    lines = path.read_text().splitlines()
+    assert lines[0].split("\t") == HEADER
+    # Groups come out in key order, with merged lists in the order first seen
+    assert [line.split("\t") for line in lines[1:]] == [
+        [MERGED_ID, "MGI:1", "biolink:expressed_in", "UBERON:1", "ECO:1|ECO:2", "PMID:1|PMID:3|PMID:5", "MMO:1"],
+        ["uuid:4", "MGI:1", "biolink:expressed_in", "UBERON:1", "ECO:1", "PMID:4", "MMO:2"],
+        ["uuid:2", "MGI:2", "biolink:expressed_in", "UBERON:1", "ECO:1", "PMID:2", "MMO:1"],
+    ]
+    assert not (tmp_path / "work").exists() or not list((tmp_path / "work").iterdir())
+
+
+def test_merged_id_does_not_depend_on_row_order(tmp_path):
+    path = tmp_path / "alliance_expression_edges.tsv"
+    ids = set()
+    for edges in [EDGES, EDGES[::-1]]:
+        write_tsv(path, edges)
+        coalesce_file(path, tmp_path / "work")
+        ids.add(path.read_text().splitlines()[1].split("\t")[0])
+    assert ids == {MERGED_ID}
+
+
+def test_file_without_duplicates_is_left_alone(tmp_path):
+    path = tmp_path / "alliance_disease_edges.tsv"
+    write_tsv(path, [EDGES[1], EDGES[0]])
+    before = path.stat().st_mtime_ns
+
+    result = coalesce_file(path, tmp_path / "work")
+
+    assert (result.rows, result.edges, result.coalesced) == (2, 2, False)
+    assert path.stat().st_mtime_ns == before
+
+
+def test_jsonl_and_parquet_edges_are_coalesced(tmp_path):
+    records = [
+        {
+            **dict(zip(HEADER[:4], row[:4])),
+            "has_evidence": row[4].split("|") if row[4] else None,
+            "publications": row[5].split("|"),
+            "qualifiers": [row[6]],
+        }
+        for row in EDGES
+    ]
+    jsonl = tmp_path / "alliance_expression_edges.jsonl"
+    jsonl.write_text("".join(json.dumps({k: v for k, v in r.items() if v is not None}) + "\n" for r in records))
+    parquet = tmp_path / "alliance_expression_edges.parquet"
+    schema = pa.schema([(column, pa.list_(pa.string()) if column in HEADER[4:] else pa.string()) for column in HEADER])
+    pq.write_table(pa.Table.from_pylist(records, schema=schema), parquet)
+
+    for path in [jsonl, parquet]:
+        assert coalesce_file(path, tmp_path / "work", max_groups=2).edges == 3
+
+    coalesced = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert coalesced[0]["publications"] == ["PMID:1", "PMID:3", "PMID:5"]
+    assert coalesced[0]["has_evidence"] == ["ECO:1", "ECO:2"]
+    assert coalesced[0]["id"] == MERGED_ID
+    assert pq.read_table(parquet).to_pylist()[0]["publications"] == ["PMID:1", "PMID:3", "PMID:5"]
+    assert pq.read_table(parquet).to_pylist()[0]["id"] == MERGED_ID
+
+
+def test_manifest_records_the_coalesced_outputs(tmp_path):
+    path = tmp_path / "alliance_expression_edges.tsv"
+    write_tsv(path, EDGES)
+    manifest = Manifest.load(tmp_path)
+    manifest.record("expression", {"fingerprint": "f", "inputs": {}}, [path])
+    manifest.save()
+
+    results = coalesce_outputs(tmp_path)
+
+    assert [(result.path.name, result.edges) for result in results] == [(path.name, 3)]
+    assert Manifest.load(tmp_path).is_current("expression", {"fingerprint": "f"}, tmp_path)
@@ -0,0 +1,47 @@
+import gzip
+
+import pyarrow as pa
+import pytest
+
+from src.alliance_ingest import compression
+from src.alliance_ingest.compression import open_output
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.worker import run_transform
+
+LINES = [f"MGI:{i}\tbiolink:Gene\tgène {i}\n" for i in range(20_000)]
+
+
+@pytest.mark.parametrize("suffix", [".tsv", ".tsv.gz", ".tsv.zst"])
+def test_written_files_read_back(tmp_path, monkeypatch, suffix):
+    # Many blocks, so that the queue fills up
+    monkeypatch.setattr(compression, "BLOCK_SIZE", 1 << 12)
+    path = tmp_path / f"alliance_gene_nodes{suffix}"
+    with open_output(path, "wt") as fh:
+        for line in LINES:
+            fh.write(line)
+
+    with open_output(path) as fh:
+        assert fh.readlines() == LINES
+    with open_output(path, "rb") as fh:
+        assert fh.read() == "".join(LINES).encode()
+
+
+def test_compressed_files_are_standard(tmp_path):
+    with open_output(tmp_path / "nodes.tsv.gz", "wb") as fh:
+        fh.write(b"a\tb\n")
+    with open_output(tmp_path / "nodes.tsv.zst", "wb") as fh:
+        fh.write(b"a\tb\n")
+
+    assert gzip.decompress((tmp_path / "nodes.tsv.gz").read_bytes()) == b"a\tb\n"
+    assert pa.CompressedInputStream(str(tmp_path / "nodes.tsv.zst"), "zstd").read() == b"a\tb\n"
+
+
+@pytest.mark.parametrize(("output_compression", "suffix"), [("gz", ".gz"), ("zstd", ".zst")])
+def test_transform_writes_compressed_outputs(disease_config, tmp_path, output_compression, suffix):
+    run_transform(str(disease_config), str(tmp_path / "plain"), TransformOptions())
+    options = TransformOptions(output_compression=output_compression)
+    run_transform(str(disease_config), str(tmp_path / "compressed"), options)
+
+    assert sorted(path.name for path in (tmp_path / "compressed").iterdir()) == [f"alliance_disease_edges.tsv{suffix}"]
+    with open_output(tmp_path / "compressed" / f"alliance_disease_edges.tsv{suffix}", "rb") as fh:
+        assert fh.read() == (tmp_path / "plain" / "alliance_disease_edges.tsv").read_bytes()
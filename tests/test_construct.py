@@ -0,0 +1,113 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+from biolink_model.datamodel.pydanticmodel_v2 import (
+    AgentTypeEnum,
+    Gene,
+    GeneToExpressionSiteAssociation,
+    KnowledgeLevelEnum,
+)
+from pydantic import ValidationError
+
+from src.alliance_ingest.construct import Constructor
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.worker import run_transform
+
+SRC = Path(__file__).parent.parent / "src" / "alliance_ingest"
+
+
+def expression_fields(i, **overrides):
+    fields = dict(
+        id=f"uuid:{i}",
+        subject=f"MGI:{i}",
+        predicate="biolink:expressed_in",
+        object="EMAPA:16039",
+        stage_qualifier="MmusDv:0000003",
+        qualifiers=["MMO:0000655"],
+        publications=[f"PMID:{i}"],
+        aggregator_knowledge_source=["infores:monarchinitiative", "infores:agrkb"],
+        primary_knowledge_source="infores:mgi",
+        knowledge_level=KnowledgeLevelEnum.knowledge_assertion,
+        agent_type=AgentTypeEnum.manual_agent,
+    )
+    fields.update(overrides)
+    return fields
+
+
+def as_written(obj):
+    """The values and their types, as the KGX writer sees them."""
+    return {name: (value, type(value)) for name, value in dict(obj).items()}
+
+
+def test_trusted_objects_match_validated_ones():
+    constructor = Constructor(sample=1000)
+    for i in range(50):
+        fields = expression_fields(i, stage_qualifier=None if i % 3 else "MmusDv:0000003")
+        trusted = constructor.build(GeneToExpressionSiteAssociation, fields)
+        validated = GeneToExpressionSiteAssociation(**fields)
+        assert as_written(trusted) == as_written(validated)
+        assert trusted.model_fields_set == validated.model_fields_set
+    # Only the first row of each of the two shapes
+    assert constructor.validated == 2
+    assert constructor.escalated is None
+
+
+def test_one_in_sample_rows_is_validated():
+    constructor = Constructor(sample=10)
+    for i in range(100):
+        constructor.build(GeneToExpressionSiteAssociation, expression_fields(i))
+    assert constructor.validated == 11
+
+
+def test_validation_failure_escalates():
+    constructor = Constructor(sample=1000)
+    constructor.build(Gene, dict(id="MGI:1", in_taxon=["NCBITaxon:10090"]))
+    constructor.build(Gene, dict(id="MGI:2", in_taxon=["NCBITaxon:10090"]))
+    # A row of a new shape is validated
+    with pytest.raises(ValidationError):
+        constructor.build(Gene, dict(id="MGI:3", in_taxon="NCBITaxon:10090"))
+    assert constructor.escalated
+    constructor.build(Gene, dict(id="MGI:4", in_taxon=["NCBITaxon:10090"]))
+    assert constructor.validated == 3
+
+
+def test_difference_from_validated_copy_escalates():
+    constructor = Constructor(sample=3)
+    # Validation turns the tuple into a list, which the trusted copy keeps as it is
+    gene = constructor.build(Gene, dict(id="MGI:1", in_taxon=("NCBITaxon:10090",)))
+    assert gene.in_taxon == ["NCBITaxon:10090"]
+    constructor.build(Gene, dict(id="MGI:2", in_taxon=("NCBITaxon:10090",)))
+    assert constructor.escalated is None
+    gene = constructor.build(Gene, dict(id="MGI:3", in_taxon=("NCBITaxon:10090",)))
+    assert constructor.escalated
+    assert gene.in_taxon == ["NCBITaxon:10090"]
+
+
+def test_sampled_run_writes_the_same_edges(tmp_path):
+    rows = [
+        {
+            "geneId": f"MGI:{i}",
+            "whereExpressed": {"anatomicalStructureTermId": "EMAPA:16039"},
+            "whenExpressed": {"stageTermId": "MmusDv:0000003"} if i % 2 else {},
+            "evidence": {"publicationId": f"PMID:{i}"},
+            "assay": "MMO:0000655",
+        }
+        for i in range(40)
+    ]
+    data_file = tmp_path / "EXPRESSION_MGI.json.gz"
+    with gzip.open(data_file, "wt") as fh:
+        json.dump({"data": rows}, fh)
+    config = yaml.safe_load((SRC / "expression.yaml").read_text())
+    config["reader"]["files"] = [data_file.name]
+    config["transform"]["code"] = str(SRC / "expression.py")
+    config_file = tmp_path / "expression.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    run_transform(str(config_file), str(tmp_path / "validated"), TransformOptions())
+    run_transform(str(config_file), str(tmp_path / "sampled"), TransformOptions(validate_sample=7))
+
+    for output in (tmp_path / "validated").iterdir():
+        assert (tmp_path / "sampled" / output.name).read_bytes() == output.read_bytes()
@@ -0,0 +1,129 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.alliance_ingest.download import DownloadTask, download, download_all
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class FMSHandler(BaseHTTPRequestHandler):
+    """Serves server.files like fms.alliancegenome.org: ETag, Last-Modified and Range support."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if self.path not in server.files:
+            self.send_error(404)
+            return
+        body, etag = server.files[self.path]
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") in (etag, LAST_MODIFIED):
+            start = int(range_header[len("bytes=") :].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+
+        payload = body[start:]
+        if server.drop_after is not None:
+            # Close the connection part-way through, once
+            payload, server.drop_after = payload[: server.drop_after], None
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FMSHandler)
+    httpd.files = {}
+    httpd.requests = []
+    httpd.drop_after = None
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+
+
+def ranges_requested(server):
+    return [headers.get("Range") for _, headers in server.requests]
+
+
+def test_download_and_unchanged(server, tmp_path):
+    server.files["/download/BGI_MGI.json.gz"] = (b"x" * 5000, '"v1"')
+    task = DownloadTask(f"{server.url}/download/BGI_MGI.json.gz", tmp_path / "data" / "BGI_MGI.json.gz")
+
+    result = download(task)
+    assert result.status == "downloaded"
+    assert task.path.read_bytes() == b"x" * 5000
+    assert not task.part_path.exists()
+
+    result = download(task)
+    assert result.status == "unchanged"
+    assert result.transferred == 0
+    assert server.requests[-1][1]["If-None-Match"] == '"v1"'
+
+
+def test_changed_file_is_transferred_again(server, tmp_path):
+    server.files["/download/BGI_MGI.json.gz"] = (b"old", '"v1"')
+    task = DownloadTask(f"{server.url}/download/BGI_MGI.json.gz", tmp_path / "BGI_MGI.json.gz")
+    download(task)
+    server.files["/download/BGI_MGI.json.gz"] = (b"new release", '"v2"')
+    assert download(task).status == "downloaded"
+    assert task.path.read_bytes() == b"new release"
+
+
+def test_interrupted_transfer_resumes_with_range(server, tmp_path):
+    body = bytes(range(256)) * 400
+    server.files["/download/VARIANT-ALLELE_NCBITaxon10090.tsv.gz"] = (body, '"v1"')
+    server.drop_after = 30000
+    task = DownloadTask(
+        f"{server.url}/download/VARIANT-ALLELE_NCBITaxon10090.tsv.gz", tmp_path / "VARIANT-ALLELE.tsv.gz"
+    )
+
+    result = download(task, backoff=0)
+    assert result.status == "resumed"
+    assert task.path.read_bytes() == body
+    assert result.transferred == len(body) - 30000
+    assert ranges_requested(server) == [None, "bytes=30000-"]
+
+
+def test_part_of_changed_file_is_discarded(server, tmp_path):
+    task = DownloadTask(f"{server.url}/download/EXPRESSION_MGI.json.gz", tmp_path / "EXPRESSION_MGI.json.gz")
+    server.files["/download/EXPRESSION_MGI.json.gz"] = (b"a" * 1000, '"v1"')
+    server.drop_after = 400
+    download(task, retries=0)
+    assert task.part_path.stat().st_size == 400
+
+    server.files["/download/EXPRESSION_MGI.json.gz"] = (b"b" * 1200, '"v2"')
+    result = download(task)
+    assert result.status == "downloaded"
+    assert task.path.read_bytes() == b"b" * 1200
+
+
+def test_download_all_reports_each_file(server, tmp_path):
+    for name in ["PHENOTYPE_RGD", "PHENOTYPE_MGI", "PHENOTYPE_WB"]:
+        server.files[f"/download/{name}.json.gz"] = (name.encode(), f'"{name}"')
+    tasks = [
+        DownloadTask(f"{server.url}/download/{name}.json.gz", tmp_path / f"{name}.json.gz")
+        for name in ["PHENOTYPE_RGD", "PHENOTYPE_MGI", "PHENOTYPE_WB", "MISSING"]
+    ]
+    results = download_all(tasks, connections=3, retries=0)
+    assert [result.status for result in results] == ["downloaded", "downloaded", "downloaded", "failed"]
+    assert results[3].error == "HTTP 404 Not Found"
+    assert (tmp_path / "PHENOTYPE_WB.json.gz").read_bytes() == b"PHENOTYPE_WB"
@@ -0,0 +1,55 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from src.alliance_ingest import entity_lookup
+from src.alliance_ingest.entity_lookup import allele_ids, build_lookup_tables
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    with gzip.open(tmp_path / "BGI_MGI.json.gz", "wt") as fh:
+        genes = [{"basicGeneticEntity": {"primaryId": gene_id}} for gene_id in ["MGI:2", "MGI:1", "MGI:2"]]
+        json.dump({"metaData": {}, "data": genes}, fh)
+    with gzip.open(tmp_path / "AGM_ZFIN.json.gz", "wt") as fh:
+        json.dump({"data": [{"primaryID": "ZFIN:ZDB-FISH-1"}]}, fh)
+    for taxon, alleles in [("10090", ["MGI:5", "MGI:4"]), ("10116", ["RGD:9", "MGI:5"])]:
+        with gzip.open(tmp_path / f"VARIANT-ALLELE_NCBITaxon{taxon}.tsv.gz", "wt") as fh:
+            fh.write("# comment\n")
+            fh.write("Taxon\tSpeciesName\tAlleleId\tAlleleSymbol\n")
+            for allele in alleles:
+                fh.write(f"NCBITaxon:{taxon}\tspecies\t{allele}\tsymbol\n")
+    return tmp_path
+
+
+def test_build_lookup_tables(data_dir):
+    counts = build_lookup_tables(data_dir, max_workers=2)
+    assert counts == {
+        data_dir / "alliance_gene.tsv": 2,
+        data_dir / "alliance_allele.tsv": 3,
+        data_dir / "alliance_genotype.tsv": 1,
+    }
+    assert (data_dir / "alliance_gene.tsv").read_text() == "MGI:1\tbiolink:Gene\nMGI:2\tbiolink:Gene\n"
+    assert (data_dir / "alliance_allele.tsv").read_text().splitlines() == [
+        "MGI:4\tbiolink:SequenceVariant",
+        "MGI:5\tbiolink:SequenceVariant",
+        "RGD:9\tbiolink:SequenceVariant",
+    ]
+    assert (data_dir / "alliance_genotype.tsv").read_text() == "ZFIN:ZDB-FISH-1\tbiolink:Genotype\n"
+
+
+def test_uncompressed_sources(tmp_path):
+    (tmp_path / "AGM_MGI.json").write_text(json.dumps({"data": [{"primaryID": "MGI:3"}]}))
+    build_lookup_tables(tmp_path, max_workers=1)
+    assert (tmp_path / "alliance_genotype.tsv").read_text() == "MGI:3\tbiolink:Genotype\n"
+    assert (tmp_path / "alliance_gene.tsv").read_text() == ""
+
+
+def test_allele_ids_across_blocks(monkeypatch):
+    monkeypatch.setattr(entity_lookup, "BLOCK_SIZE", 7)
+    text = "# comment\r\nTaxon\tSpeciesName\tAlleleId\r\n" + "".join(f"t\ts\tMGI:{i}\r\n" for i in range(20))
+    assert list(allele_ids(io.BytesIO(text.encode()))) == [f"MGI:{i}".encode() for i in range(20)]
+    # The last line needs no newline
+    assert list(allele_ids(io.BytesIO(b"t\ts\tMGI:1\tx\nt\ts\tMGI:2"))) == [b"MGI:1", b"MGI:2"]
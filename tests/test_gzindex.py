@@ -0,0 +1,64 @@
+import gzip
+import os
+import random
+
+import pytest
+
+from src.alliance_ingest import gzindex
+from src.alliance_ingest.gzindex import (
+    build_gzip_index,
+    build_gzip_indexes,
+    gzip_index_is_current,
+    gzip_index_path,
+    read_lines,
+    split_offsets,
+)
+
+
+@pytest.fixture
+def gzip_file(tmp_path):
+    rng = random.Random(7)
+    lines = [f"{i}\t{rng.random()}\t{'ACGT'[rng.randrange(4)] * rng.randrange(600)}\n" for i in range(20000)]
+    # A line longer than the span between seek points, and no newline at the end
+    lines[5000] = "".join(rng.choice("ACGT") for _ in range(100_000)) + "\n"
+    lines[-1] = lines[-1].rstrip("\n")
+    path = tmp_path / "VARIANT-ALLELE_NCBITaxon10090.tsv.gz"
+    with gzip.open(path, "wt") as fh:
+        fh.writelines(lines)
+    return path, lines
+
+
+def test_ranges_read_every_line_once(gzip_file):
+    path, lines = gzip_file
+    index = build_gzip_index(path, span=1 << 14)
+    assert len(index.points) > 10
+    assert index.length == len("".join(lines).encode())
+
+    for parts in [1, 2, 5, 64]:
+        ranges = split_offsets(index, parts)
+        assert len(ranges) <= parts and ranges[-1][1] is None
+        assert [line for start, end in ranges for line in read_lines(path, index, start, end)] == lines
+
+
+def test_only_large_files_without_a_current_index_are_indexed(gzip_file, tmp_path, monkeypatch):
+    path, _ = gzip_file
+    small = tmp_path / "small.tsv.gz"
+    with gzip.open(small, "wt") as fh:
+        fh.write("a\tb\n")
+    monkeypatch.setattr(gzindex, "MIN_INDEXED_SIZE", 1 << 10)
+    assert not gzip_index_is_current(path)
+
+    assert list(build_gzip_indexes([path, small], max_workers=2)) == [path]
+    assert gzip_index_is_current(path)
+    assert build_gzip_indexes([path]) == {}
+
+    stat = gzip_index_path(path).stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not gzip_index_is_current(path)
+
+
+def test_multi_member_files_are_not_indexed(tmp_path):
+    path = tmp_path / "members.gz"
+    path.write_bytes(gzip.compress(b"a\n") + gzip.compress(b"b\n"))
+    with pytest.raises(ValueError, match="more than one gzip member"):
+        build_gzip_index(path)
@@ -0,0 +1,55 @@
+import re
+
+from src.alliance_ingest.disease import transform_record
+from src.alliance_ingest.ids import association_id
+
+UUID_SHAPE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+def test_id_is_stable_and_uuid_shaped():
+    edge_id = association_id("MGI:1", "biolink:model_of", "DOID:1", ["ECO:1"], ["PMID:1"], "infores:mgi")
+    assert edge_id == association_id("MGI:1", "biolink:model_of", "DOID:1", ["ECO:1"], ["PMID:1"], "infores:mgi")
+    assert UUID_SHAPE.match(edge_id)
+
+
+def test_each_defining_field_changes_the_id():
+    fields = dict(
+        subject="MGI:1",
+        predicate="biolink:model_of",
+        object="DOID:1",
+        qualifiers=["ECO:1"],
+        publications=["PMID:1"],
+        source="infores:mgi",
+    )
+    base = association_id(**fields)
+    for name, value in [
+        ("subject", "MGI:2"),
+        ("predicate", "biolink:related_to"),
+        ("object", "DOID:2"),
+        ("qualifiers", ["ECO:2"]),
+        ("publications", ["PMID:2"]),
+        ("source", "infores:rgd"),
+    ]:
+        assert association_id(**{**fields, name: value}) != base, name
+
+
+def test_field_boundaries_and_list_order():
+    assert association_id("MGI:1", "p", "o", ["a", "b"]) == association_id("MGI:1", "p", "o", ["b", "a"])
+    assert association_id("MGI:1", "p", "o", ["a"], ["b"]) != association_id("MGI:1", "p", "o", ["a", "b"])
+    assert association_id("MGI:1", "p", "o", [None, "a"]) == association_id("MGI:1", "p", "o", ["a"])
+
+
+def test_transform_ids_repeat_between_runs():
+    row = {
+        'DBobjectType': 'affected_genomic_model',
+        'DBObjectID': 'MGI:3799157',
+        'AssociationType': 'is_model_of',
+        'DOID': 'DOID:0060041',
+        'ExperimentalCondition': '',
+        'Modifier': '',
+        'EvidenceCode': 'ECO:0000033',
+        'Reference': 'PMID:29885454',
+    }
+    [first] = transform_record(None, row)
+    [second] = transform_record(None, row)
+    assert first.id == second.id
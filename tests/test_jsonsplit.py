@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+import random
+
+import pytest
+
+from src.alliance_ingest import jsonsplit
+from src.alliance_ingest.gzindex import build_gzip_index
+from src.alliance_ingest.jsonsplit import (
+    build_record_index,
+    build_record_indexes,
+    read_records,
+    record_index_is_current,
+    record_index_path,
+    split_records,
+)
+
+
+@pytest.fixture
+def document():
+    rng = random.Random(11)
+    records = [
+        {
+            "geneId": f"MGI:{i}",
+            # Brackets and quotes in strings, and characters of two to four bytes in UTF-8
+            "note": rng.choice(['a "quoted" ]}, {', "é[ü", "漢字 {", "🧬\\]"]) * rng.randrange(40),
+            "stages": [{"stageName": "adult", "order": j} for j in range(rng.randrange(4))],
+        }
+        for i in range(3000)
+    ]
+    return {"metaData": {"release": "test", "note": "]}[{"}, "data": records}
+
+
+@pytest.mark.parametrize("name", ["EXPRESSION_MGI.json.gz", "EXPRESSION_MGI.json"])
+def test_ranges_read_every_record_once(tmp_path, document, name):
+    path = tmp_path / name
+    with gzip.open(path, "wt") if name.endswith(".gz") else open(path, "w") as fh:
+        json.dump(document, fh, ensure_ascii=False, indent=1)
+    if name.endswith(".gz"):
+        build_gzip_index(path, span=1 << 14)
+    index = build_record_index(path, ["data"], span=1 << 14)
+    assert len(index.starts) > 10
+
+    for parts in [1, 2, 5, 64]:
+        ranges = split_records(index, parts)
+        assert len(ranges) <= parts and ranges[0][0] == index.starts[0] and ranges[-1][1] is None
+        assert [record for start, end in ranges for record in read_records(path, index, start, end)] == document["data"]
+
+
+def test_only_large_files_without_a_current_index_are_indexed(tmp_path, document, monkeypatch):
+    path = tmp_path / "PHENOTYPE_MGI.json"
+    path.write_text(json.dumps(document))
+    small = tmp_path / "PHENOTYPE_RGD.json"
+    small.write_text('{"data": []}')
+    monkeypatch.setattr(jsonsplit, "MIN_INDEXED_SIZE", 1 << 10)
+    assert not record_index_is_current(path, ["data"])
+
+    assert build_record_indexes({path: ["data"], small: ["data"]}, max_workers=2) == {path: 1}
+    assert record_index_is_current(path, ["data"])
+    assert not record_index_is_current(path, ["metaData"])
+    assert build_record_indexes({path: ["data"]}) == {}
+
+    stat = record_index_path(path).stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not record_index_is_current(path, ["data"])
+
+
+def test_truncated_file_is_not_indexed(tmp_path, document):
+    path = tmp_path / "EXPRESSION_FB.json"
+    path.write_text(json.dumps(document)[:5000])
+    with pytest.raises(ValueError, match="can't be indexed"):
+        build_record_index(path, ["data"])
@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+
+from src.alliance_ingest.jsonstream import find_element_starts, iter_json_array, iter_json_elements
+
+
+@pytest.fixture
+def document():
+    return {
+        "metaData": {"dataProvider": {"type": "curated"}, "release": "8.0.0"},
+        "data": [{"primaryID": f"MGI:{i}", "name": "x" * (i % 7), "score": i * 1.5} for i in range(200)],
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_yields_data_elements(document, chunk_size):
+    fh = io.StringIO(json.dumps(document, indent=2))
+    assert list(iter_json_array(fh, ["data"], chunk_size=chunk_size)) == document["data"]
+
+
+def test_data_before_metadata(document):
+    text = json.dumps({"data": document["data"], "metaData": document["metaData"]})
+    assert list(iter_json_array(io.StringIO(text), ["data"], chunk_size=5)) == document["data"]
+
+
+def test_numbers_split_across_chunks():
+    text = json.dumps({"data": [123456789, 0.125, True, None]})
+    assert list(iter_json_array(io.StringIO(text), ["data"], chunk_size=3)) == [123456789, 0.125, True, None]
+
+
+def test_empty_array():
+    assert list(iter_json_array(io.StringIO('{"data": []}'), ["data"])) == []
+
+
+def test_non_array_value_is_single_element():
+    assert list(iter_json_array(io.StringIO('{"data": {"a": 1}}'), ["data"])) == [{"a": 1}]
+
+
+def test_missing_key():
+    with pytest.raises(KeyError):
+        list(iter_json_array(io.StringIO('{"metaData": {}}'), ["data"]))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_element_starts_and_slices(chunk_size):
+    elements = [{"a": 'q"]}', "b": "\\"}, {"c": ["{", "\\\\"]}, 3, {"d": "[" * 50}, {"e": []}]
+    text = json.dumps({"metaData": {"x": "]}[{"}, "data": elements})
+
+    starts, end = find_element_starts(io.StringIO(text), ["data"], chunk_size=chunk_size)
+    slices = [text[start:stop].rstrip(", ") for start, stop in zip(starts, starts[1:] + [end])]
+    assert [json.loads(element) for element in slices] == elements
+    assert text[end] == "]"
+    # Only starts at least span apart are kept
+    spaced, _ = find_element_starts(io.StringIO(text), ["data"], span=40, chunk_size=chunk_size)
+    assert spaced[0] == starts[0] and all(b - a >= 40 for a, b in zip(spaced, spaced[1:]))
+
+    slices = zip(spaced, spaced[1:] + [end])
+    read = [e for start, stop in slices for e in iter_json_elements(io.StringIO(text[start:stop]), chunk_size)]
+    assert read == elements
+
+
+def test_element_starts_of_empty_and_non_array_values():
+    assert find_element_starts(io.StringIO('{"data": []}'), ["data"]) == ([], 10)
+    assert find_element_starts(io.StringIO('{"data": {"a": 1}}'), ["data"])[0] == []
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+
+import pytest
+import yaml
+
+from src.alliance_ingest.manifest import Manifest, transform_inputs, transform_outputs
+
+SRC = Path(__file__).parent.parent / "src" / "alliance_ingest"
+
+OPTIONS = {"output_format": "tsv", "limit": None}
+
+
+@pytest.fixture
+def config(tmp_path):
+    (tmp_path / "PHENOTYPE_MGI.json").write_text('{"data": []}')
+    (tmp_path / "PHENOTYPE_RGD.json").write_text('{"data": []}')
+    (tmp_path / "lookup.tsv").write_text("MGI:1\tbiolink:Gene\n")
+    (tmp_path / "lookup.yaml").write_text(yaml.safe_dump({"name": "lookup", "reader": {"files": ["lookup.tsv"]}}))
+    (tmp_path / "phenotype.py").write_text("from alliance_ingest.ids import association_id\n")
+    (tmp_path / "ids.py").write_text("")
+    config = {
+        "name": "alliance_phenotype",
+        "reader": {"files": ["PHENOTYPE_MGI.json", "PHENOTYPE_RGD.json"]},
+        "transform": {"mappings": ["lookup.yaml"]},
+    }
+    path = tmp_path / "phenotype.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return path
+
+
+def test_inputs_of_real_config():
+    inputs = {path.name for path in transform_inputs(SRC / "phenotype.yaml")}
+    assert {"phenotype.yaml", "phenotype.py", "ids.py", "alliance_entity_lookup.yaml", "alliance_gene.tsv"} <= inputs
+    assert "PHENOTYPE_MGI.json.gz" in inputs
+
+
+def test_inputs_cover_config_code_mappings_and_data(config):
+    assert [path.name for path in transform_inputs(config)] == [
+        "phenotype.yaml",
+        "PHENOTYPE_MGI.json",
+        "PHENOTYPE_RGD.json",
+        "phenotype.py",
+        "ids.py",
+        "lookup.yaml",
+        "lookup.tsv",
+    ]
+
+
+def test_unchanged_transform_is_current(config, tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    (output_dir / "alliance_phenotype_edges.tsv").write_text("id\n")
+    manifest = Manifest.load(output_dir)
+    manifest.record("phenotype", manifest.fingerprint(config, OPTIONS), transform_outputs(config, output_dir))
+    manifest.save()
+
+    reloaded = Manifest.load(output_dir)
+    assert reloaded.is_current("phenotype", reloaded.fingerprint(config, OPTIONS), output_dir)
+    assert not reloaded.is_current("phenotype", reloaded.fingerprint(config, {**OPTIONS, "limit": 10}), output_dir)
+    assert set(reloaded.transforms["phenotype"]["outputs"]) == {"alliance_phenotype_edges.tsv"}
+
+    (tmp_path / "lookup.tsv").write_text("MGI:2\tbiolink:Gene\n")
+    assert not reloaded.is_current("phenotype", reloaded.fingerprint(config, OPTIONS), output_dir)
+
+
+def test_missing_output_is_not_current(config, tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    edges = output_dir / "alliance_phenotype_edges.tsv"
+    edges.write_text("id\n")
+    manifest = Manifest.load(output_dir)
+    fingerprint = manifest.fingerprint(config, OPTIONS)
+    manifest.record("phenotype", fingerprint, [edges])
+    edges.unlink()
+    assert not manifest.is_current("phenotype", fingerprint, output_dir)
+
+
+def test_digest_reused_while_size_and_mtime_match(config, tmp_path):
+    manifest = Manifest.load(tmp_path / "output")
+    manifest.record("phenotype", manifest.fingerprint(config, OPTIONS), [])
+    data = tmp_path / "PHENOTYPE_MGI.json"
+    stat = data.stat()
+    data.write_text('{"data": {}}')
+    os.utime(data, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    # Same size and mtime: the recorded digest is trusted without reading the file
+    assert data.stat().st_size == stat.st_size
+    before = manifest.transforms["phenotype"]["inputs"][str(data.resolve())]["blake2b"]
+    assert manifest.file_record(data.resolve())["blake2b"] == before
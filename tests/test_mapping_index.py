@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+from pathlib import Path
+
+import pytest
+import yaml
+from koza import KozaTransform
+from koza.io.writer.passthrough_writer import PassthroughWriter
+from koza.runner import KozaRunner
+
+from src.alliance_ingest.mapping_index import MappingIndex, build_mapping_index, index_is_current
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.worker import run_transform
+
+SRC = Path(__file__).parent.parent / "src" / "alliance_ingest"
+
+TABLES = {
+    "alliance_gene.tsv": ["MGI:95", "RGD:2004", "ZFIN:ZDB-GENE-990415-8"],
+    "alliance_genotype.tsv": ["MGI:3799157", "ZFIN:ZDB-FISH-150901-1"],
+    # Also listed as a gene: the allele table comes last, so its category wins as in koza
+    "alliance_allele.tsv": ["MGI:1856339", "WB:WBVar00000001", "MGI:95"],
+}
+CATEGORIES = {
+    "alliance_gene.tsv": "biolink:Gene",
+    "alliance_genotype.tsv": "biolink:Genotype",
+    "alliance_allele.tsv": "biolink:SequenceVariant",
+}
+
+
+@pytest.fixture
+def lookup_config(tmp_path):
+    config = yaml.safe_load((SRC / "alliance_entity_lookup.yaml").read_text())
+    for filename, ids in TABLES.items():
+        (tmp_path / filename).write_text("".join(f"{entity_id}\t{CATEGORIES[filename]}\n" for entity_id in ids))
+    config["reader"]["files"] = list(TABLES)
+    config["transform"]["index"] = "alliance_entity_lookup.idx"
+    path = tmp_path / "alliance_entity_lookup.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return path
+
+
+def koza_mappings(tmp_path, lookup_config):
+    runner = KozaRunner(
+        data=[], writer=PassthroughWriter(), hooks={}, base_directory=tmp_path, mapping_filenames=[lookup_config.name]
+    )
+    return runner.load_mappings()["alliance-entity-lookup"]
+
+
+def test_index_has_the_entries_koza_loads(lookup_config, tmp_path):
+    assert build_mapping_index(lookup_config) == 7
+    index = MappingIndex(tmp_path / "alliance_entity_lookup.idx")
+    expected = koza_mappings(tmp_path, lookup_config)
+    assert dict(index.items()) == expected
+    assert index["MGI:95"] == {"category": "biolink:SequenceVariant"}
+    assert index.get("MGI:0") is None
+    assert "HGNC:1" not in index
+    assert index.get("A-VERY-LONG-IDENTIFIER-BEYOND-THE-KEY-WIDTH") is None
+
+
+def test_lookup_through_koza_transform(lookup_config, tmp_path):
+    build_mapping_index(lookup_config)
+    index = MappingIndex(tmp_path / "alliance_entity_lookup.idx")
+    mappings = {"alliance-entity-lookup": index}
+    koza_transform = KozaTransform(mappings=mappings, writer=PassthroughWriter(), extra_fields={})
+    assert koza_transform.lookup("ZFIN:ZDB-FISH-150901-1", "category") == "biolink:Genotype"
+    # A missing ID comes back as itself, as with koza's own mappings
+    assert koza_transform.lookup("MGI:0", "category") == "MGI:0"
+
+
+def test_index_is_stale_after_its_tables_change(lookup_config, tmp_path):
+    assert not index_is_current(lookup_config)
+    build_mapping_index(lookup_config)
+    assert index_is_current(lookup_config)
+    table = tmp_path / "alliance_gene.tsv"
+    index_mtime = (tmp_path / "alliance_entity_lookup.idx").stat().st_mtime_ns
+    os.utime(table, ns=(index_mtime + 1, index_mtime + 1))
+    assert not index_is_current(lookup_config)
+
+
+def test_transform_output_same_with_and_without_index(lookup_config, tmp_path):
+    rows = [
+        {
+            "objectId": entity_id,
+            "phenotypeTermIdentifiers": [{"termId": "MP:0001262"}],
+            "evidence": {"publicationId": "PMID:1"},
+        }
+        for entity_id in ["MGI:95", "MGI:3799157", "RGD:2004", "MGI:0"]
+    ]
+    data_file = tmp_path / "PHENOTYPE_MGI.json.gz"
+    with gzip.open(data_file, "wt") as fh:
+        json.dump({"data": rows}, fh)
+    config = yaml.safe_load((SRC / "phenotype.yaml").read_text())
+    config["reader"]["files"] = [data_file.name]
+    config["transform"]["code"] = str(SRC / "phenotype.py")
+    config_file = tmp_path / "phenotype.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    run_transform(str(config_file), str(tmp_path / "loaded"), TransformOptions())
+    build_mapping_index(lookup_config)
+    run_transform(str(config_file), str(tmp_path / "indexed"), TransformOptions())
+
+    edges = "alliance_phenotype_edges.tsv"
+    indexed = (tmp_path / "indexed" / edges).read_text()
+    assert indexed == (tmp_path / "loaded" / edges).read_text()
+    assert len(indexed.splitlines()) == 4
@@ -0,0 +1,66 @@
+import json
+import sys
+from types import SimpleNamespace
+
+from src.alliance_ingest.metrics import JobMetrics, append_metrics, job_metrics, write_prometheus
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.runner import count_rows
+from src.alliance_ingest.scheduler import JobResult
+from src.alliance_ingest.usage import run_measured
+from src.alliance_ingest.worker import USAGE_STATS, run_transform
+
+
+def test_transform_metrics(disease_config, tmp_path):
+    stats = run_transform(str(disease_config), str(tmp_path), TransformOptions())
+    result = JobResult(name="disease", returncode=0, elapsed=stats["elapsed"], **{k: stats[k] for k in USAGE_STATS})
+
+    record = job_metrics(result, "transform", disease_config, tmp_path)
+    assert (record.status, record.rows_read, record.rows_skipped) == ("ok", 10, 0)
+    assert (record.nodes_written, record.edges_written) == (None, 10)
+    assert record.cpu_seconds > 0 and record.peak_rss_bytes > 0 and record.rows_per_second > 0
+
+    path = append_metrics([record, record], tmp_path)
+    assert [json.loads(line)["edges_written"] for line in path.read_text().splitlines()] == [10, 10]
+
+    skipped = job_metrics(
+        JobResult(name="disease", returncode=0, elapsed=0.0, skipped=True), "transform", disease_config, tmp_path
+    )
+    assert (skipped.status, skipped.nodes_written, skipped.edges_written) == ("skipped", None, None)
+
+
+def test_rows_without_entities_are_skipped():
+    written = []
+    runner = SimpleNamespace(data={None: iter(range(6))}, writer=SimpleNamespace(write=written.append))
+    counts = count_rows(runner)
+    # As koza's serial transform loop: None is not written, an empty list is
+    for row in runner.data[None]:
+        result = None if row == 0 else [] if row % 2 else [row]
+        if result is not None:
+            runner.writer.write(result)
+
+    assert (counts.read, counts.transformed, counts.skipped) == (6, 2, 4)
+    assert written == [[], [2], [], [4], []]
+
+
+def test_subprocess_usage():
+    returncode, usage = run_measured([sys.executable, "-c", "b = bytearray(64 << 20); sum(range(10**6))"])
+    assert returncode == 0
+    assert usage.peak_rss >= 64 << 20
+    assert usage.cpu_seconds > 0
+
+
+def test_prometheus_textfile_has_the_latest_run_of_each_job(tmp_path):
+    def record(name, status, wall_seconds, finished="2024-06-01T00:00:00+00:00"):
+        return JobMetrics(name=name, kind="transform", status=status, finished=finished, wall_seconds=wall_seconds)
+
+    path = tmp_path / "textfile" / "ingest.prom"
+    write_prometheus([record("gene", "ok", 5.0), record("gene", "failed", 7.5), record("disease", "ok", 1.0)], path)
+
+    lines = path.read_text().splitlines()
+    assert 'alliance_ingest_job_wall_seconds{kind="transform",name="gene"} 7.5' in lines
+    assert 'alliance_ingest_job_success{kind="transform",name="gene"} 0' in lines
+    assert 'alliance_ingest_job_success{kind="transform",name="disease"} 1' in lines
+    assert 'alliance_ingest_job_last_run_timestamp_seconds{kind="transform",name="disease"} 1717200000.0' in lines
+    assert "# TYPE alliance_ingest_job_wall_seconds gauge" in lines
+    # Unmeasured values are left out rather than written as zero
+    assert not any(line.startswith("alliance_ingest_job_rows_read") for line in lines)
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.pipeline import QueueStats, ThreadedWriter, threaded_rows
+from src.alliance_ingest.worker import run_transform
+
+
+def test_pipelined_transform_writes_the_same_output(disease_config, tmp_path):
+    serial = tmp_path / "serial"
+    pipelined = tmp_path / "pipelined"
+    run_transform(str(disease_config), str(serial), TransformOptions())
+    stats = run_transform(str(disease_config), str(pipelined), TransformOptions(pipeline=True, queue_size=2))
+
+    for path in serial.iterdir():
+        assert (pipelined / path.name).read_bytes() == path.read_bytes()
+    assert stats["rows_read"] == 10
+    assert stats["input_wait_seconds"] >= 0 and stats["output_queue_depth"] >= 0
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("pipeline")]
+
+
+def test_threaded_rows_are_read_in_batches_with_backpressure():
+    read = []
+
+    def rows():
+        for i in range(100):
+            read.append(i)
+            yield i
+
+    stats = QueueStats(2)
+    iterator = threaded_rows(rows(), 2, stats, batch_size=5)
+    assert next(iterator) == 0
+    # The reader blocks with the queue full: the batch taken, two queued and one waiting to be put
+    thread = next(thread for thread in threading.enumerate() if thread.name == "pipeline reader")
+    thread.join(0.5)
+    assert len(read) == 20
+    assert list(iterator) == list(range(1, 100))
+    assert stats.batches == 21 and stats.max_depth <= 2
+    assert stats.put_wait > 0
+
+
+def test_closing_threaded_rows_stops_the_reader():
+    iterator = threaded_rows(iter(range(1000)), 1, QueueStats(1), batch_size=1)
+    assert next(iterator) == 0
+    iterator.close()
+    assert not [thread for thread in threading.enumerate() if thread.name == "pipeline reader"]
+
+
+def test_errors_are_raised_on_the_transform_loop():
+    def rows():
+        yield 1
+        raise ValueError("bad row")
+
+    with pytest.raises(ValueError, match="bad row"):
+        list(threaded_rows(rows(), 2, QueueStats(2)))
+
+    class Writer:
+        def write(self, entities):
+            raise OSError("disk full")
+
+        def finalize(self):
+            pass
+
+    writer = Writer()
+    ThreadedWriter(writer, 2, QueueStats(2), batch_size=1)
+    with pytest.raises(OSError, match="disk full"):
+        for _ in range(10):
+            writer.write([object()])
+        writer.finalize()
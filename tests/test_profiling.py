@@ -0,0 +1,28 @@
+import pstats
+
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.profiling import PROFILE_DIR, ProfileMode, profile_transform
+
+
+def test_cpu_profile(disease_config, tmp_path):
+    output_dir = tmp_path / "output"
+    written, _ = profile_transform(disease_config, output_dir, ProfileMode.cpu, TransformOptions(limit=4))
+
+    assert [path.name for path in written] == ["disease.prof", "disease.collapsed"]
+    stats = pstats.Stats(str(written[0]))
+    assert any(function == "transform_record" for _, _, function in stats.stats)
+    for line in written[1].read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("run_transform (alliance_ingest/worker.py") and int(count) > 0
+    # The profiled run's outputs are discarded
+    assert all(path.parent.name == PROFILE_DIR for path in output_dir.rglob("*") if path.is_file())
+
+
+def test_memory_profile(disease_config, tmp_path):
+    written, _ = profile_transform(disease_config, tmp_path / "output", ProfileMode.memory, TransformOptions())
+
+    report = written[0].read_text()
+    assert written[0].name == "disease.memory.txt"
+    assert report.startswith("Peak traced memory")
+    assert "By area:" in report
+    assert "Top allocation sites, reader:" in report
@@ -0,0 +1,106 @@
+import gzip
+
+import pytest
+
+from src.alliance_ingest.compression import open_output
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.rdf import cut_chunks, export_rdf, plan_chunks
+from src.alliance_ingest.report import OutputFile
+from src.alliance_ingest.worker import run_transform
+
+
+@pytest.fixture(scope="module")
+def kgx_transform():
+    # kgx fetches the biolink model from GitHub when it is imported
+    try:
+        from kgx.cli.cli_utils import transform
+    except OSError as e:
+        pytest.skip(f"kgx cannot load the biolink model: {e}")
+    return transform
+
+
+def single_pass_triples(kgx_transform, output_dir, tmp_path):
+    """The triples of the disease outputs converted in one kgx call, as generate-rdf.py used to."""
+    target = tmp_path / "single.nt.gz"
+    kgx_transform(
+        inputs=[str(path) for path in sorted(output_dir.glob("alliance_disease_*.tsv"))],
+        input_format="tsv",
+        stream=True,
+        output=str(target),
+        output_format="nt",
+        output_compression="gz",
+    )
+    return gzip.decompress(target.read_bytes()).decode()
+
+
+def test_chunks_end_on_line_boundaries(tmp_path):
+    path = tmp_path / "alliance_gene_nodes.tsv"
+    lines = ["id\tcategory\n"] + [f"MGI:{i}\tbiolink:Gene\n" for i in range(100)]
+    path.write_text("".join(lines))
+
+    chunks = plan_chunks(OutputFile("alliance_gene", "nodes", path), chunk_size=100)
+
+    data = path.read_bytes()
+    assert chunks[0].start == len(lines[0])
+    assert chunks[-1].end == len(data)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert chunk.end == following.start
+        assert data[chunk.end - 1 : chunk.end] == b"\n"
+
+
+def test_compressed_file_is_cut_as_it_is_read(tmp_path):
+    path = tmp_path / "alliance_gene_nodes.tsv.zst"
+    lines = ["id\tcategory\n"] + [f"MGI:{i}\tbiolink:Gene\n" for i in range(100)]
+    with open_output(path, "wt") as fh:
+        fh.write("".join(lines))
+
+    chunks = list(cut_chunks(OutputFile("alliance_gene", "nodes", path), tmp_path, chunk_size=100, first_index=3))
+
+    assert len(chunks) > 1
+    assert [chunk.index for chunk in chunks] == list(range(3, 3 + len(chunks)))
+    texts = [chunk.path.read_text() for chunk in chunks]
+    # Every chunk is a TSV file of its own, cut at a line boundary
+    assert all(text.startswith(lines[0]) and text.endswith("\n") for text in texts)
+    assert "".join(text[len(lines[0]) :] for text in texts) == "".join(lines[1:])
+
+
+def test_chunked_export_matches_single_pass(kgx_transform, disease_config, tmp_path):
+    output_dir = tmp_path / "output"
+    run_transform(str(disease_config), str(output_dir), TransformOptions())
+
+    counts = export_rdf(output_dir, max_workers=2, chunk_size=300)
+
+    rdf_file = output_dir / "alliance_disease.nt.gz"
+    assert counts[rdf_file] > 2
+    # The chunks are separate gzip members of one file, in the order of the edges
+    assert gzip.decompress(rdf_file.read_bytes()).decode() == single_pass_triples(kgx_transform, output_dir, tmp_path)
+    assert not any((output_dir / ".staging").iterdir())
+
+
+def test_parquet_export_has_the_same_triples(kgx_transform, disease_config, tmp_path):
+    run_transform(str(disease_config), str(tmp_path / "tsv"), TransformOptions())
+    run_transform(str(disease_config), str(tmp_path / "parquet"), TransformOptions(output_format="parquet"))
+
+    export_rdf(tmp_path / "tsv", max_workers=1)
+    export_rdf(tmp_path / "parquet", max_workers=1)
+
+    triples = [
+        sorted(gzip.decompress((tmp_path / name / "alliance_disease.nt.gz").read_bytes()).decode().splitlines())
+        for name in ["tsv", "parquet"]
+    ]
+    assert triples[0] == triples[1]
+
+
+def test_compressed_export_is_chunked_like_plain(kgx_transform, disease_config, tmp_path):
+    run_transform(str(disease_config), str(tmp_path / "plain"), TransformOptions())
+    run_transform(str(disease_config), str(tmp_path / "gz"), TransformOptions(output_compression="gz"))
+
+    plain_counts = export_rdf(tmp_path / "plain", max_workers=2, chunk_size=300)
+    gz_counts = export_rdf(tmp_path / "gz", max_workers=2, chunk_size=300)
+
+    plain_file, gz_file = tmp_path / "plain" / "alliance_disease.nt.gz", tmp_path / "gz" / "alliance_disease.nt.gz"
+    # The edges are cut into the same chunks whether or not they were read from a compressed file
+    assert gz_counts[gz_file] == plain_counts[plain_file] > 2
+    assert gzip.decompress(gz_file.read_bytes()) == gzip.decompress(plain_file.read_bytes())
+    assert not any((tmp_path / "gz" / ".staging").iterdir())
@@ -0,0 +1,223 @@
+import gzip
+import json
+import random
+from pathlib import Path
+
+import pytest
+import yaml
+from koza import KozaTransform
+from koza.io.writer.passthrough_writer import PassthroughWriter
+from koza.model.reader import CSVReaderConfig, JSONReaderConfig
+from koza.model.source import Source
+
+from src.alliance_ingest.expression import transform_record
+from src.alliance_ingest.gzindex import build_gzip_index, split_offsets
+from src.alliance_ingest.jsonsplit import build_record_index, split_records
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.readers import (
+    ProjectedTSVSource,
+    RangeJSONSource,
+    RangeTSVSource,
+    StreamingJSONSource,
+    build_projection,
+    project,
+)
+from src.alliance_ingest.worker import run_transform
+
+EXPRESSION_CONFIG = Path(__file__).parent.parent / "src" / "alliance_ingest" / "expression.yaml"
+ALLELE_CONFIG = Path(__file__).parent.parent / "src" / "alliance_ingest" / "allele.yaml"
+
+
+@pytest.fixture
+def expression_rows():
+    return [
+        {
+            "assay": "MMO:0000655",
+            "crossReference": {"id": f"ZFIN:ZDB-FIG-080908-{i}", "pages": ["gene/expression/annotation/detail"]},
+            "dateAssigned": "2022-01-21T07:09:02-08:00",
+            "evidence": {
+                "crossReference": {"id": "ZFIN:ZDB-PUB-080616-21", "pages": ["reference"]},
+                "publicationId": "PMID:18544660",
+            },
+            "geneId": f"ZFIN:ZDB-GENE-031222-{i}",
+            "whenExpressed": {"stageName": "Larval:Protruding-mouth", "stageTermId": "ZFS:0000035"},
+            "whereExpressed": {
+                "whereExpressedStatement": "whole organism",
+                "anatomicalStructureTermId": "ZFA:0001094",
+                "anatomicalStructureUberonSlimTermIds": [{"uberonTerm": "Other"}],
+            },
+        }
+        for i in range(5)
+    ]
+
+
+@pytest.fixture
+def expression_file(tmp_path, expression_rows):
+    path = tmp_path / "EXPRESSION_ZFIN.json.gz"
+    with gzip.open(path, "wt") as fh:
+        json.dump({"metaData": {"release": "test"}, "data": expression_rows}, fh)
+    return path
+
+
+@pytest.fixture
+def reader_config(expression_file):
+    return JSONReaderConfig(files=[str(expression_file)], json_path=["data"], required_properties=["assay"])
+
+
+@pytest.fixture
+def projection():
+    return yaml.safe_load(EXPRESSION_CONFIG.read_text())["transform"]["projection"]
+
+
+def test_same_rows_as_koza_source(reader_config, tmp_path):
+    streamed = list(StreamingJSONSource(reader_config, tmp_path))
+    assert streamed == list(Source(reader_config, tmp_path))
+
+
+def test_row_limit(reader_config, tmp_path):
+    assert len(list(StreamingJSONSource(reader_config, tmp_path, row_limit=2))) == 2
+
+
+def test_required_properties(tmp_path):
+    path = tmp_path / "EXPRESSION_RGD.json"
+    path.write_text(json.dumps({"data": [{"geneId": "RGD:1"}]}))
+    config = JSONReaderConfig(files=[str(path)], json_path=["data"], required_properties=["assay"])
+    with pytest.raises(ValueError, match="Missing properties"):
+        list(StreamingJSONSource(config, tmp_path))
+
+
+def test_projection_keeps_only_listed_properties(reader_config, tmp_path, projection):
+    row = next(iter(StreamingJSONSource(reader_config, tmp_path, projection=projection)))
+    assert set(row) == {"geneId", "assay", "crossReference", "evidence", "whenExpressed", "whereExpressed"}
+    assert row["evidence"] == {"publicationId": "PMID:18544660"}
+    assert row["whereExpressed"] == {"anatomicalStructureTermId": "ZFA:0001094"}
+
+
+def test_projection_into_lists():
+    row = {"components": [{"alleleID": "MGI:1", "zygosity": "GENO:1", "extra": 1}], "other": 2}
+    tree = build_projection(["components.alleleID", "components.zygosity"])
+    assert project(row, tree) == {"components": [{"alleleID": "MGI:1", "zygosity": "GENO:1"}]}
+
+
+def test_projected_rows_transform_identically(reader_config, tmp_path, projection):
+    koza_transform = KozaTransform(mappings={}, writer=PassthroughWriter(), extra_fields={})
+    full = list(StreamingJSONSource(reader_config, tmp_path))
+    projected = list(StreamingJSONSource(reader_config, tmp_path, projection=projection))
+    for full_row, projected_row in zip(full, projected):
+        [expected] = transform_record(koza_transform, full_row)
+        [actual] = transform_record(koza_transform, projected_row)
+        assert actual.model_dump(exclude={"id"}) == expected.model_dump(exclude={"id"})
+
+
+@pytest.fixture
+def allele_file(tmp_path):
+    columns = yaml.safe_load(ALLELE_CONFIG.read_text())["reader"]["columns"]
+    path = tmp_path / "VARIANT-ALLELE_NCBITaxon10090.tsv.gz"
+    with gzip.open(path, "wt") as fh:
+        fh.write("#########\n# Alliance variant allele file\n#########\n")
+        fh.write("\t".join(columns) + "\n")
+        for i in range(12):
+            row = {column: f"{column}-{i}" for column in columns}
+            row.update(
+                Taxon="NCBITaxon:10090",
+                SpeciesName="Mus musculus",
+                AlleleId=f"MGI:{5000 + i}",
+                AlleleSymbol=f"Gene<tm{i}>",
+                AlleleSynonyms="syn1, syn2" if i % 2 else "-",
+                AlleleAssociatedGeneId=f"MGI:{100 + i}" if i % 3 else "-",
+                VariantsTypeId="SO:1000008 ",
+                SequenceOfReference="ACGT" * 50000,
+            )
+            if i == 4:
+                # Quoted, holding a delimiter
+                row["VariantSynonyms"] = '"a\tb"'
+            fh.write("\t".join(row[column] for column in columns) + "\n")
+            if i == 6:
+                fh.write("\n# a comment between rows\n")
+    return path
+
+
+@pytest.fixture
+def allele_reader(allele_file):
+    columns = yaml.safe_load(ALLELE_CONFIG.read_text())["reader"]["columns"]
+    return CSVReaderConfig(files=[allele_file.name], columns=columns, delimiter="\t")
+
+
+@pytest.fixture
+def allele_projection():
+    return yaml.safe_load(ALLELE_CONFIG.read_text())["transform"]["projection"]
+
+
+def test_projected_columns_match_koza_source(allele_reader, allele_projection, tmp_path):
+    projected = list(ProjectedTSVSource(allele_reader, tmp_path, projection=allele_projection))
+    expected = [{column: row[column] for column in allele_projection} for row in Source(allele_reader, tmp_path)]
+    assert projected == expected
+    assert len(projected) == 12
+    assert projected[0]["VariantsTypeId"] == "SO:1000008"
+
+
+def test_projected_columns_missing_from_header(allele_reader, tmp_path):
+    with pytest.raises(ValueError, match="NotAColumn"):
+        list(ProjectedTSVSource(allele_reader, tmp_path, projection=["AlleleId", "NotAColumn"]))
+
+
+def test_short_row_is_an_error(tmp_path):
+    path = tmp_path / "short.tsv"
+    path.write_text("a\tb\tc\n1\t2\t3\n1\t2\n")
+    config = CSVReaderConfig(files=[path.name], delimiter="\t")
+    with pytest.raises(ValueError, match="missing 1 column"):
+        list(ProjectedTSVSource(config, tmp_path, projection=["a"]))
+
+
+def test_allele_transform_same_with_projected_reader(allele_file, tmp_path):
+    config = yaml.safe_load(ALLELE_CONFIG.read_text())
+    config["reader"]["files"] = [allele_file.name]
+    config["transform"]["code"] = str(ALLELE_CONFIG.with_suffix(".py"))
+    config["writer"]["min_node_count"] = config["writer"]["min_edge_count"] = 0
+    config_file = tmp_path / "allele.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+
+    run_transform(str(config_file), str(tmp_path / "koza"), TransformOptions())
+    run_transform(str(config_file), str(tmp_path / "projected"), TransformOptions(stream=True))
+    for name in ["alliance_allele_nodes.tsv", "alliance_allele_edges.tsv"]:
+        assert (tmp_path / "projected" / name).read_bytes() == (tmp_path / "koza" / name).read_bytes()
+
+
+def test_ranges_of_an_indexed_file_match_koza_source(tmp_path, allele_projection):
+    columns = yaml.safe_load(ALLELE_CONFIG.read_text())["reader"]["columns"]
+    rng = random.Random(3)
+    path = tmp_path / "VARIANT-ALLELE_NCBITaxon10090.tsv.gz"
+    with gzip.open(path, "wt") as fh:
+        fh.write("#########\n# Alliance variant allele file\n#########\n")
+        fh.write("\t".join(columns) + "\n")
+        for i in range(300):
+            row = {column: f"{column}-{i}" for column in columns}
+            row.update(AlleleId=f"MGI:{5000 + i}", SequenceOfReference="".join(rng.choices("ACGT", k=2000)))
+            fh.write("\t".join(row[column] for column in columns) + "\n")
+    config = CSVReaderConfig(files=[path.name], columns=columns, delimiter="\t")
+    ranges = split_offsets(build_gzip_index(path, span=1 << 14), 4)
+    assert len(ranges) == 4
+
+    expected = list(Source(config, tmp_path))
+    rows = [row for offsets in ranges for row in RangeTSVSource(config, path, offsets)]
+    assert rows == expected
+    projected = [
+        row for offsets in ranges for row in RangeTSVSource(config, path, offsets, projection=allele_projection)
+    ]
+    assert projected == [{column: row[column] for column in allele_projection} for row in expected]
+
+
+def test_ranges_of_an_indexed_json_file_match_koza_source(tmp_path, expression_rows, projection):
+    rows = [dict(expression_rows[0], geneId=f"ZFIN:ZDB-GENE-{i}", note="{[" * (i % 50)) for i in range(400)]
+    path = tmp_path / "EXPRESSION_ZFIN.json.gz"
+    with gzip.open(path, "wt") as fh:
+        json.dump({"metaData": {"release": "test"}, "data": rows}, fh, indent=2)
+    config = JSONReaderConfig(files=[path.name], json_path=["data"], required_properties=["assay"])
+    build_gzip_index(path, span=1 << 14)
+    ranges = split_records(build_record_index(path, ["data"], span=1 << 12), 4)
+    assert len(ranges) == 4
+
+    expected = list(Source(config, tmp_path))
+    assert [row for offsets in ranges for row in RangeJSONSource(config, path, offsets)] == expected
+    projected = [row for offsets in ranges for row in RangeJSONSource(config, path, offsets, projection=projection)]
+    assert projected == list(StreamingJSONSource(config, tmp_path, projection=projection))
@@ -0,0 +1,91 @@
+import shutil
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.alliance_ingest.compression import open_output
+from src.alliance_ingest.report import build_reports, find_outputs, write_reports
+
+EDGE_COLUMNS = ["id", "category", "subject", "predicate", "object"]
+EDGES = [
+    ["uuid:1", "biolink:GeneToPhenotypicFeatureAssociation", "MGI:1", "biolink:has_phenotype", "MP:1"],
+    ["uuid:2", "biolink:GeneToPhenotypicFeatureAssociation", "MGI:2", "biolink:has_phenotype", "MP:2"],
+    ["uuid:3", "biolink:GeneToPhenotypicFeatureAssociation", "ZFIN:1", "biolink:has_phenotype", "ZP:1"],
+    ["uuid:4", "biolink:GenotypeToDiseaseAssociation", "MGI:3", "biolink:model_of", "DOID:1"],
+]
+NODES = [["MGI:1", "biolink:Gene"], ["MGI:2", "biolink:Gene"], ["ZFIN:1", "biolink:Gene|biolink:NamedThing"]]
+
+
+def write_tsv(path, columns, rows):
+    with open_output(path, "wt") as fh:
+        fh.write("\t".join(columns) + "\n")
+        for row in rows:
+            fh.write("\t".join(row) + "\n")
+
+
+def old_report(path, query):
+    """The report as generate-report.py wrote it, with one COPY per file."""
+    report = path.with_name("old_report.tsv")
+    duckdb.sql(f"copy ({query.format(path=path)}) to '{report}' (header, delimiter '\t')")
+    return report.read_text()
+
+
+def test_reports_match_per_file_queries(tmp_path):
+    write_tsv(tmp_path / "alliance_phenotype_edges.tsv", EDGE_COLUMNS, EDGES)
+    write_tsv(tmp_path / "alliance_gene_nodes.tsv", ["id", "category"], NODES)
+    reports = tmp_path / "reports"
+
+    written = write_reports(tmp_path, reports)
+
+    assert sorted(path.name for path in written) == [
+        "alliance_gene_nodes_report.tsv",
+        "alliance_phenotype_edges_report.tsv",
+    ]
+    edges_query = """
+    SELECT category, split_part(subject, ':', 1) as subject_prefix, predicate,
+    split_part(object, ':', 1) as object_prefix, count(*)
+    FROM '{path}' GROUP BY all ORDER BY all
+    """
+    nodes_query = "SELECT category, split_part(id, ':', 1) as prefix, count(*) FROM '{path}' GROUP BY all ORDER BY all"
+    assert (reports / "alliance_phenotype_edges_report.tsv").read_text() == old_report(
+        tmp_path / "alliance_phenotype_edges.tsv", edges_query
+    )
+    assert (reports / "alliance_gene_nodes_report.tsv").read_text() == old_report(
+        tmp_path / "alliance_gene_nodes.tsv", nodes_query
+    )
+
+
+def test_formats_give_the_same_report(tmp_path):
+    for name in ["plain", "gzipped", "zstd", "columnar"]:
+        (tmp_path / name).mkdir()
+    write_tsv(tmp_path / "plain" / "alliance_phenotype_edges.tsv", EDGE_COLUMNS, EDGES)
+    write_tsv(tmp_path / "gzipped" / "alliance_phenotype_edges.tsv.gz", EDGE_COLUMNS, EDGES)
+    write_tsv(tmp_path / "zstd" / "alliance_phenotype_edges.tsv.zst", EDGE_COLUMNS, EDGES)
+    table = pa.table(
+        {column: [row[i] for row in EDGES] for i, column in enumerate(EDGE_COLUMNS) if column != "category"}
+    ).append_column("category", pa.array([[row[1]] for row in EDGES], pa.list_(pa.string())))
+    pq.write_table(table, tmp_path / "columnar" / "alliance_phenotype_edges.parquet")
+
+    reports = [build_reports(find_outputs(tmp_path / name)) for name in ["plain", "gzipped", "zstd", "columnar"]]
+    assert reports[0] == reports[1] == reports[2] == reports[3]
+    assert reports[0][("alliance_phenotype", "edges")][0] == (
+        "biolink:GeneToPhenotypicFeatureAssociation",
+        "MGI",
+        "biolink:has_phenotype",
+        "MP",
+        2,
+    )
+
+
+def test_one_output_per_transform_prefers_parquet(tmp_path):
+    write_tsv(tmp_path / "alliance_phenotype_edges.tsv", EDGE_COLUMNS, EDGES)
+    shutil.copy(tmp_path / "alliance_phenotype_edges.tsv", tmp_path / "alliance_phenotype_edges.jsonl")
+    pq.write_table(pa.table({"subject": ["MGI:1"]}), tmp_path / "alliance_phenotype_edges.parquet")
+    write_tsv(tmp_path / "alliance_phenotype_edges_report.tsv", ["category"], [])
+
+    outputs = find_outputs(tmp_path)
+
+    assert [output.path.name for output in outputs] == ["alliance_phenotype_edges.parquet"]
+    # Columns the file does not have are reported as empty
+    assert build_reports(outputs) == {("alliance_phenotype", "edges"): [(None, "MGI", None, None, 1)]}
@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+
+from src.alliance_ingest.scheduler import Job, run_jobs, staging_path
+
+
+def write_file_cmd(path, fail=False):
+    code = f"open({str(path)!r}, 'w').write('data'); raise SystemExit({1 if fail else 0})"
+    return [sys.executable, "-c", code]
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    return tmp_path / "output"
+
+
+def test_outputs_published_on_success(output_dir):
+    staging = staging_path(str(output_dir), "gene")
+    job = Job(name="gene", cmd=write_file_cmd(staging / "alliance_gene_nodes.tsv"), staging_dir=staging)
+    results = run_jobs([job], output_dir)
+    assert results[0].ok
+    assert (output_dir / "alliance_gene_nodes.tsv").read_text() == "data"
+    assert not staging.exists()
+
+
+def test_outputs_in_another_format_are_replaced(output_dir):
+    output_dir.mkdir()
+    for name in ["alliance_gene_nodes.tsv", "alliance_gene_nodes.jsonl.gz", "alliance_gene_nodes_report.tsv"]:
+        (output_dir / name).write_text("previous")
+    staging = staging_path(str(output_dir), "gene")
+    job = Job(name="gene", cmd=write_file_cmd(staging / "alliance_gene_nodes.parquet"), staging_dir=staging)
+    assert run_jobs([job], output_dir)[0].ok
+    assert sorted(path.name for path in output_dir.iterdir() if path.is_file()) == [
+        "alliance_gene_nodes.parquet",
+        "alliance_gene_nodes_report.tsv",
+    ]
+
+
+def test_outputs_discarded_on_failure(output_dir):
+    output_dir.mkdir()
+    (output_dir / "alliance_gene_nodes.tsv").write_text("previous")
+    staging = staging_path(str(output_dir), "gene")
+    job = Job(name="gene", cmd=write_file_cmd(staging / "alliance_gene_nodes.tsv", fail=True), staging_dir=staging)
+    results = run_jobs([job], output_dir)
+    assert not results[0].ok
+    assert results[0].returncode == 1
+    assert (output_dir / "alliance_gene_nodes.tsv").read_text() == "previous"
+
+
+def test_parallel_results_keep_job_order(output_dir):
+    jobs = []
+    for name, delay in [("expression", 0.3), ("gene", 0.0), ("disease", 0.1)]:
+        staging = staging_path(str(output_dir), name)
+        code = f"import time; time.sleep({delay}); open({str(staging / (name + '_edges.tsv'))!r}, 'w').write('x')"
+        jobs.append(Job(name=name, cmd=[sys.executable, "-c", code], staging_dir=staging))
+    results = run_jobs(jobs, output_dir, max_workers=3)
+    assert [result.name for result in results] == ["expression", "gene", "disease"]
+    assert all(result.ok for result in results)
+    assert all(result.log_file.exists() for result in results)
+    assert sorted(p.name for p in output_dir.glob("*_edges.tsv")) == [
+        "disease_edges.tsv",
+        "expression_edges.tsv",
+        "gene_edges.tsv",
+    ]
@@ -0,0 +1,149 @@
+import gzip
+import json
+import random
+from pathlib import Path
+
+import pytest
+import yaml
+
+from src.alliance_ingest.gzindex import build_gzip_index
+from src.alliance_ingest.jsonsplit import build_record_index
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.shards import check_min_counts, merge_shards, plan_shards
+from src.alliance_ingest.worker import run_transform
+
+DISEASE_CONFIG = Path(__file__).parent.parent / "src" / "alliance_ingest" / "disease.yaml"
+EXPRESSION_CONFIG = Path(__file__).parent.parent / "src" / "alliance_ingest" / "expression.yaml"
+
+
+def test_plan_one_shard_per_file(disease_config, tmp_path):
+    shards = plan_shards(disease_config, tmp_path / "staging")
+    assert [shard.files for shard in shards] == [
+        ["DISEASE-ALLIANCE_MGI.tsv.gz"],
+        ["DISEASE-ALLIANCE_ZFIN.tsv.gz"],
+    ]
+    assert all(shard.size > 0 for shard in shards)
+    [whole] = plan_shards(disease_config, tmp_path / "staging", split=False)
+    assert whole.files is None
+
+
+def test_merged_shards_match_sequential_run(disease_config, tmp_path):
+    sequential = tmp_path / "sequential"
+    run_transform(str(disease_config), str(sequential), TransformOptions())
+
+    shards = plan_shards(disease_config, tmp_path / "staging")
+    for shard in shards:
+        run_transform(str(disease_config), str(shard.output_dir), TransformOptions(), input_files=shard.files)
+    merged = tmp_path / "merged"
+    merged.mkdir()
+    counts = merge_shards([shard.output_dir for shard in shards], merged)
+
+    assert counts == {"alliance_disease_edges.tsv": 10}
+    edges = "alliance_disease_edges.tsv"
+    assert (merged / edges).read_bytes() == (sequential / edges).read_bytes()
+
+    # Compressed as they are merged
+    compressed = tmp_path / "compressed"
+    compressed.mkdir()
+    counts = merge_shards([shard.output_dir for shard in shards], compressed, "gz")
+    assert counts == {"alliance_disease_edges.tsv.gz": 10}
+    assert gzip.decompress((compressed / f"{edges}.gz").read_bytes()) == (sequential / edges).read_bytes()
+
+
+def test_indexed_file_is_split_into_ranges(tmp_path):
+    config = yaml.safe_load(DISEASE_CONFIG.read_text())
+    columns = config["reader"]["columns"]
+    rng = random.Random(5)
+    data_file = tmp_path / "DISEASE-ALLIANCE_COMBINED.tsv.gz"
+    with gzip.open(data_file, "wt") as fh:
+        fh.write("# Alliance disease file\n" + "\t".join(columns) + "\n")
+        for i in range(2000):
+            row = dict.fromkeys(columns, "")
+            row.update(
+                DBobjectType="affected_genomic_model",
+                DBObjectID=f"MGI:{1000 + i}",
+                DBObjectSymbol="".join(rng.choices("ACGTUVWXYZ", k=200)),
+                AssociationType="is_model_of",
+                DOID=f"DOID:{rng.randrange(100000):07}",
+                EvidenceCode="ECO:0000033",
+                Reference=f"PMID:{rng.randrange(10**8)}",
+            )
+            fh.write("\t".join(row[column] for column in columns) + "\n")
+    config["reader"]["files"] = [data_file.name]
+    config["transform"]["code"] = str(DISEASE_CONFIG.with_suffix(".py"))
+    config_file = tmp_path / "disease.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+    sequential = tmp_path / "sequential"
+    run_transform(str(config_file), str(sequential), TransformOptions())
+
+    # Without an index a single file is not split
+    assert len(plan_shards(config_file, tmp_path / "staging", parts=3)) == 1
+    build_gzip_index(data_file, span=1 << 14)
+    shards = plan_shards(config_file, tmp_path / "staging", parts=3)
+    assert len(shards) == 3 and shards[0].offsets[0] == 0
+    assert shards[-1].offsets[1] is None
+
+    for stream in [False, True]:
+        for shard in shards:
+            options = TransformOptions(stream=stream)
+            run_transform(str(config_file), str(shard.output_dir), options, None, shard.files, shard.offsets)
+        merged = tmp_path / f"merged-{stream}"
+        merged.mkdir()
+        merge_shards([shard.output_dir for shard in shards], merged)
+        edges = "alliance_disease_edges.tsv"
+        assert (merged / edges).read_bytes() == (sequential / edges).read_bytes()
+
+
+def test_merge_rejects_mismatched_headers(tmp_path):
+    for index, header in enumerate(["id\tsubject\n", "id\tobject\n"]):
+        (tmp_path / f"shard-{index}").mkdir()
+        (tmp_path / f"shard-{index}" / "alliance_gene_nodes.tsv").write_text(header)
+    with pytest.raises(ValueError, match="different header"):
+        merge_shards([tmp_path / "shard-0", tmp_path / "shard-1"], tmp_path)
+
+
+def test_min_edge_count_checked_on_merged_total(disease_config):
+    check_min_counts(disease_config, {"alliance_disease_edges.tsv": 12000})
+    with pytest.raises(ValueError, match="min_edge_count 12000"):
+        check_min_counts(disease_config, {"alliance_disease_edges.tsv": 11999})
+
+
+def test_indexed_json_file_is_split_into_ranges(tmp_path):
+    config = yaml.safe_load(EXPRESSION_CONFIG.read_text())
+    rng = random.Random(9)
+    records = [
+        {
+            "geneId": f"ZFIN:ZDB-GENE-{i}",
+            "assay": "MMO:0000655",
+            "evidence": {"publicationId": f"PMID:{rng.randrange(10**8)}"},
+            "crossReference": {"id": f"ZFIN:ZDB-FIG-{i}", "pages": ["".join(rng.choices("{}[]ab", k=200))]},
+            "whenExpressed": {"stageName": "adult", "stageTermId": "ZFS:0000044"},
+            "whereExpressed": {"whereExpressedStatement": "brain", "anatomicalStructureTermId": "ZFA:0000008"},
+        }
+        for i in range(2000)
+    ]
+    data_file = tmp_path / "EXPRESSION_ZFIN.json.gz"
+    with gzip.open(data_file, "wt") as fh:
+        json.dump({"metaData": {"release": "test"}, "data": records}, fh)
+    config["reader"]["files"] = [data_file.name]
+    config["transform"]["code"] = str(EXPRESSION_CONFIG.with_suffix(".py"))
+    config_file = tmp_path / "expression.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+    sequential = tmp_path / "sequential"
+    run_transform(str(config_file), str(sequential), TransformOptions())
+
+    # A compressed JSON file needs both its gzip and record indexes to be split
+    build_record_index(data_file, ["data"], span=1 << 14)
+    assert len(plan_shards(config_file, tmp_path / "staging", parts=3)) == 1
+    build_gzip_index(data_file, span=1 << 14)
+    shards = plan_shards(config_file, tmp_path / "staging", parts=3)
+    assert len(shards) == 3 and shards[-1].offsets[1] is None
+
+    for shard in shards:
+        run_transform(str(config_file), str(shard.output_dir), TransformOptions(), None, shard.files, shard.offsets)
+    merged = tmp_path / "merged"
+    merged.mkdir()
+    counts = merge_shards([shard.output_dir for shard in shards], merged)
+    edges = "alliance_gene_to_expression_edges.tsv"
+    assert counts[edges] == 2000
+    assert (merged / edges).read_bytes() == (sequential / edges).read_bytes()
@@ -0,0 +1,89 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from src.alliance_ingest.entity_lookup import build_lookup_tables
+from src.alliance_ingest.scale import growth_exponents, scale_min_counts, superlinear
+from src.alliance_ingest.synthetic import RELEASE_RECORDS, Release, generate, write_file
+
+SCALE = 0.002
+
+
+@pytest.fixture(scope="module")
+def release_dir(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("synthetic")
+    generate(data_dir, SCALE, max_workers=2)
+    build_lookup_tables(data_dir, max_workers=2)
+    return data_dir
+
+
+def json_records(path):
+    with gzip.open(path, "rt") as fh:
+        return json.load(fh)["data"]
+
+
+def tsv_rows(path):
+    with gzip.open(path, "rt") as fh:
+        return list(csv.DictReader((line for line in fh if not line.startswith("#")), delimiter="\t"))
+
+
+def lookup_ids(data_dir, table):
+    with open(data_dir / table) as fh:
+        return {line.split("\t")[0] for line in fh}
+
+
+def test_files_match_the_release_at_scale(release_dir):
+    release = Release(SCALE)
+    for filename in RELEASE_RECORDS:
+        path = release_dir / filename
+        records = tsv_rows(path) if ".tsv" in filename else json_records(path)
+        assert len(records) == release.records(filename), filename
+
+
+def test_cross_references_resolve(release_dir):
+    genes = lookup_ids(release_dir, "alliance_gene.tsv")
+    alleles = lookup_ids(release_dir, "alliance_allele.tsv")
+    genotypes = lookup_ids(release_dir, "alliance_genotype.tsv")
+    entities = genes | alleles | genotypes
+    # Genes, alleles and genotypes of different providers never share an ID
+    assert len(entities) == len(genes) + len(alleles) + len(genotypes)
+
+    for provider in ["MGI", "RGD", "WB"]:
+        assert {
+            record["objectId"] for record in json_records(release_dir / f"PHENOTYPE_{provider}.json.gz")
+        } <= entities
+    for provider in ["MGI", "ZFIN", "RGD"]:
+        for genotype in json_records(release_dir / f"AGM_{provider}.json.gz"):
+            for component in genotype.get("affectedGenomicModelComponents", []):
+                assert component["alleleID"] in alleles
+    for provider in ["RGD", "MGI", "ZFIN", "FB", "WB", "SGD"]:
+        assert {record["geneId"] for record in json_records(release_dir / f"EXPRESSION_{provider}.json.gz")} <= genes
+    for row in tsv_rows(release_dir / "VARIANT-ALLELE_NCBITaxon10090.tsv.gz"):
+        assert row["AlleleAssociatedGeneId"] in genes | {"-"}
+    for row in tsv_rows(release_dir / "DISEASE-ALLIANCE_COMBINED.tsv.gz"):
+        if not row["DBObjectID"].startswith("HGNC:"):
+            assert row["DBObjectID"] in entities
+
+
+def test_files_are_reproducible(release_dir, tmp_path):
+    for filename in ["AGM_ZFIN.json.gz", "DISEASE-ALLIANCE_COMBINED.tsv.gz"]:
+        write_file(tmp_path, filename, Release(SCALE))
+        with gzip.open(tmp_path / filename) as fh, gzip.open(release_dir / filename) as expected:
+            assert fh.read() == expected.read()
+
+
+def test_min_counts_and_growth_follow_the_scale():
+    config = "writer:\n  min_node_count: 300000\n  min_edge_count: 12000\n"
+    assert scale_min_counts(config, 0.5) == "writer:\n  min_node_count: 150000\n  min_edge_count: 6000\n"
+
+    def run(scale, seconds, rss):
+        return {
+            "scale": scale,
+            "stages": [{"stage": "transform", "seconds": seconds, "peak_rss_mb": rss, "returncode": 0}],
+        }
+
+    exponents = growth_exponents([run(1, 10.0, 200.0), run(10, 400.0, 200.0)])
+    assert exponents == {"transform": {"seconds": 1.6, "peak_rss_mb": 0.0}}
+    assert superlinear(exponents) == ["transform: seconds grows as scale^1.60"]
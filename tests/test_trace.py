@@ -0,0 +1,34 @@
+import json
+
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.trace import Tracer, traced
+from src.alliance_ingest.worker import run_transform
+
+
+def test_transform_spans_are_merged_into_the_trace(disease_config, tmp_path):
+    tracer = Tracer(tmp_path / "trace.json")
+    with traced(tracer, "transform"):
+        tracer.begin("disease", "transform disease", "transform", "transform disease")
+        run_transform(str(disease_config), str(tmp_path / "output"), TransformOptions(trace_dir=str(tracer.parts_dir)))
+        tracer.end("disease", ok=True)
+    with traced(None, "report"):
+        pass
+
+    path = tracer.save()
+    assert not tracer.parts_dir.exists()
+    trace = json.loads(path.read_text())
+    spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+    names = [name.split(": ", 1)[-1] for name in spans]
+    assert {"build runner", "first row", "transform_record loop", "writer flush"} <= set(names)
+    assert "report" not in spans
+
+    loop = next(event for name, event in spans.items() if name.endswith("transform_record loop"))
+    assert loop["args"]["rows"] == 10
+    # The phase span encloses the config's span, which encloses the spans recorded inside the transform
+    phase, job = spans["transform"], spans["transform disease"]
+    assert phase["ts"] <= job["ts"] <= loop["ts"]
+    assert loop["ts"] + loop["dur"] <= job["ts"] + job["dur"] <= phase["ts"] + phase["dur"]
+    assert job["tid"] != phase["tid"]
+
+    lanes = {event["args"]["name"] for event in trace["traceEvents"] if event["name"] == "thread_name"}
+    assert {"pipeline", "transform disease"} <= lanes
@@ -0,0 +1,20 @@
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.worker import WarmPool, run_transform
+
+
+def test_run_transform_in_process(disease_config, tmp_path):
+    output_dir = tmp_path / "output"
+    stats = run_transform(str(disease_config), str(output_dir), TransformOptions())
+    assert stats["elapsed"] > 0
+    lines = (output_dir / "alliance_disease_edges.tsv").read_text().splitlines()
+    assert len(lines) == 11
+    assert "MGI:1000" in lines[1]
+
+
+def test_startup_savings():
+    with WarmPool(max_workers=1) as pool:
+        pool.startup_by_pid = {101: 4.0, 102: 2.0}
+        pool.tasks_run = 6
+        paid, avoided = pool.startup_savings()
+    assert paid == 6.0
+    assert avoided == 18.0
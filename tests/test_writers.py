@@ -0,0 +1,89 @@
+import csv
+import os
+import runpy
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from koza.model.writer import WriterConfig
+
+from src.alliance_ingest.options import TransformOptions
+from src.alliance_ingest.shards import merge_shards, plan_shards
+from src.alliance_ingest.worker import run_transform
+from src.alliance_ingest.writers import ParquetWriter, column_type
+
+ROOT = Path(__file__).parent.parent
+
+
+def read_tsv(path):
+    with open(path) as fh:
+        return list(csv.DictReader(fh, delimiter="\t"))
+
+
+def test_column_types():
+    assert column_type("publications") == pa.list_(pa.string())
+    assert column_type("in_taxon") == pa.list_(pa.string())
+    assert column_type("subject") == pa.string()
+    assert column_type("negated") == pa.bool_()
+
+
+def test_boolean_strings_are_parsed(tmp_path):
+    writer = ParquetWriter(tmp_path, "alliance_test", WriterConfig(edge_properties=["id", "negated"]))
+    for i, negated in enumerate(["False", "true", "0", "1", True, ""]):
+        writer.write_row({"id": f"uuid:{i}", "negated": negated}, "edge")
+    with pytest.raises(ValueError, match="Not a boolean"):
+        writer.write_row({"id": "uuid:6", "negated": "maybe"}, "edge")
+    writer.finalize()
+
+    negated = pq.read_table(tmp_path / "alliance_test_edges.parquet").column("negated").to_pylist()
+    assert negated == [False, True, False, True, True, None]
+
+
+def test_parquet_has_the_rows_of_the_tsv(disease_config, tmp_path):
+    run_transform(str(disease_config), str(tmp_path / "tsv"), TransformOptions())
+    run_transform(str(disease_config), str(tmp_path / "parquet"), TransformOptions(output_format="parquet"))
+
+    tsv_rows = read_tsv(tmp_path / "tsv" / "alliance_disease_edges.tsv")
+    parquet_file = pq.ParquetFile(tmp_path / "parquet" / "alliance_disease_edges.parquet")
+    assert parquet_file.metadata.row_group(0).column(0).compression == "ZSTD"
+    table = parquet_file.read()
+    assert table.column_names == list(tsv_rows[0])
+    assert table.schema.field("aggregator_knowledge_source").type == pa.list_(pa.string())
+
+    for tsv_row, parquet_row in zip(tsv_rows, table.to_pylist(), strict=True):
+        as_text = {
+            column: "|".join(value) if isinstance(value, list) else (value or "")
+            for column, value in parquet_row.items()
+        }
+        assert as_text == tsv_row
+
+
+def test_parquet_shards_merge_row_group_by_row_group(disease_config, tmp_path):
+    options = TransformOptions(output_format="parquet")
+    run_transform(str(disease_config), str(tmp_path / "sequential"), options)
+
+    shards = plan_shards(disease_config, tmp_path / "staging")
+    for shard in shards:
+        run_transform(str(disease_config), str(shard.output_dir), options, input_files=shard.files)
+    merged = tmp_path / "merged"
+    merged.mkdir()
+    counts = merge_shards([shard.output_dir for shard in shards], merged)
+
+    assert counts == {"alliance_disease_edges.parquet": 10}
+    name = "alliance_disease_edges.parquet"
+    assert pq.read_table(merged / name).equals(pq.read_table(tmp_path / "sequential" / name))
+    assert pq.ParquetFile(merged / name).num_row_groups == 2
+
+
+def test_report_reads_parquet(disease_config, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reports = {}
+    for output_format in ["tsv", "parquet"]:
+        run_transform(str(disease_config), "output", TransformOptions(output_format=output_format))
+        runpy.run_path(str(ROOT / "scripts" / "generate-report.py"))
+        reports[output_format] = Path("output/alliance_disease_edges_report.tsv").read_text()
+        if output_format == "tsv":
+            os.remove("output/alliance_disease_edges.tsv")
+    assert reports["parquet"] == reports["tsv"]
+    assert "biolink:GenotypeToDiseaseAssociation\tMGI\tbiolink:model_of\tDOID\t5" in reports["parquet"]